@@ -0,0 +1,93 @@
+"""
+Synthetic primitive sets for benchmarks
+
+Declares a role whose primitives have a configurable arity and number of
+types, so genotype and selection benchmarks do not depend on a particular
+problem. Every type has terminals reading the context and functions of the
+configured arity whose inputs cycle through the types, so every type is
+reachable from every other one.
+"""
+import random
+
+from maelstrom.genotype import GeneticTree
+
+
+def make_terminal(name, key):
+    def terminal(context):
+        return context[key]
+
+    terminal.__name__ = terminal.__qualname__ = name
+    return terminal
+
+
+def make_function(name, arity):
+    def function(*args):
+        return sum(args) / arity
+
+    function.__name__ = function.__qualname__ = name
+    return function
+
+
+def declare_synthetic(arity=2, types=1, terminals=4, functions=4):
+    """
+    Declares a synthetic primitive set under a role of its own
+
+    Args:
+        arity: The number of inputs of every function
+        types: The number of types
+        terminals: The number of terminals of every type
+        functions: The number of functions of every output type
+
+    Returns:
+        The role of the primitives and the output type of trees
+    """
+    role = f"synthetic_a{arity}_t{types}_l{terminals}_f{functions}"
+    for output in range(types):
+        output_type = f"T{output}"
+        for index in range(terminals):
+            GeneticTree.declare_primitive(role, output_type, ())(
+                make_terminal(f"terminal_{output}_{index}", f"x{output}")
+            )
+        input_types = tuple(f"T{(output + offset) % types}" for offset in range(arity))
+        for index in range(functions):
+            GeneticTree.declare_primitive(role, output_type, input_types)(
+                make_function(f"function_{output}_{index}", arity)
+            )
+    return role, "T0"
+
+
+def context(types):
+    """
+    Returns a context for the terminals of a synthetic primitive set
+
+    Args:
+        types: The number of types of the primitive set
+
+    Returns:
+        A dictionary with one random value per type
+    """
+    return {f"x{index}": random.random() for index in range(types)}
+
+
+def dummy_evaluation(executor=None, **populations):
+    """
+    Evaluation function assigning random fitness values without executing
+    the individuals, so island benchmarks measure the framework itself
+
+    Args:
+        executor: Ignored
+        **populations: The populations of the island
+
+    Returns:
+        The generation data and number of evaluations
+    """
+    evals = 0
+    data = {}
+    for name, population in populations.items():
+        for individual in population.population:
+            individual.fitness = random.random()
+            evals += 1
+        data[f"{name}_best"] = max(
+            individual.fitness for individual in population.population
+        )
+    return data, evals
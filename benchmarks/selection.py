@@ -0,0 +1,168 @@
+"""
+Benchmarks unique survival selection at several population sizes
+
+Compares the current fitness proportional and normal selection against the
+previous implementations, which rebuilt the candidate and weight lists and
+recomputed statistics on every draw, and against the NumPy engine in
+maelstrom.selection.vectorized when NumPy is installed. The package is
+imported from the checkout the script belongs to:
+
+    python benchmarks/selection.py --sizes 100 1000 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# run as scripts from the checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from maelstrom.selection import unique, vectorized
+
+
+class Individual:
+    """Stand-in individual carrying only a fitness value"""
+
+    def __init__(self, fitness):
+        self.fitness = fitness
+
+
+def baseline_fitness_proportional_selection(population, n):
+    offset = min(individual.fitness for individual in population) * 1.1
+    if offset == 0:
+        offset = -0.01
+    else:
+        offset = min(0, offset)
+    candidates = {index for index in range(len(population))}
+    winners = []
+    for i in range(n):
+        champion = random.choices(
+            population=list(candidates),
+            weights=[population[individual].fitness - offset for individual in candidates],
+        )
+        candidates.remove(champion[0])
+        winners.append(champion[0])
+    return [population[survivor] for survivor in winners]
+
+
+def baseline_normal_selection(population, n):
+    candidates = {index for index in range(len(population))}
+    winners = []
+    for i in range(n):
+        fitnesses = [population[individual].fitness for individual in candidates]
+        avg = statistics.mean(fitnesses)
+        dev = statistics.stdev(fitnesses)
+        if fitnesses.count(0) == len(fitnesses):
+            weights = None
+        else:
+            weights = [
+                dev / abs(avg - (population[individual].fitness * 1.00001))
+                for individual in candidates
+            ]
+        champion = random.choices(population=list(candidates), weights=weights)
+        candidates.remove(champion[0])
+        winners.append(champion[0])
+    return [population[survivor] for survivor in winners]
+
+
+METHODS = {
+    "FPS": (
+        unique.fitness_proportional_selection,
+        baseline_fitness_proportional_selection,
+    ),
+    "normal": (unique.normal_selection, baseline_normal_selection),
+}
+
+
+def vectorize(method):
+    """
+    Wraps a vectorized selection method to take and return individuals
+
+    Args:
+        method: A function of maelstrom.selection.vectorized
+
+    Returns:
+        A function mapping a population and a number of survivors to a list
+        of individuals
+    """
+
+    def select(population, n):
+        fitness = vectorized.fitness_array(population)
+        indices = method(fitness, n, vectorized.generator())
+        return [population[index] for index in indices.tolist()]
+
+    return select
+
+
+VECTORIZED = {
+    "FPS": vectorize(vectorized.unique_fitness_proportional_selection),
+    "normal": vectorize(vectorized.unique_normal_selection),
+}
+
+
+def measure(method, population, n, repeats):
+    """
+    Returns the best wall-clock time of several selection calls
+
+    Args:
+        method: The selection function
+        population: The list of individuals to select from
+        n: The number of individuals to select
+        repeats: The number of timed calls
+
+    Returns:
+        The fastest time in seconds
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        method(population, n)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument(
+        "--survivors", type=float, default=0.5, help="fraction of the population kept"
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--baseline-limit",
+        type=int,
+        default=2000,
+        help="largest population size to run the previous implementations on",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    random.seed(arguments.seed)
+    print(
+        f"{'method':<8}{'size':>8}{'current (s)':>14}{'previous (s)':>14}"
+        f"{'speedup':>10}{'numpy (s)':>12}"
+    )
+    for size in arguments.sizes:
+        population = [Individual(random.gauss(0, 1)) for _ in range(size)]
+        n = max(1, int(size * arguments.survivors))
+        for name, (current, baseline) in METHODS.items():
+            current_time = measure(current, population, n, arguments.repeats)
+            if size <= arguments.baseline_limit:
+                baseline_time = measure(baseline, population, n, arguments.repeats)
+                columns = f"{baseline_time:>14.4f}{baseline_time / current_time:>9.1f}x"
+            else:
+                columns = f"{'-':>14}{'-':>10}"
+            if vectorized.np is not None:
+                numpy_time = measure(
+                    VECTORIZED[name], population, n, arguments.repeats
+                )
+                columns += f"{numpy_time:>12.4f}"
+            else:
+                columns += f"{'-':>12}"
+            print(f"{name:<8}{size:>8}{current_time:>14.4f}{columns}")
+
+
+if __name__ == "__main__":
+    main()
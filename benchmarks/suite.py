@@ -0,0 +1,359 @@
+"""
+Benchmarks the hot paths of genotypes, variation, selection and islands
+
+Trees are built from a synthetic primitive set of configurable arity, number
+of types and depth (see primitives.py). Every benchmark is timed over several
+repeats, each on freshly prepared inputs, and the results are printed and
+optionally written as JSON together with the commit they were measured at,
+so runs on different commits can be compared. The package is imported from
+the checkout the script belongs to, so it does not need to be installed:
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+# run as scripts from the checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import primitives
+from maelstrom import selection
+from maelstrom.genotype import GeneticTree
+from maelstrom.island import GeneticProgrammingIsland
+from maelstrom.linear import LinearGeneticTree
+from maelstrom.population import GeneticProgrammingPopulation
+from maelstrom.selection import vectorized
+
+GENOTYPES = {"tree": GeneticTree, "linear": LinearGeneticTree}
+
+
+def measure(setup, repeats):
+    """
+    Times a benchmark over several repeats
+
+    Args:
+        setup: A function preparing fresh inputs and returning the function
+            to time
+        repeats: The number of timed calls
+
+    Returns:
+        A list of wall-clock times in seconds
+    """
+    times = []
+    for _ in range(repeats):
+        run = setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def make_population(arguments, genotype, role, output_type, **kwargs):
+    """
+    Returns an initialized population of synthetic trees
+
+    Args:
+        arguments: The parsed command line arguments
+        genotype: The genotype class
+        role: The role of the synthetic primitives
+        output_type: The output type of the trees
+        **kwargs: Additional population keyword arguments
+
+    Returns:
+        A GeneticProgrammingPopulation
+    """
+    population = GeneticProgrammingPopulation(
+        pop_size=arguments.population,
+        num_children=arguments.population,
+        roles=role,
+        output_type=output_type,
+        depth_limit=arguments.depth,
+        hard_limit=arguments.depth * 2,
+        genotype=genotype,
+        **kwargs,
+    )
+    population.ramped_half_and_half()
+    return population
+
+
+def genotype_benchmarks(arguments, genotype, role, output_type):
+    """
+    Yields the benchmarks of tree operations
+
+    Yields:
+        Tuples of a name, the number of operations per call and the setup
+        function of the benchmark
+    """
+    size = arguments.population
+    base = make_population(arguments, genotype, role, output_type).population
+    context = primitives.context(arguments.types)
+
+    def initialization():
+        population = GeneticProgrammingPopulation(
+            pop_size=size,
+            num_children=size,
+            roles=role,
+            output_type=output_type,
+            depth_limit=arguments.depth,
+            genotype=genotype,
+        )
+        return population.ramped_half_and_half
+
+    def copy():
+        return lambda: [tree.copy() for tree in base]
+
+    def mutation():
+        trees = [tree.copy() for tree in base]
+        return lambda: [tree.subtree_mutation() for tree in trees]
+
+    def crossover():
+        trees = [tree.copy() for tree in base]
+        mates = base[1:] + base[:1]
+        pairs = list(zip(trees, mates))
+        return lambda: [tree.subtree_recombination(mate) for tree, mate in pairs]
+
+    def build():
+        trees = [tree.copy() for tree in base]
+        genotype.function_cache.clear()  # measure compilation, not cache hits
+        return lambda: [tree.build() for tree in trees]
+
+    def execute():
+        for tree in base:
+            tree.build()
+        return lambda: [tree.execute(context) for tree in base]
+
+    def encode():
+        return lambda: [tree.to_bytes() for tree in base]
+
+    yield "initialization", size, initialization
+    yield "copy", size, copy
+    yield "mutation", size, mutation
+    yield "crossover", size, crossover
+    yield "build", size, build
+    yield "execute", size, execute
+    yield "encode", size, encode
+
+
+def selection_benchmarks(arguments, genotype, role, output_type):
+    """
+    Yields the benchmarks of every registered parent and survival selection
+    operator, with and without NumPy
+
+    Yields:
+        Tuples of a name, the number of operations per call and the setup
+        function of the benchmark
+    """
+    population = make_population(arguments, genotype, role, output_type)
+    for individual in population.population:
+        individual.fitness = random.gauss(0, 1)
+    engines = [False] + ([True] if vectorized.np is not None else [])
+    registries = (
+        ("parent", selection.parent_selection, arguments.population),
+        ("survival", selection.unique_selection, arguments.population // 2),
+    )
+    for kind, registry, n in registries:
+        operators = {operator.name: operator for operator in registry.values()}
+        for name, operator in operators.items():
+            parameters = {}
+            if "k" in operator.parameters:
+                parameters["k"] = arguments.tournament
+            for engine in engines:
+
+                def setup(operator=operator, parameters=parameters, engine=engine):
+                    population.VECTORIZED = engine
+                    population.ranking_cache = None
+                    return lambda: population.apply_selection(operator, n, parameters)
+
+                suffix = "numpy" if engine else "python"
+                yield f"{kind}_selection_{name}_{suffix}", n, setup
+
+
+def island_benchmarks(arguments, genotype, role, output_type):
+    """
+    Yields the benchmark of full island generations with an evaluation
+    function that assigns random fitness values
+
+    Yields:
+        Tuples of a name, the number of operations per call and the setup
+        function of the benchmark
+    """
+    config = {
+        "pop_size": arguments.population,
+        "num_children": arguments.population,
+        "roles": role,
+        "output_type": output_type,
+        "depth_limit": arguments.depth,
+        "hard_limit": arguments.depth * 2,
+        "genotype": genotype,
+        "parent_selection": "k_tournament",
+        "k_parent": arguments.tournament,
+    }
+    island = GeneticProgrammingIsland(
+        populations={"bench": "config"},
+        evaluation_function=primitives.dummy_evaluation,
+        champions_per_generation=1,
+        cores=1,
+        config=config,
+    )
+
+    def generation():
+        return island.generation
+
+    yield "island_generation", 1, generation
+
+
+SUITES = {
+    "genotype": genotype_benchmarks,
+    "selection": selection_benchmarks,
+    "island": island_benchmarks,
+}
+
+
+def commit():
+    """
+    Returns the commit of the working tree and whether it has uncommitted
+    changes, or None outside a git repository
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        head = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=directory,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=directory,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"hash": head, "dirty": bool(status.strip())}
+
+
+def compare(results, parameters, path):
+    """
+    Prints the speedup of every benchmark over a previous results file
+
+    Args:
+        results: The list of results of this run
+        parameters: The parameters of this run
+        path: The path of the JSON file of a previous run
+    """
+    with open(path, encoding="utf-8") as file:
+        baseline = json.load(file)
+    previous = {
+        (result["genotype"], result["name"]): result for result in baseline["results"]
+    }
+    revision = (baseline.get("commit") or {}).get("hash", "unknown")
+    print(f"\ncompared with {revision[:12]}")
+    differences = [
+        key
+        for key in ("arity", "types", "terminals", "functions", "depth", "population")
+        if baseline["parameters"].get(key) != parameters[key]
+    ]
+    if differences:
+        print(f"warning: runs differ in {', '.join(differences)}")
+    print(f"{'benchmark':<44}{'previous (s)':>14}{'current (s)':>14}{'speedup':>10}")
+    for result in results:
+        match = previous.get((result["genotype"], result["name"]))
+        if match is None:
+            continue
+        speedup = match["median"] / result["median"] if result["median"] else 0
+        print(
+            f"{result['genotype'] + ' ' + result['name']:<44}"
+            f"{match['median']:>14.6f}{result['median']:>14.6f}{speedup:>9.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--suites", nargs="+", choices=list(SUITES), default=list(SUITES)
+    )
+    parser.add_argument(
+        "--genotypes", nargs="+", choices=list(GENOTYPES), default=list(GENOTYPES)
+    )
+    parser.add_argument("--arity", type=int, default=2)
+    parser.add_argument("--types", type=int, default=1)
+    parser.add_argument("--terminals", type=int, default=4)
+    parser.add_argument("--functions", type=int, default=4)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--population", type=int, default=500)
+    parser.add_argument("--tournament", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--filter", default="", help="only run benchmarks containing this text"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument(
+        "--compare", help="JSON file of a previous run to compare with"
+    )
+    arguments = parser.parse_args()
+
+    parameters = {
+        key: value
+        for key, value in vars(arguments).items()
+        if key not in ("output", "compare")
+    }
+    role, output_type = primitives.declare_synthetic(
+        arguments.arity, arguments.types, arguments.terminals, arguments.functions
+    )
+    results = []
+    print(f"{'benchmark':<44}{'median (s)':>14}{'best (s)':>14}{'per op (us)':>14}")
+    for genotype_name in arguments.genotypes:
+        genotype = GENOTYPES[genotype_name]
+        for suite in arguments.suites:
+            random.seed(arguments.seed)
+            benchmarks = SUITES[suite](arguments, genotype, role, output_type)
+            for name, operations, setup in benchmarks:
+                if arguments.filter not in name:
+                    continue
+                times = measure(setup, arguments.repeats)
+                result = {
+                    "genotype": genotype_name,
+                    "suite": suite,
+                    "name": name,
+                    "operations": operations,
+                    "median": statistics.median(times),
+                    "best": min(times),
+                    "times": times,
+                }
+                results.append(result)
+                per_operation = result["median"] / max(1, operations) * 1e6
+                print(
+                    f"{genotype_name + ' ' + name:<44}{result['median']:>14.6f}"
+                    f"{result['best']:>14.6f}{per_operation:>14.2f}"
+                )
+
+    if arguments.output is not None:
+        report = {
+            "commit": commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "numpy": None if vectorized.np is None else vectorized.np.__version__,
+            "platform": platform.platform(),
+            "parameters": parameters,
+            "results": results,
+        }
+        with open(arguments.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if arguments.compare is not None:
+        compare(results, parameters, arguments.compare)
+
+
+if __name__ == "__main__":
+    main()
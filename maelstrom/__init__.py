@@ -14,10 +14,17 @@ use a single-population island with an appropriate fitness function
 """
 
 import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 from tqdm.auto import tqdm
 
 # import concurrent.futures
+from maelstrom import checkpoint
+from maelstrom.instrumentation import Instrumentation, format_statistics
 from maelstrom.island import GeneticProgrammingIsland
+from maelstrom.worker import IslandProxy
 
 
 # General-purpose Maelstrom class that contains and manages multiple islands
@@ -36,17 +43,53 @@ class Maelstrom:
         migration_edges=None,
         cores=None,
         position=None,
+        eval_pool=None,
+        asynchronous=False,
+        processes=False,
+        hosts=None,
+        authkey=None,
+        checkpoint_file=None,
+        checkpoint_period=10,
+        instrument=False,
+        report_interval=None,
         **kwargs,
     ):
         """
         Initializes a Maelstrom object
 
+        A single evaluation pool is shared by every island during
+        initialization, and another one during each run; both are shut down
+        when they are done. Call open() (or use the object as a context
+        manager) to keep the pools running across runs until close() is
+        called.
+
         Args:
             islands: dictionary of island names and island parameters
             evaluations: total number of evaluations to perform
             migration_edges: list of migration edges
             cores: number of cores to use
             position: position of progress bar
+            eval_pool: externally managed pool to use for evaluation
+            asynchronous: whether islands evolve independently instead of
+                waiting for each other at the end of every generation
+            processes: whether every island runs in its own worker process
+                with its own evaluation pool, splitting the cores between
+                islands
+            hosts: dictionary of island names and addresses of hosts running
+                maelstrom.worker.serve_island, islands listed here run remotely
+                with every core of their host
+            authkey: authentication key shared with the hosts
+            checkpoint_file: path of a checkpoint written in the background
+                every checkpoint_period generations of synchronous runs and
+                at the end of every run, see resume()
+            checkpoint_period: number of generations between checkpoints
+            instrument: whether Maelstrom and its islands record the time
+                spent in every phase of a generation and counters of copies,
+                compilations, evaluations and crossover failures, see
+                statistics()
+            report_interval: number of seconds between reports of the
+                statistics while running, passed to the functions registered
+                with add_reporter or printed if there are none
             **kwargs: keyword arguments to pass to island initialization
         """
         self.islands = {}
@@ -54,89 +97,155 @@ class Maelstrom:
         self.migration_edges = migration_edges
         self.evals = 0
         self.eval_limit = evaluations
+        self.asynchronous = asynchronous
+        self.processes = processes
+        self.hosts = {} if hosts is None else hosts
+        # a local evaluation pool is only needed for islands in this process
+        self.local_evaluation = not processes and any(
+            key not in self.hosts for key in islands
+        )
+        # plain dictionaries of lists copied from the island logs after runs
         self.log = {}
         if cores is None:
             cores = min(32, multiprocessing.cpu_count())
         self.cores = cores
         self.position = position
-        # self.evalPool = multiprocessing.Pool(cores)
-
-        # Initialize islands
-        for key in islands:
-            self.islands[key] = self.island_class(
-                cores=self.cores, **kwargs[islands[key]], **kwargs
-            )
+        self.eval_pool = eval_pool
+        self.owns_pool = eval_pool is None
+        self.island_pool = None
+        # whether the pools outlive runs, see open()
+        self.persistent = False
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_period = checkpoint_period
+        self.checkpoint_writer = None
+        self.generation = 1
+        self.instrumentation = Instrumentation(enabled=instrument)
+        self.report_interval = report_interval
+        self.reporters = []
+        self.last_report = time.perf_counter()
+        # islands are initialized with a temporary evaluation pool
+        self._start_pools()
+        try:
+            # Initialize islands
+            for key in islands:
+                if key in self.hosts:
+                    self.islands[key] = IslandProxy(
+                        island_class=self.island_class,
+                        cores=None,
+                        address=self.hosts[key],
+                        authkey=authkey,
+                        instrument=instrument,
+                        name=key,
+                        **kwargs[islands[key]],
+                        **kwargs,
+                    )
+                elif self.processes:
+                    self.islands[key] = IslandProxy(
+                        island_class=self.island_class,
+                        cores=max(1, self.cores // len(islands)),
+                        instrument=instrument,
+                        name=key,
+                        **kwargs[islands[key]],
+                        **kwargs,
+                    )
+                else:
+                    self.islands[key] = self.island_class(
+                        cores=self.cores,
+                        eval_pool=self.eval_pool,
+                        instrument=instrument,
+                        name=key,
+                        **kwargs[islands[key]],
+                        **kwargs,
+                    )
+            for island in self.islands.values():
+                if isinstance(island, IslandProxy):
+                    island.wait()  # islands initialize concurrently
+        finally:
+            self._stop_pools()
         self.evals = sum(island.evals for island in self.islands.values())
+        self.cache_hits = sum(island.cache_hits for island in self.islands.values())
 
         self.champions = {}
 
-    # def __del__(self):
-    # 	self.evalPool.close()
+    def open(self):
+        """
+        Creates the evaluation and island pools and keeps them running across
+        runs until close() is called
+        """
+        self.persistent = True
+        self._start_pools()
+
+    def _start_pools(self):
+        """
+        Creates the evaluation and island pools if they are not running and
+        hands the evaluation pool to the islands
+        """
+        if self.eval_pool is None and self.local_evaluation:
+            self.eval_pool = multiprocessing.Pool(self.cores)
+            self.owns_pool = True
+        if self.island_pool is None and self.islands:
+            self.island_pool = ThreadPool(len(self.islands))
+        for island in self.islands.values():
+            island.eval_pool = self.eval_pool
+
+    def _stop_pools(self):
+        """
+        Shuts down the pools owned by this object unless open() was called.
+        An externally provided evaluation pool is left running.
+        """
+        if self.persistent:
+            return
+        if self.island_pool is not None:
+            self.island_pool.close()
+            self.island_pool.join()
+            self.island_pool = None
+        if self.eval_pool is not None and self.owns_pool:
+            self.eval_pool.close()
+            self.eval_pool.join()
+            self.eval_pool = None
+        for island in self.islands.values():
+            island.eval_pool = self.eval_pool
+
+    def close(self):
+        """
+        Shuts down the pools owned by this object. An externally provided
+        evaluation pool is left running. Worker processes of islands are
+        stopped and cannot be restarted.
+        """
+        self.persistent = False
+        self._stop_pools()
+        self.eval_pool = None
+        for island in self.islands.values():
+            island.eval_pool = None
+            if isinstance(island, IslandProxy):
+                island.close()
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.wait()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def run(self):
         """
         Performs a single run of evolution until termination
         """
-        generation = 1
-
         self.evals = sum(island.evals for island in self.islands.values())
-        with multiprocessing.Pool(self.cores) as eval_pool:
+        self._start_pools()
+        try:
             with tqdm(
                 total=self.eval_limit, unit=" evals", position=self.position
             ) as pbar:
-                pbar.set_description(
-                    f"Maelstrom Generation {generation}", refresh=False
-                )
                 pbar.update(self.evals)
-                while self.evals < self.eval_limit:
-                    evals_old = self.evals
-                    # print(f"Beginning generation: {generation}\tEvaluations: {self.evals}")
-
-                    # migration
-                    for edge in self.migration_edges:
-                        # check migration timing
-                        if generation % edge["period"] == 0:
-                            destinationIsland, destinationPopulation = edge[
-                                "destination"
-                            ]
-                            sourceIsland, sourcePopulation = edge["source"]
-                            # collect imports
-                            migrants = self.islands[sourceIsland].select(
-                                population=sourcePopulation,
-                                n=edge["size"],
-                                method=edge["method"],
-                            )
-                            # export to destimation population
-                            if (
-                                destinationPopulation
-                                in self.islands[destinationIsland].imports
-                            ):
-                                self.islands[destinationIsland].imports[
-                                    destinationPopulation
-                                ].extend(migrants)
-                            else:
-                                self.islands[destinationIsland].imports[
-                                    destinationPopulation
-                                ] = migrants
-
-                    # Evolve one full generation with each island
-                    with multiprocessing.pool.ThreadPool() as executor:
-                        executor.starmap(
-                            self.island_class.generation,
-                            [(island, eval_pool) for island in self.islands.values()],
-                        )
-                    self.evals = sum(island.evals for island in self.islands.values())
-                    generation += 1
-                    pbar.set_description(
-                        f"Maelstrom Generation {generation}", refresh=False
-                    )
-                    pbar.update(self.evals - evals_old)
-
-                    island_termination = False
-                    for _, island in self.islands.items():
-                        island_termination = island_termination or island.termination()
-                    if island_termination:
-                        break
+                if self.asynchronous:
+                    self._run_asynchronous(pbar)
+                else:
+                    self._run_synchronous(pbar)
+        finally:
+            self._stop_pools()
 
         # identify champions for each species on each island
         for _, island in self.islands.items():
@@ -146,9 +255,282 @@ class Maelstrom:
                 self.champions[species].update(champions)
 
         for key, val in self.islands.items():
-            self.log[key] = val.log
+            self.log[key] = val.log.to_dict()
+        if self.checkpoint_file is not None:
+            self.checkpoint(self.checkpoint_file, background=True)
         return self
 
+    def checkpoint(self, path, background=False):
+        """
+        Writes a checkpoint of every island, the migration state, counters,
+        champions and the state of the random module. Islands running in
+        worker processes are copied from their workers, with the state of
+        their random modules.
+
+        Args:
+            path: path of the checkpoint file
+            background: whether to write the file in a background thread
+                after serializing the object
+        """
+        if background and self.checkpoint_writer is None:
+            self.checkpoint_writer = checkpoint.CheckpointWriter()
+        checkpoint.save(self, path, self.checkpoint_writer if background else None)
+
+    @classmethod
+    def resume(cls, path, eval_pool=None, authkey=None, restore_random=True):
+        """
+        Loads a Maelstrom object from a checkpoint, restarting the worker
+        processes of islands that ran in workers
+
+        Args:
+            path: path of the checkpoint file
+            eval_pool: externally managed pool to use for evaluation
+            authkey: authentication key shared with the hosts of remote
+                islands, which is not stored in checkpoints
+            restore_random: whether to restore the state of the random module
+
+        Raises:
+            TypeError: if the checkpoint does not hold a Maelstrom object
+
+        Returns:
+            The Maelstrom object, ready to run
+        """
+        maelstrom = checkpoint.load(path, restore_random)
+        if not isinstance(maelstrom, cls):
+            raise TypeError(f"checkpoint does not hold a {cls.__name__}")
+        maelstrom.eval_pool = eval_pool
+        maelstrom.owns_pool = eval_pool is None
+        cores = max(1, maelstrom.cores // len(maelstrom.islands))
+        for key, island in maelstrom.islands.items():
+            if isinstance(island, tuple):  # snapshot of a worker island
+                maelstrom.islands[key] = IslandProxy(
+                    island_class=type(island[0]),
+                    cores=None if key in maelstrom.hosts else cores,
+                    address=maelstrom.hosts.get(key),
+                    authkey=authkey,
+                    restore=island,
+                )
+        for key, island in maelstrom.islands.items():
+            if isinstance(island, IslandProxy):
+                island.wait()
+            if key in maelstrom.log:
+                maelstrom.log[key] = island.log.to_dict()
+        maelstrom.last_report = time.perf_counter()
+        maelstrom.persistent = False
+        return maelstrom
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # pools and threads cannot be pickled and are recreated on resume
+        state["eval_pool"] = None
+        state["island_pool"] = None
+        state["checkpoint_writer"] = None
+        state["reporters"] = []  # callbacks belong to the running process
+        state["islands"] = {
+            key: island.snapshot() if isinstance(island, IslandProxy) else island
+            for key, island in self.islands.items()
+        }
+        return state
+
+    def statistics(self):
+        """
+        Returns the timings and counters recorded while instrumentation is
+        enabled. Islands running in worker processes report their statistics
+        as of their last generation.
+
+        Returns:
+            dict: the snapshot of the instrumentation of Maelstrom, which
+            times migration and whole generations, under "maelstrom" and a
+            dictionary of island names mapped to their snapshots under
+            "islands"
+        """
+        return {
+            "maelstrom": self.instrumentation.snapshot(),
+            "islands": {
+                key: island.statistics() for key, island in self.islands.items()
+            },
+        }
+
+    def add_reporter(self, reporter):
+        """
+        Registers a function called with the statistics every report_interval
+        seconds while running
+
+        Args:
+            reporter: function accepting the dictionary returned by
+                statistics()
+        """
+        self.reporters.append(reporter)
+
+    def report(self):
+        """
+        Passes the statistics to the registered reporters, or prints them if
+        there are none
+        """
+        statistics = self.statistics()
+        self.last_report = time.perf_counter()
+        if not self.reporters:
+            sections = [("maelstrom", statistics["maelstrom"])]
+            sections.extend(statistics["islands"].items())
+            for name, section in sections:
+                tqdm.write(f"{name}\n{format_statistics(section)}")
+        for reporter in self.reporters:
+            reporter(statistics)
+
+    def report_periodically(self):
+        """
+        Reports the statistics if report_interval seconds have passed since
+        the last report
+        """
+        if (
+            self.report_interval is not None
+            and time.perf_counter() - self.last_report >= self.report_interval
+        ):
+            self.report()
+
+    def collect(self, edge):
+        """
+        Selects migrants from the source population of a migration edge
+
+        Args:
+            edge: migration edge dictionary
+
+        Returns:
+            list: copies of the selected migrants
+        """
+        source_island, source_population = edge["source"]
+        return self.islands[source_island].select(
+            population=source_population,
+            n=edge["size"],
+            method=edge["method"],
+        )
+
+    def deliver(self, edge, migrants):
+        """
+        Adds migrants to the imports of the destination population of a
+        migration edge
+
+        Args:
+            edge: migration edge dictionary
+            migrants: list of migrants to import
+        """
+        destination_island, destination_population = edge["destination"]
+        imports = self.islands[destination_island].imports
+        if destination_population in imports:
+            imports[destination_population].extend(migrants)
+        else:
+            imports[destination_population] = migrants
+
+    def _run_synchronous(self, pbar):
+        """
+        Evolves every island one generation at a time, migrating and checking
+        termination between generations
+
+        Args:
+            pbar: progress bar to update
+        """
+        pbar.set_description(f"Maelstrom Generation {self.generation}", refresh=False)
+        while self.evals < self.eval_limit:
+            evals_old = self.evals
+            # print(f"Beginning generation: {generation}\tEvaluations: {self.evals}")
+
+            # migration
+            with self.instrumentation.phase("migration"):
+                for edge in self.migration_edges:
+                    # check migration timing
+                    if self.generation % edge["period"] == 0:
+                        self.deliver(edge, self.collect(edge))
+
+            # Evolve one full generation with each island
+            with self.instrumentation.phase("generation"):
+                self.island_pool.map(
+                    lambda island: island.generation(self.eval_pool),
+                    self.islands.values(),
+                )
+            self.evals = sum(island.evals for island in self.islands.values())
+            self.cache_hits = sum(
+                island.cache_hits for island in self.islands.values()
+            )
+            self.generation += 1
+            pbar.set_description(
+                f"Maelstrom Generation {self.generation}", refresh=False
+            )
+            pbar.update(self.evals - evals_old)
+
+            if (
+                self.checkpoint_file is not None
+                and (self.generation - 1) % self.checkpoint_period == 0
+            ):
+                self.checkpoint(self.checkpoint_file, background=True)
+            self.report_periodically()
+
+            island_termination = False
+            for _, island in self.islands.items():
+                island_termination = island_termination or island.termination()
+            if island_termination:
+                break
+
+    def _run_asynchronous(self, pbar):
+        """
+        Evolves every island independently in its own thread. Migrants travel
+        through one queue per migration edge: a source island enqueues
+        migrants whenever its own generation count matches the period of the
+        edge and destination islands drain their queues before each of their
+        generations. The evaluation budget and termination criteria are
+        checked globally after every island generation.
+
+        Args:
+            pbar: progress bar to update
+        """
+        queues = [queue.SimpleQueue() for _ in self.migration_edges]
+        lock = threading.Lock()
+        stop = threading.Event()
+        counted = {name: island.evals for name, island in self.islands.items()}
+
+        def evolve(name):
+            island = self.islands[name]
+            generation = 1
+            try:
+                while not stop.is_set():
+                    with self.instrumentation.phase("migration"):
+                        for edge, edge_queue in zip(self.migration_edges, queues):
+                            if (
+                                edge["source"][0] == name
+                                and generation % edge["period"] == 0
+                            ):
+                                edge_queue.put(self.collect(edge))
+                        for edge, edge_queue in zip(self.migration_edges, queues):
+                            if edge["destination"][0] == name:
+                                while not edge_queue.empty():
+                                    self.deliver(edge, edge_queue.get())
+
+                    with self.instrumentation.phase("generation"):
+                        island.generation(self.eval_pool)
+                    generation += 1
+                    with lock:
+                        self.evals += island.evals - counted[name]
+                        pbar.update(island.evals - counted[name])
+                        counted[name] = island.evals
+                        self.cache_hits = sum(
+                            island.cache_hits for island in self.islands.values()
+                        )
+                        generations = sum(
+                            island.generation_count
+                            for island in self.islands.values()
+                        )
+                        pbar.set_description(
+                            f"Maelstrom Island Generations {generations}",
+                            refresh=False,
+                        )
+                        self.report_periodically()
+                        if self.evals >= self.eval_limit or island.termination():
+                            stop.set()
+            finally:
+                stop.set()
+
+        if self.evals < self.eval_limit:
+            self.island_pool.map(evolve, list(self.islands))
+
     def build(self):
         """
         Builds islands
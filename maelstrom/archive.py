@@ -0,0 +1,207 @@
+"""
+Bounded records of the champions of a population
+
+HallOfFame keeps the distinct best individuals of a run, keyed by their
+genome strings, up to a capacity and ChampionHistory keeps the genome string
+of the best individual of each generation (the CIAO history) in a window of
+recent generations. Every champion of the history and every champion evicted
+from the hall of fame can be streamed to an append-only JSON lines file, so
+that memory stays flat over long runs while the full record remains
+available for analysis with read_archive.
+"""
+import collections
+import json
+
+
+class Archive:
+    """
+    Append-only JSON lines file of champion records
+    """
+
+    def __init__(self, path, fields=None):
+        """
+        Args:
+            path: The path of the file, which is created if needed and
+                appended to otherwise
+            fields: A dictionary of constant fields added to every record,
+                such as the names of the island and population, so that
+                several populations can share a file
+        """
+        self.path = path
+        self.fields = {} if fields is None else fields
+        self.file = None
+
+    def write(self, kind, individual, **fields):
+        """
+        Appends a record describing an individual
+
+        Args:
+            kind: The kind of record, "champion" or "evicted"
+            individual: The individual, whose genome is stored as its string
+            fields: Additional fields of the record
+        """
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        record = {
+            **self.fields,
+            "kind": kind,
+            "fitness": individual.fitness,
+            "genome": individual.string,
+            **fields,
+        }
+        self.file.write(json.dumps(record, default=str) + "\n")
+        # flushed so processes forked later do not inherit buffered records
+        self.file.flush()
+
+    def close(self):
+        """Closes the file, which is reopened by the next write"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __getstate__(self):
+        return {"path": self.path, "fields": self.fields, "file": None}
+
+
+def read_archive(path, kind=None):
+    """
+    Reads the records of an archive file
+
+    Args:
+        path: The path of the file
+        kind: Only yield records of this kind, defaults to all records
+
+    Yields:
+        Dictionaries with the kind, fitness and genome string of every record
+        and any additional fields, including the island and population the
+        record comes from when the archive belongs to an island
+    """
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+            if kind is None or record["kind"] == kind:
+                yield record
+
+
+class HallOfFame(collections.OrderedDict):
+    """
+    Distinct champions keyed by genome string, ordered from the least to the
+    most recently crowned, with an optional capacity
+    """
+
+    POLICIES = ("lru", "worst")
+
+    def __init__(self, capacity=None, policy="lru", archive=None):
+        """
+        Args:
+            capacity: The maximum number of champions kept, defaults to no
+                limit
+            policy: The champion evicted when the capacity is exceeded, "lru"
+                for the least recently crowned or "worst" for the least fit
+            archive: An Archive receiving evicted champions, which are
+                discarded otherwise
+
+        Raises:
+            NameError: If the eviction policy is unrecognized
+        """
+        super().__init__()
+        if policy not in self.POLICIES:
+            raise NameError(f"unrecognized hall of fame eviction policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.archive = archive
+
+    def crown(self, individual):
+        """
+        Records an individual as the champion of a generation
+
+        Args:
+            individual: The champion, which is copied along with its fitness
+                if its genome is new
+
+        Returns:
+            The individual stored in the hall of fame
+        """
+        key = individual.string
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        champion = individual.copy()
+        champion.fitness = individual.fitness  # copies start unevaluated
+        self[key] = champion
+        while self.capacity is not None and len(self) > self.capacity:
+            self.evict()
+        return champion
+
+    def evict(self):
+        """
+        Removes a champion according to the eviction policy
+
+        Returns:
+            The removed champion
+        """
+        if self.policy == "worst":
+            key = min(self, key=lambda key: self[key].fitness)
+            champion = self.pop(key)
+        else:
+            champion = self.popitem(last=False)[1]
+        if self.archive is not None:
+            self.archive.write("evicted", champion)
+        return champion
+
+    def __reduce__(self):
+        return (
+            type(self),
+            (self.capacity, self.policy, self.archive),
+            None,
+            None,
+            iter(self.items()),
+        )
+
+
+class ChampionHistory(list):
+    """
+    Genome strings of the champions of successive generations, keeping the
+    most recent ones in memory and optionally streaming every champion to an
+    archive
+    """
+
+    def __init__(self, window=None, archive=None):
+        """
+        Args:
+            window: The number of recent champions kept in memory, defaults
+                to all of them
+            archive: An Archive receiving every champion
+        """
+        super().__init__()
+        self.window = window
+        self.archive = archive
+        self.generations = 0
+
+    def append(self, champion):
+        """
+        Records the champion of the next generation
+
+        Args:
+            champion: The champion, whose genome string is kept in memory
+                while the archive receives the whole record
+        """
+        if self.archive is not None:
+            self.archive.write("champion", champion, generation=self.generations)
+        self.generations += 1
+        super().append(champion.string)
+        if self.window is not None and len(self) > self.window:
+            del self[: len(self) - self.window]
+
+    def __reduce__(self):
+        # entries are restored through the state, since unpickling list items
+        # would call append with genome strings instead of champions
+        return (
+            type(self),
+            (self.window, self.archive),
+            {"generations": self.generations, "champions": list(self)},
+        )
+
+    def __setstate__(self, state):
+        self.generations = state["generations"]
+        self.extend(state["champions"])
@@ -0,0 +1,112 @@
+"""
+Batched evaluation of GP trees over NumPy arrays
+
+A batch is a dictionary of equally long NumPy arrays, one entry per context
+variable. Trees are compiled against vectorized implementations of their
+primitives and evaluated once over the whole batch. Primitives without a
+vectorized implementation fall back to element-wise evaluation, which keeps
+results correct but forfeits the speedup for those nodes.
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+
+def require_numpy():
+    """
+    Raises an informative error if NumPy is not installed
+    """
+    if np is None:
+        raise ImportError("batched evaluation requires numpy to be installed")
+
+
+def batch_size(batch):
+    """
+    Returns the number of contexts in a batch
+
+    Args:
+        batch: A dictionary of context variables mapped to arrays
+
+    Returns:
+        The length of the longest array in the batch
+    """
+    return max((np.shape(value)[0] for value in batch.values() if np.ndim(value)), default=1)
+
+
+def rows(batch):
+    """
+    Splits a batch into a list of per-context dictionaries
+
+    Args:
+        batch: A dictionary of context variables mapped to arrays
+
+    Returns:
+        A list of context dictionaries
+    """
+    size = batch_size(batch)
+    return [
+        {key: value[i] if np.ndim(value) else value for key, value in batch.items()}
+        for i in range(size)
+    ]
+
+
+def elementwise(func, arity):
+    """
+    Wraps a scalar primitive so it can be called on batched inputs
+
+    Args:
+        func: The scalar primitive function
+        arity: The number of children of the primitive
+
+    Returns:
+        A function accepting batched inputs
+    """
+    if arity == 0:
+
+        def leaf(batch):
+            return np.array([func(context) for context in rows(batch)])
+
+        leaf.__name__ = func.__name__
+        return leaf
+    return np.frompyfunc(func, arity, 1)
+
+
+def namespace(table):
+    """
+    Returns the batched namespace of a primitive table, building it on first
+    use
+
+    Args:
+        table: A PrimitiveTable object
+
+    Returns:
+        A dictionary of primitive names mapped to batched implementations
+    """
+    require_numpy()
+    if table.batch_local is None:
+        local = {}
+        for name, func, arity in zip(table.names, table.funcs, table.arities):
+            if name in table.vectorized:
+                local[name] = table.vectorized[name]
+            elif name not in local:
+                local[name] = elementwise(func, arity)
+        table.batch_local = local
+    return table.batch_local
+
+
+def broadcast(result, batch):
+    """
+    Expands scalar results, such as those of literal-only trees, to one value
+    per context
+
+    Args:
+        result: The result of a batched tree
+        batch: The batch the tree was evaluated on
+
+    Returns:
+        An array with one result per context
+    """
+    if np.ndim(result) == 0:
+        return np.full(batch_size(batch), result)
+    return result
@@ -0,0 +1,91 @@
+"""General-purpose bounded caches"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry once it holds
+    more than maxsize entries and counts lookup hits and misses. Lookups
+    and insertions are guarded by a lock, so islands running in threads can
+    share a cache.
+    """
+
+    def __init__(self, maxsize=None):
+        """
+        Args:
+            maxsize: Maximum number of entries to keep, or None for no bound
+        """
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for a key and marks it as recently used
+
+        Args:
+            key: The key to look up
+            default: The value to return if the key is missing
+
+        Returns:
+            The cached value or the default value
+        """
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Stores a value for a key, evicting the least recently used entries
+        if the cache is full
+
+        Args:
+            key: The key to store the value under
+            value: The value to store
+        """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes every entry while keeping the hit and miss counters
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        Returns the counters of the cache
+
+        Returns:
+            A dictionary of hits, misses and current number of entries
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]  # locks cannot be pickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
@@ -0,0 +1,157 @@
+"""
+Checkpoints of populations, islands and Maelstrom objects
+
+A checkpoint is a pickle of the object together with the state of the random
+module, so that a resumed run continues the same random sequence (NumPy
+generators used for selection are seeded from the random module). Genomes
+pickle through their compact wire encoding and pools are left out, so
+checkpoints are small and fast to write and load. Primitives are not stored
+in checkpoints: the modules declaring them must be imported before resuming.
+
+Files are replaced atomically by writing to a temporary file first, so an
+interrupted write never corrupts the previous checkpoint. Serialization
+happens in the calling thread, between generations, while writing to disk
+can be handed to a CheckpointWriter running in the background.
+"""
+import os
+import pickle
+import random
+import threading
+
+FORMAT = 1  # version of the checkpoint layout
+
+
+def dumps(obj):
+    """
+    Serializes an object and the state of the random module
+
+    Args:
+        obj: The object to checkpoint
+
+    Returns:
+        The checkpoint as bytes
+    """
+    payload = {"format": FORMAT, "random": random.getstate(), "state": obj}
+    return pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data, restore_random=True):
+    """
+    Deserializes a checkpoint
+
+    Args:
+        data: The checkpoint as bytes
+        restore_random: Whether to restore the state of the random module
+
+    Raises:
+        ValueError: If the data is not a checkpoint of a known format
+
+    Returns:
+        The checkpointed object
+    """
+    payload = pickle.loads(data)
+    if not isinstance(payload, dict) or payload.get("format") != FORMAT:
+        raise ValueError("unrecognized checkpoint format")
+    if restore_random:
+        random.setstate(payload["random"])
+    return payload["state"]
+
+
+def write(path, data):
+    """
+    Atomically replaces a file with new contents
+
+    Args:
+        path: The path of the file
+        data: The bytes to write
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def save(obj, path, writer=None):
+    """
+    Writes a checkpoint of an object
+
+    Args:
+        obj: The object to checkpoint
+        path: The path of the checkpoint file
+        writer: A CheckpointWriter writing the file in the background, or
+            None to write it before returning
+    """
+    data = dumps(obj)
+    if writer is None:
+        write(path, data)
+    else:
+        writer.submit(path, data)
+
+
+def load(path, restore_random=True):
+    """
+    Reads a checkpoint
+
+    Args:
+        path: The path of the checkpoint file
+        restore_random: Whether to restore the state of the random module
+
+    Returns:
+        The checkpointed object
+    """
+    with open(path, "rb") as file:
+        return loads(file.read(), restore_random)
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints in a background thread, one at a time. Submitting a
+    checkpoint waits for the previous one to be written, so a slow disk
+    delays the caller instead of accumulating checkpoints in memory.
+    """
+
+    def __init__(self):
+        self.thread = None
+        self.error = None
+
+    def submit(self, path, data):
+        """
+        Starts writing a checkpoint
+
+        Args:
+            path: The path of the checkpoint file
+            data: The serialized checkpoint
+        """
+        self.wait()
+        # not a daemon, so a pending checkpoint is finished at interpreter exit
+        self.thread = threading.Thread(target=self.write, args=(path, data))
+        self.thread.start()
+
+    def write(self, path, data):
+        """
+        Writes a checkpoint, keeping any error for the next wait
+
+        Args:
+            path: The path of the checkpoint file
+            data: The serialized checkpoint
+        """
+        try:
+            write(path, data)
+        except Exception as error:  # re-raised in the caller's thread
+            self.error = error
+
+    def wait(self):
+        """
+        Waits for the pending checkpoint to be written
+
+        Raises:
+            Exception: Any error raised while writing the checkpoint
+        """
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
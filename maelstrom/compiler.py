@@ -0,0 +1,219 @@
+"""
+Code generation for GP trees
+
+Trees are compiled straight from their prefix-order node sequence into a
+Python AST instead of printing and re-parsing their string representation.
+Optionally, repeated subexpressions are evaluated once per call. This is only
+sound if every primitive is a pure function of its inputs and the context:
+a stochastic or stateful primitive appearing several times in a tree would
+run once and share its result, so hoisting is opt-in through the HOIST
+attribute of genotype classes.
+"""
+import ast
+import itertools
+
+# literal types that can be embedded in the generated code as constants
+CONSTANT_TYPES = (bool, int, float, complex)
+
+
+def literal_expression(value):
+    """
+    Returns the AST expression of a literal value
+
+    Args:
+        value: The literal value of a node
+
+    Returns:
+        A constant node for numbers, otherwise the expression printed for the
+        value by print_tree
+    """
+    if type(value) in CONSTANT_TYPES:
+        return ast.Constant(value)
+    return ast.parse(f"{value}", mode="eval").body
+
+
+def count_subexpressions(prefix):
+    """
+    Hash-conses every subtree of a tree into a dense ID so that repeated
+    subexpressions can be detected without comparing strings
+
+    Args:
+        prefix: A sequence of (name, value, arity) tuples in prefix order
+
+    Returns:
+        A tuple of the list of subtree IDs in reverse prefix order and the
+        number of occurrences of every ID
+    """
+    ids = {}
+    keys = []
+    counts = []
+    stack = []
+    for name, value, arity in reversed(prefix):
+        children = tuple(stack.pop() for _ in range(arity))
+        if value is not None:
+            key = (name, repr(value), children)
+        else:
+            key = (name, children)
+        key = ids.setdefault(key, len(ids))
+        if key == len(counts):
+            counts.append(0)
+        counts[key] += 1
+        stack.append(key)
+        keys.append(key)
+    return keys, counts
+
+
+def build_expressions(prefix, hoist=False, keys=None, counts=None):
+    """
+    Builds the AST of a tree from its prefix-order node sequence
+
+    Args:
+        prefix: A sequence of (name, value, arity) tuples in prefix order
+        hoist: Whether to assign repeated subexpressions to local variables
+        keys: The subtree IDs returned by count_subexpressions, only needed
+            when hoisting
+        counts: The occurrence counts returned by count_subexpressions
+
+    Returns:
+        A tuple of the list of hoisted assignment statements and the
+        expression of the root
+    """
+    if not hoist:
+        # nothing is hoisted, so subtrees need not be told apart
+        keys = itertools.repeat(None)
+    elif keys is None:
+        keys, counts = count_subexpressions(prefix)
+
+    statements = []
+    hoisted = {}
+    stack = []
+    for (name, value, arity), key in zip(reversed(prefix), keys):
+        args = [stack.pop() for _ in range(arity)]
+        if key in hoisted:
+            stack.append(ast.Name(hoisted[key], ast.Load()))
+            continue
+        if value is not None and arity == 0:
+            stack.append(literal_expression(value))
+            continue
+        if value is not None:
+            func = literal_expression(value)
+        else:
+            func = ast.Name(name, ast.Load())
+        if arity == 0:
+            args = [ast.Name("context", ast.Load())]
+        expression = ast.Call(func, args, [])
+        if hoist and counts[key] > 1:
+            hoisted[key] = f"__t{len(hoisted)}"
+            statements.append(
+                ast.Assign([ast.Name(hoisted[key], ast.Store())], expression)
+            )
+            expression = ast.Name(hoisted[key], ast.Load())
+        stack.append(expression)
+    return statements, stack.pop()
+
+
+def compile_function(statements, result, namespace, name="<GeneticTree>"):
+    """
+    Compiles hoisted statements and a result expression into a function of
+    the context
+
+    Args:
+        statements: A list of assignment statements to run first
+        result: The expression returned by the function
+        namespace: The dictionary of primitive functions used as globals
+        name: The file name reported in tracebacks
+
+    Returns:
+        A function accepting a context
+    """
+    if statements:
+        module = ast.parse("def __tree(context):\n    pass")
+        module.body[0].body = statements + [ast.Return(result)]
+    else:
+        module = ast.parse("__tree = lambda context: None")
+        module.body[0].value.body = result
+    ast.fix_missing_locations(module)
+    scope = {}
+    exec(compile(module, name, "exec"), namespace, scope)
+    return scope["__tree"]
+
+
+def compile_prefix(prefix, namespace, hoist=False):
+    """
+    Compiles a tree into a callable function from its prefix-order node
+    sequence, without printing or parsing its expression
+
+    Args:
+        prefix: A sequence of (name, value, arity) tuples in prefix order
+        namespace: The dictionary of primitive functions used as globals
+        hoist: Whether to evaluate repeated subexpressions only once
+
+    Returns:
+        A function accepting a context
+    """
+    statements, result = build_expressions(prefix, hoist)
+    return compile_function(statements, result, namespace)
+
+
+def build_dag(prefixes):
+    """
+    Hash-conses several trees into a shared DAG and builds the statements
+    computing every unique subtree once. Subtrees used more than once are
+    assigned to local variables, every other subtree is inlined into its
+    only parent.
+
+    Args:
+        prefixes: A list of prefix-order node sequences, one per tree
+
+    Returns:
+        A tuple of the list of assignment statements, the list of root
+        expressions and the number of unique subtrees
+    """
+    ids = {}
+    nodes = []
+    roots = []
+    for prefix in prefixes:
+        stack = []
+        for name, value, arity in reversed(prefix):
+            children = tuple(stack.pop() for _ in range(arity))
+            if value is not None:
+                key = (name, repr(value), children)
+            else:
+                key = (name, children)
+            node_id = ids.get(key)
+            if node_id is None:
+                node_id = ids[key] = len(nodes)
+                nodes.append((name, value, children))
+            stack.append(node_id)
+        roots.append(stack.pop())
+
+    references = [0] * len(nodes)
+    for _, _, children in nodes:
+        for child in children:
+            references[child] += 1
+    for root in roots:
+        references[root] += 1
+
+    # IDs are assigned to children before their parents
+    statements = []
+    expressions = []
+    for node_id, (name, value, children) in enumerate(nodes):
+        if value is not None and not children:
+            expressions.append(literal_expression(value))
+            continue
+        if value is not None:
+            func = literal_expression(value)
+        else:
+            func = ast.Name(name, ast.Load())
+        if children:
+            args = [expressions[child] for child in children]
+        else:
+            args = [ast.Name("context", ast.Load())]
+        expression = ast.Call(func, args, [])
+        if references[node_id] > 1:
+            statements.append(
+                ast.Assign([ast.Name(f"__t{node_id}", ast.Store())], expression)
+            )
+            expression = ast.Name(f"__t{node_id}", ast.Load())
+        expressions.append(expression)
+    return statements, [expressions[root] for root in roots], len(nodes)
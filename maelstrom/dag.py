@@ -0,0 +1,74 @@
+"""
+Shared evaluation of many trees over the same contexts
+
+Trees of a population frequently share subtrees left behind by crossover.
+SubtreeDAG hash-conses all of them into a single DAG and compiles it into
+one function that computes every unique subtree once per context.
+"""
+import ast
+from maelstrom.compiler import build_dag, compile_function
+
+
+class SubtreeDAG:
+    """
+    Compiled, hash-consed DAG of a collection of trees
+    """
+
+    def __init__(self, trees):
+        """
+        Args:
+            trees: A list of tree objects supporting prefix and primitive_table,
+                possibly of different roles and tree classes
+        """
+        # roles and tree classes may declare different functions under the
+        # same name, so nodes are named after the function they call
+        namespace = {}
+        aliases = {}
+        prefixes = []
+        for tree in trees:
+            local = tree.primitive_table(tree.roles).local
+            prefix = []
+            for name, value, arity in tree.prefix():
+                func = local[name]
+                alias = aliases.get(func)
+                if alias is None:
+                    alias = name if name not in namespace else f"{name}__{len(aliases)}"
+                    aliases[func] = alias
+                    namespace[alias] = func
+                prefix.append((alias, value, arity))
+            prefixes.append(prefix)
+        statements, roots, self.unique_nodes = build_dag(prefixes)
+        self.total_nodes = sum(tree.size for tree in trees)
+        self.func = compile_function(
+            statements,
+            ast.Tuple(roots, ast.Load()),
+            namespace,
+            name="<SubtreeDAG>",
+        )
+
+    def __len__(self):
+        return self.unique_nodes
+
+    def execute(self, context):
+        """
+        Executes every tree of the DAG on a single context
+
+        Args:
+            context: A dictionary of context variables
+
+        Returns:
+            A tuple of results in the order the trees were given
+        """
+        return self.func(context)
+
+    def execute_all(self, contexts):
+        """
+        Executes every tree of the DAG on a list of contexts
+
+        Args:
+            contexts: A list of context dictionaries
+
+        Returns:
+            A list of result tuples, one per context
+        """
+        return [self.func(context) for context in contexts]
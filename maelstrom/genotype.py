@@ -1,6 +1,11 @@
 """General-purpose strong-type GP tree class"""
-import math
 import random
+import warnings
+from array import array
+from bisect import bisect_right
+from maelstrom import batch, wire
+from maelstrom.cache import LRUCache
+from maelstrom.compiler import compile_prefix
 
 
 class GeneticTree:
@@ -16,6 +21,36 @@ class GeneticTree:
     literal_initializers = {}
     DEBUG = False
     local = {}
+    vectorized = {}
+    tables = {}
+    # process-wide cache of compiled trees, see cache_key
+    function_cache = LRUCache(maxsize=4096)
+    # "ast" compiles trees directly from their nodes, "eval" parses the string
+    BACKEND = "ast"
+    # evaluating repeated subexpressions once is only sound if every primitive
+    # is pure, so it changes the behavior of stateful or stochastic primitives
+    HOIST = False
+    # attributes rebuilt by from_bytes instead of being pickled
+    encoded_attributes = frozenset(
+        (
+            "primitive_set",
+            "init_dict",
+            "local",
+            "roles",
+            "root",
+            "branching_factor",
+            "node_types",
+            "nodes",
+            "parents",
+            "ends",
+            "levels",
+            "depth",
+            "size",
+            "string",
+            "func",
+            "batch_func",
+        )
+    )
 
     @classmethod
     def declare_primitive(
@@ -26,6 +61,7 @@ class GeneticTree:
         *args,
         transitive=False,
         literal_init=False,
+        vectorized=None,
         **kwargs,
     ):
         """
@@ -51,6 +87,8 @@ class GeneticTree:
             input_types: A tuple of input types for the primitive
             transitive: A boolean indicating whether the primitive is transitive
             literal_init: A boolean indicating whether the primitive is a literal
+            vectorized: An optional implementation of the primitive operating on
+                NumPy arrays for batched evaluation
             args: A tuple of positional arguments to be passed to the primitive
             kwargs: A dictionary of keyword arguments to be passed to the primitive
 
@@ -63,6 +101,7 @@ class GeneticTree:
             The decorator function that captures the function and associated
             metadata in the primitives dictionary of the GeneticTree class.
             """
+            cls.discard_tables()
             for role in roles:
                 if role not in cls.primitives:
                     cls.primitives[role] = set()
@@ -76,6 +115,8 @@ class GeneticTree:
                 if literal_init:
                     key = (func.__name__, output_type, input_types)
                     cls.literal_initializers[role][key] = (args, kwargs)
+                if vectorized is not None:
+                    cls.vectorized.setdefault(role, {})[func.__name__] = vectorized
                 if cls.DEBUG:
                     print(
                         f"importing primitive '{func.__name__}' of type "
@@ -86,6 +127,68 @@ class GeneticTree:
 
         return add_primitive
 
+    @classmethod
+    def declare_vectorized(cls, roles, primitive):
+        """
+        Defines a decorator that registers a vectorized implementation of an
+        already declared primitive. Vectorized implementations receive NumPy
+        arrays instead of scalars (leaves receive the whole batch of contexts)
+        and are used by build_batch and execute_batch.
+
+        Args:
+            roles: A string or tuple of strings representing the roles
+            primitive: The scalar primitive function or its name
+        """
+        if isinstance(roles, str):
+            roles = (roles,)  # turns the string into a single-element tuple
+        if not isinstance(primitive, str):
+            primitive = primitive.__name__
+
+        def add_vectorized(func):
+            """
+            The decorator function that captures the vectorized implementation
+            """
+            cls.discard_tables()
+            for role in roles:
+                cls.vectorized.setdefault(role, {})[primitive] = func
+            return func
+
+        return add_vectorized
+
+    @classmethod
+    def discard_tables(cls):
+        """
+        Discards the cached primitive tables and compiled trees after a
+        declaration. Discarded tables are marked as stale so that trees still
+        holding them can move their primitive IDs to the new tables.
+        """
+        for table in cls.tables.values():
+            table.stale = True
+        cls.tables.clear()
+        cls.function_cache.clear()
+
+    @classmethod
+    def primitive_table(cls, roles):
+        """
+        Returns the shared primitive table for a set of roles. Tables are
+        cached per class and role tuple and discarded whenever a new primitive is
+        declared.
+
+        Args:
+            roles: A string or tuple of strings representing the roles
+
+        Returns:
+            A PrimitiveTable object for the roles
+        """
+        if isinstance(roles, str):
+            roles = (roles,)  # turns the string into a single-element tuple
+        # subclasses may declare different primitives under the same roles
+        table = cls.tables.get((cls, roles))
+        if table is None:
+            table = PrimitiveTable(cls, roles)
+            cls.tables[(cls, roles)] = table
+        return table
+
     def __init__(self, roles, output_type):
         """
         Initializes a tree object with a set of primitives appropriate for
@@ -110,12 +213,17 @@ class GeneticTree:
         self.branching_factor = max(
             len(primitive[2]) for primitive in self.primitive_set
         )
-        self.node_tags = None
+        self.node_types = None
+        self.nodes = None
+        self.parents = None
+        self.ends = None
+        self.levels = None
         self.depth_limit = 0
         self.hard_limit = 0
         self.depth = 0
         self.size = 0
         self.func = None
+        self.batch_func = None
         self.fitness=None
 
     def initialize(self, depth=1, hard_limit=0, grow=False, leaf_prob=0.5, full=False):
@@ -139,33 +247,99 @@ class GeneticTree:
         else:
             self.hard_limit = hard_limit
         self.root.initialize(self.init_dict)
-        self.node_tags = self.root.get_tags(self.branching_factor)
-        self.depth = math.ceil(
-            math.log(max(list(self.node_tags.keys())), self.branching_factor)
-        )
-        self.size = len(self.node_tags)
+        (
+            self.nodes,
+            self.parents,
+            self.ends,
+            self.levels,
+        ) = self.index_subtree(self.root)
+        self.node_types = [node.type for node in self.nodes]
+        self.depth = self.root.height
+        self.size = len(self.nodes)
         self.string = self.print_tree()
         # self.build()
 
+    def cache_key(self, kind="scalar"):
+        """
+        Returns the key of the compiled function of the calling tree object
+        in the function_cache of the class. Besides the roles and string of
+        the tree, the key holds the class and the compilation settings, so
+        subclasses declaring different primitives under the same names and
+        roles, or changes of BACKEND and HOIST, never share functions.
+
+        Args:
+            kind: "scalar" for build or "batch" for build_batch
+
+        Returns:
+            A hashable tuple
+        """
+        return (kind, type(self), self.BACKEND, self.HOIST, self.roles, self.string)
+
     def build(self):
         """
-        Builds the calling tree object into a callable function
+        Builds the calling tree object into a callable function. Structurally
+        identical trees share a single compiled function through the
+        function_cache of the class.
         """
-        local = {}
-        for role in self.roles:
-            if role not in self.__class__.primitives:
-                print(f"encountered unknown role: {role}")
+        key = self.cache_key()
+        func = self.function_cache.get(key)
+        if func is None:
+            local = self.primitive_table(self.roles).local
+            if self.BACKEND == "ast":
+                func = compile_prefix(self.prefix(), local, self.HOIST)
             else:
-                local.update(self.__class__.local[role])
-        self.func = eval("".join(["lambda context: ", self.string]), local)
+                func = eval("".join(["lambda context: ", self.string]), local)
+            self.function_cache.put(key, func)
+        self.func = func
+
+    def prefix(self):
+        """
+        Returns the nodes of the calling tree object in prefix order
+
+        Returns:
+            A list of (name, value, arity) tuples
+        """
+        return [
+            (node.func.__name__, node.value, len(node.children)) for node in self.nodes
+        ]
+
+    def build_batch(self):
+        """
+        Builds the calling tree object into a function evaluating a whole
+        batch of contexts with the vectorized implementations of its
+        primitives
+        """
+        key = self.cache_key("batch")
+        func = self.function_cache.get(key)
+        if func is None:
+            local = batch.namespace(self.primitive_table(self.roles))
+            func = compile_prefix(self.prefix(), local, self.HOIST)
+            self.function_cache.put(key, func)
+        self.batch_func = func
+
+    def execute_batch(self, contexts):
+        """
+        Executes the calling tree object over a batch of contexts
+
+        Args:
+            contexts: A dictionary of context variables mapped to NumPy arrays
+                of equal length
+
+        Returns:
+            An array holding the result of the tree for every context
+        """
+        if self.batch_func is None:
+            self.build_batch()
+        return batch.broadcast(self.batch_func(contexts), contexts)
 
     def clean(self):
         """
-        Cleans up the calling tree object by deleting the callable function
+        Cleans up the calling tree object by deleting the callable functions
         """
         if self.func is not None:
             del self.func
         self.func = None
+        self.batch_func = None
 
     # Full initialization method
     def full(self, depth=1):
@@ -203,77 +377,489 @@ class GeneticTree:
             self.build()
         return self.func(context)
 
+    def __hash__(self):
+        """
+        Returns the cached structural hash of the root of the calling tree.
+        Trees are mutable: a tree must not be modified while it is a key of
+        a dictionary or a member of a set, use genome_key for keys that
+        outlive the tree.
+        """
+        return self.root.digest
+
+    def __eq__(self, other):
+        """
+        Compares two trees through their cached structural hashes and sizes,
+        falling back to their expressions when those match so that hash
+        collisions never make different trees equal
+        """
+        if not isinstance(other, GeneticTree):
+            return NotImplemented
+        return (
+            hash(self) == hash(other)
+            and self.size == other.size
+            and self.roles == other.roles
+            and self.string == other.string
+        )
+
+    def genome_key(self):
+        """
+        Returns an immutable key identifying the genome of the calling tree
+        object, unaffected by later modifications of the tree
+
+        Returns:
+            A tuple of the roles, structural hash and string of the tree
+        """
+        return (self.roles, hash(self), self.string)
+
+    def identifiers(self):
+        """
+        Returns the IDs of the primitives of the calling tree object in the
+        primitive table of its roles, in prefix order
+
+        Returns:
+            A list of integer primitive IDs
+        """
+        index = self.primitive_table(self.roles).index
+        return [
+            index[
+                (node.func, node.type, tuple([child.type for child in node.children]))
+            ]
+            for node in self.nodes
+        ]
+
+    def to_bytes(self):
+        """
+        Encodes the structure of the calling tree object with the compact
+        binary format of maelstrom.wire
+
+        Returns:
+            The encoded tree as bytes
+        """
+        return wire.encode(self.identifiers(), [node.value for node in self.nodes])
+
+    @classmethod
+    def from_bytes(cls, roles, data):
+        """
+        Returns a tree object decoded from the binary format of
+        maelstrom.wire. The primitives of the roles must have been declared
+        in the same way as in the process that encoded the tree.
+
+        Args:
+            roles: A string or tuple of strings representing the roles
+            data: The encoded tree
+
+        Returns:
+            A tree object with the encoded structure
+        """
+        table = cls.primitive_table(roles)
+        ids, values = wire.decode(data)
+        size = len(ids)
+        genotype = cls(roles, table.outputs[ids[0]])
+        # positional tables are filled while the prefix sequence is decoded
+        nodes = [genotype.root] + [None] * (size - 1)
+        parents = array("i", [-1]) * size
+        ends = array("I", [0]) * size
+        levels = array("H", [0]) * size
+        last_children = [-1] * size
+        stack = []  # positions of nodes still expecting children
+        remaining = []
+        for position, (primitive, value) in enumerate(zip(ids, values)):
+            if position:
+                node = Node(table.outputs[primitive])
+                parent = stack[-1]
+                nodes[parent].children.append(node)
+                nodes[position] = node
+                parents[position] = parent
+                levels[position] = levels[parent] + 1
+                last_children[parent] = position
+                remaining[-1] -= 1
+                if not remaining[-1]:
+                    stack.pop()
+                    remaining.pop()
+            else:
+                node = genotype.root
+            node.func = table.funcs[primitive]
+            node.value = value
+            if table.arities[primitive]:
+                stack.append(position)
+                remaining.append(table.arities[primitive])
+        for position in range(size - 1, -1, -1):
+            nodes[position].measure()
+            last = last_children[position]
+            ends[position] = ends[last] if last >= 0 else position + 1
+        genotype.nodes = nodes
+        genotype.parents = parents
+        genotype.ends = ends
+        genotype.levels = levels
+        genotype.node_types = [node.type for node in nodes]
+        genotype.depth = genotype.root.height
+        genotype.size = size
+        genotype.string = genotype.print_tree()
+        return genotype
+
+    def __reduce__(self):
+        """
+        Pickles the calling tree as its binary encoding along with any
+        attributes that are not derived from its structure, such as fitness
+        and depth limits
+        """
+        state = {
+            key: value
+            for key, value in self.__dict__.items()
+            if key not in self.encoded_attributes
+        }
+        return self.from_bytes, (self.roles, self.to_bytes()), state
+
     # Return a copy of the calling tree
     def copy(self):
         """
-        Returns a copy of the calling tree object
+        Returns a copy of the calling tree object. Cached metadata (positional
+        tables, depth, size and string) is carried over instead of being
+        recomputed.
         """
-        clone = self.__class__(self.roles, self.root.type)
-        clone.root = self.root.copy()
-        clone.initialize(self.depth_limit, self.hard_limit)
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        nodes = []
+        for node, parent in zip(self.nodes, self.parents):
+            nodes.append(node.copy(deep=False))
+            if parent >= 0:
+                nodes[parent].children.append(nodes[-1])
+        clone.root = nodes[0]
+        clone.nodes = nodes
+        clone.node_types = self.node_types[:]
+        clone.parents = self.parents[:]
+        clone.ends = self.ends[:]
+        clone.levels = self.levels[:]
+        clone.func = None
+        clone.batch_func = None
+        clone.fitness = None
         return clone
 
+    @staticmethod
+    def index_subtree(root, start=0, parent=-1, level=0):
+        """
+        Builds the positional tables of a subtree. Nodes are addressed by
+        their offset in prefix order; every node records the position of its
+        parent, the position following the end of its subtree and its level
+        below the root of the tree.
+
+        Args:
+            root: The root node of the subtree
+            start: The position of the subtree root
+            parent: The position of the parent of the subtree root
+            level: The level of the subtree root
+
+        Returns:
+            A tuple of the list of nodes and the parent, end and level arrays
+        """
+        nodes = []
+        parents = array("i")
+        levels = array("H")
+        stack = [(root, parent, level)]
+        while stack:
+            node, parent, level = stack.pop()
+            position = start + len(nodes)
+            nodes.append(node)
+            parents.append(parent)
+            levels.append(level)
+            for child in reversed(node.children):
+                stack.append((child, position, level + 1))
+
+        sizes = [1] * len(nodes)
+        for i in range(len(nodes) - 1, 0, -1):
+            sizes[parents[i] - start] += sizes[i]
+        ends = array("I", [start + i + size for i, size in enumerate(sizes)])
+        return nodes, parents, ends, levels
+
+    @property
+    def node_tags(self):
+        """
+        The heap-style ID tags that addressed nodes before prefix-order
+        positions mapped to the types of their nodes, rebuilt from the
+        positional tables on every access. Use node_types, which lists the
+        types by position, and tag_positions instead.
+        """
+        types = self.node_types
+        return {tag: types[position] for tag, position in self.tag_positions().items()}
+
+    def tag_positions(self):
+        """
+        Returns the heap-style ID tags of the nodes mapped to their positions.
+        The root is tagged 1 and child i of the node tagged t is tagged
+        t * branching_factor + i.
+
+        Returns:
+            A dictionary of ID tags and positions
+        """
+        tags = {}
+        stack = []  # [tag, next child slot, children left] of open nodes
+        for position, (_, _, arity) in enumerate(self.prefix()):
+            if stack:
+                parent = stack[-1]
+                tag = parent[0] * self.branching_factor + parent[1]
+                parent[1] += 1
+                parent[2] -= 1
+                if not parent[2]:
+                    stack.pop()
+            else:
+                tag = 1
+            tags[tag] = position
+            if arity:
+                stack.append([tag, 0, arity])
+        return tags
+
+    def ancestors(self, target):
+        """
+        Returns the positions of the ancestors of a node from the root down
+
+        Args:
+            target: The position of the target node
+
+        Returns:
+            A list of ancestor positions
+        """
+        path = []
+        target = self.parents[target]
+        while target >= 0:
+            path.append(target)
+            target = self.parents[target]
+        path.reverse()
+        return path
+
+    def offset(self, target, ancestors=None):
+        """
+        Returns the offset of the expression of a node in the string of the
+        tree
+
+        Args:
+            target: The position of the target node
+            ancestors: The positions of the ancestors of the target node
+
+        Returns:
+            The offset of the expression of the node
+        """
+        if ancestors is None:
+            ancestors = self.ancestors(target)
+        offset = 0
+        for ancestor, child in zip(ancestors, ancestors[1:] + [target]):
+            offset += len(self.nodes[ancestor].label()) + 1
+            sibling = ancestor + 1
+            while sibling != child:
+                offset += self.nodes[sibling].length + 1
+                sibling = self.ends[sibling]
+        return offset
+
+    def _propagate(self, ancestors, delta):
+        """
+        Updates the cached metadata of the ancestors of a modified node
+
+        Args:
+            ancestors: The positions of the ancestors from the root down
+            delta: The change in length of the expression of the modified node
+        """
+        for ancestor in reversed(ancestors):
+            node = self.nodes[ancestor]
+            node.length += delta
+            node.height = 1 + max(child.height for child in node.children)
+            node.digest = node.merkle()
+        self.depth = self.root.height
+        self.size = len(self.nodes)
+
+    def _splice(self, target, payload, substring):
+        """
+        Replaces the subtree at a position and incrementally updates the
+        cached metadata of the tree
+
+        Args:
+            target: The position of the subtree to replace
+            payload: The initialized node to insert
+            substring: The expression of the payload node
+        """
+        ancestors = self.ancestors(target)
+        offset = self.offset(target, ancestors)
+        node = self.nodes[target]
+        end = self.ends[target]
+        parent = self.parents[target]
+        if ancestors:
+            slot = 0
+            sibling = parent + 1
+            while sibling != target:
+                sibling = self.ends[sibling]
+                slot += 1
+            self.nodes[parent].children[slot] = payload
+        else:
+            self.root = payload
+
+        nodes, parents, ends, levels = self.index_subtree(
+            payload, target, parent, self.levels[target]
+        )
+        delta = len(nodes) - (end - target)
+        for ancestor in ancestors:
+            self.ends[ancestor] += delta
+        self.nodes[target:end] = nodes
+        self.node_types[target:end] = [node.type for node in nodes]
+        self.levels[target:end] = levels
+        self.parents = (
+            self.parents[:target]
+            + parents
+            + array(
+                "i",
+                [
+                    position if position < target else position + delta
+                    for position in self.parents[end:]
+                ],
+            )
+        )
+        self.ends = (
+            self.ends[:target]
+            + ends
+            + array("I", [position + delta for position in self.ends[end:]])
+        )
+
+        self.string = "".join(
+            [self.string[:offset], substring, self.string[offset + node.length :]]
+        )
+        self._propagate(ancestors, payload.length - node.length)
+
     # Random subtree mutation - intended to be called by a copy of a parent
     def subtree_mutation(self):
         """
         Performs a subtree mutation on the calling tree object
         """
         for _ in range(10):
-            target = random.choice(list(self.node_tags.keys()))
-            mutant_depth_limit = self.hard_limit - math.ceil(
-                math.log(target, self.branching_factor)
-            )
+            target = random.randrange(self.size)
+            mutant_depth_limit = self.hard_limit - self.levels[target]
             if mutant_depth_limit <= 0:
                 depth = 0
             else:
                 depth = random.randrange(0, mutant_depth_limit)
 
-            if self.root.find_tag(target, self.branching_factor).mutate(
-                self.primitive_set, depth
-            ):
+            node = self.nodes[target]
+            head = node.head()
+            if node.mutate(self.primitive_set, depth):
+                # only the head of the expression changes on a point mutation
+                node.initialize(self.init_dict, recursive=False)
+                ancestors = self.ancestors(target)
+                offset = self.offset(target, ancestors)
+                self.string = "".join(
+                    [self.string[:offset], node.head(), self.string[offset + len(head) :]]
+                )
+                self._propagate(ancestors, len(node.head()) - len(head))
                 break  # break on successful mutation
 
         else:  # else of for loop calls grow on a random node if all other mutation attempts fail
-            target = random.choice(list(self.node_tags.keys()))
-            mutant_depth_limit = self.hard_limit - math.ceil(
-                math.log(target, self.branching_factor)
-            )
+            target = random.randrange(self.size)
+            mutant_depth_limit = self.hard_limit - self.levels[target]
             if mutant_depth_limit <= 0:
                 depth = 0
             else:
                 depth = random.randrange(0, mutant_depth_limit)
-            self.root.find_tag(target, self.branching_factor).grow(
-                self.primitive_set, depth
-            )
-        self.initialize(self.depth_limit, self.hard_limit)
+            mutant = Node(self.node_types[target])
+            mutant.grow(self.primitive_set, depth)
+            mutant.initialize(self.init_dict)
+            self._splice(target, mutant, mutant.print_tree())
+
+    @staticmethod
+    def choose_crossover(local_types, levels, donor_types, heights, limit, ends=None):
+        """
+        Chooses a crossover point and a donor subtree of the same type whose
+        height fits below the point within a depth limit. Points are weighted
+        by the fraction of donors of their type that fit, which yields the
+        same pairs as drawing a uniform point and donor until the child fits
+        but never draws more than once.
+
+        If the receiving tree already exceeds the limit, only points whose
+        replacement removes every level beyond the limit are eligible, so
+        oversized trees shrink back within it.
+
+        Args:
+            local_types: The type of every position of the receiving tree
+            levels: The level of every position of the receiving tree
+            donor_types: The type of every position of the donor tree
+            heights: The subtree height of every position of the donor tree
+            limit: The maximum depth of the receiving tree after crossover
+            ends: The position following the subtree of every position of
+                the receiving tree, required if it exceeds the limit
+
+        Returns:
+            A tuple of the crossover point and the donor position, or None
+            if no donor fits at any point
+        """
+        donors = {}
+        for position, node_type in enumerate(donor_types):
+            donors.setdefault(node_type, []).append(position)
+        fitting = {}
+        for node_type, positions in donors.items():
+            positions.sort(key=heights.__getitem__)
+            fitting[node_type] = [heights[position] for position in positions]
+
+        # the largest donor height that fits below every position
+        room = [limit - level for level in levels]
+        if ends is not None and max(levels) >= limit:
+            # depth of the tree without the subtree of each position, from
+            # the deepest levels before and after the subtree in prefix order
+            size = len(levels)
+            before = [0] * (size + 1)
+            after = [0] * (size + 1)
+            for position in range(size):
+                before[position + 1] = max(before[position], levels[position] + 1)
+            for position in range(size - 1, -1, -1):
+                after[position] = max(after[position + 1], levels[position] + 1)
+            for position in range(size):
+                if max(before[position], after[ends[position]]) > limit:
+                    room[position] = 0
+
+        weights = []
+        for node_type, space in zip(local_types, room):
+            options = fitting.get(node_type)
+            if options is None:
+                weights.append(0)
+            else:
+                weights.append(bisect_right(options, space) / len(options))
+        if not any(weights):
+            return None
+        local = random.choices(range(len(weights)), weights)[0]
+        node_type = local_types[local]
+        fits = bisect_right(fitting[node_type], room[local])
+        return local, donors[node_type][random.randrange(fits)]
 
     # Random subtree recombination - intended to be called by a copy of a parent
-    def subtree_recombination(self, mate):
+    def subtree_recombination(self, mate, limit=None):
         """
-        Performs a subtree recombination on the calling tree object
+        Performs a subtree recombination on the calling tree object, choosing
+        only donor subtrees that keep the tree within a depth limit
 
         Args:
             mate: The mate tree object to recombine with
+            limit: The maximum depth of the recombined tree, defaults to the
+                hard limit of the calling tree object
+
+        Returns:
+            A boolean indicating whether the recombination was successful
         """
-        type_options = set(self.node_tags.values()) & set(mate.node_tags.values())
-        if len(type_options) == 0:
+        if limit is None:
+            limit = self.hard_limit
+        if not set(self.node_types) & set(mate.node_types):
             print("No matching types for crossover!")
-        local_tag = random.choice(
-            [key for key in self.node_tags if self.node_tags[key] in type_options]
-        )
-        mate_tag = random.choice(
-            [
-                key
-                for key in mate.node_tags
-                if mate.node_tags[key] == self.node_tags[local_tag]
-            ]
+            return False
+        choice = self.choose_crossover(
+            self.node_types,
+            self.levels,
+            mate.node_types,
+            [node.height for node in mate.nodes],
+            limit,
+            self.ends if self.depth > limit else None,
         )
-        self.root.assign_at_tag(
-            local_tag,
-            mate.root.find_tag(mate_tag, mate.branching_factor).copy(),
-            self.branching_factor,
+        if choice is None:
+            return False
+        local, donor = choice
+        offset = mate.offset(donor)
+        self._splice(
+            local,
+            mate.nodes[donor].copy(),
+            mate.string[offset : offset + mate.nodes[donor].length],
         )
-        self.initialize(self.depth_limit, self.hard_limit)
+        return True
 
     # Returns a string representation of the expression encoded by the GP tree
     def print_tree(self):
@@ -317,6 +903,98 @@ class GeneticTree:
         return genotype
 
 
+class PrimitiveTable:
+    """
+    Deterministically ordered view of the primitives available to a set of
+    roles. Every primitive is given a dense integer ID so that genomes can be
+    stored and exchanged as arrays of IDs instead of function references. The
+    ordering only depends on primitive names and types, so processes that
+    declare the same primitives agree on the IDs.
+    """
+
+    def __init__(self, tree_class, roles):
+        """
+        Args:
+            tree_class: The GeneticTree class holding the declared primitives
+            roles: A tuple of strings representing the roles
+        """
+        self.tree_class = tree_class
+        self.roles = roles
+        self.stale = False  # set once a declaration replaces the table
+        primitives = set()
+        self.init_dict = {}
+        self.local = {}
+        self.vectorized = {}
+        self.batch_local = None  # built on demand by maelstrom.batch
+        for role in roles:
+            if role not in tree_class.primitives:
+                print(f"encountered unknown role: {role}")
+            else:
+                primitives |= tree_class.primitives[role]
+                self.init_dict.update(tree_class.literal_initializers[role])
+                self.local.update(tree_class.local[role])
+                self.vectorized.update(tree_class.vectorized.get(role, {}))
+        assert len(primitives) > 0, "No valid roles used in tree declaration"
+        self.primitives = tuple(
+            sorted(
+                primitives,
+                key=lambda primitive: (
+                    primitive[0].__name__,
+                    repr(primitive[1]),
+                    repr(primitive[2]),
+                ),
+            )
+        )
+        self.primitive_set = frozenset(self.primitives)
+        self.index = {primitive: i for i, primitive in enumerate(self.primitives)}
+        self.funcs = [primitive[0] for primitive in self.primitives]
+        self.names = [primitive[0].__name__ for primitive in self.primitives]
+        self.outputs = [primitive[1] for primitive in self.primitives]
+        self.inputs = [primitive[2] for primitive in self.primitives]
+        self.arities = [len(primitive[2]) for primitive in self.primitives]
+        self.literals = [
+            self.init_dict.get((primitive[0].__name__, primitive[1], primitive[2]))
+            for primitive in self.primitives
+        ]
+        self.branching_factor = max(self.arities)
+
+        # leaf and internal primitive IDs grouped by output type
+        self.leaves = {}
+        self.internals = {}
+        for i, primitive in enumerate(self.primitives):
+            group = self.internals if primitive[2] else self.leaves
+            group.setdefault(primitive[1], []).append(i)
+
+    def __len__(self):
+        return len(self.primitives)
+
+    def __reduce__(self):
+        # tables are pickled by reference and rebuilt from the primitives
+        # declared in the receiving process
+        return self.tree_class.primitive_table, (self.roles,)
+
+    def lookup(self, name, output_type, input_types):
+        """
+        Returns the ID of a primitive from its name and signature
+
+        Args:
+            name: The name of the primitive function
+            output_type: The output type of the primitive
+            input_types: A tuple of input types for the primitive
+
+        Returns:
+            The integer ID of the primitive
+        """
+        for i in self.internals.get(output_type, []) + self.leaves.get(
+            output_type, []
+        ):
+            if self.names[i] == name and self.inputs[i] == input_types:
+                return i
+        raise KeyError(
+            f"Function {name} of type {output_type} with children {input_types} could not be found in primitive table"
+        )
+
+
 class Node:
     """General-purpose strong-typed GP node class"""
 
@@ -329,13 +1007,18 @@ class Node:
         self.func = None  # stores an executable function object
         self.children = []
         self.value = None
+        self.height = 1  # number of levels in the subtree of the node
+        self.length = 0  # length of the expression printed by print_tree
+        self.digest = 0  # structural hash of the subtree of the node
 
-    def initialize(self, init_dict):
+    def initialize(self, init_dict, recursive=True):
         """
-        Initializes the calling node object
+        Initializes the calling node object and computes its cached height
+        and expression length
 
         Args:
             init_dict: A dictionary of pre-initialized values
+            recursive: Whether to initialize the children of the node first
         """
 
         key = (
@@ -346,8 +1029,85 @@ class Node:
         if self.value == None and key in init_dict:
             args, kwargs = init_dict[key]
             self.value = self.func(*args, **kwargs)
-        for child in self.children:
-            child.initialize(init_dict)
+        if recursive:
+            for child in self.children:
+                child.initialize(init_dict)
+        self.measure()
+
+    def measure(self):
+        """
+        Computes the cached height and expression length of the calling node
+        from the cached values of its children
+        """
+        if self.children:
+            self.height = 1 + max(child.height for child in self.children)
+            self.length = (
+                len(self.label())
+                + len(self.children)
+                + 1
+                + sum(child.length for child in self.children)
+            )
+        else:
+            self.height = 1
+            self.length = len(self.head())
+        self.digest = self.merkle()
+
+    def merkle(self):
+        """
+        Computes the structural hash of the calling node from its primitive,
+        type, value and the cached structural hashes of its children. The hash
+        is only meaningful within a single process.
+
+        Returns:
+            An integer hash
+        """
+        return hash(
+            (
+                self.func.__name__,
+                self.type,
+                repr(self.value) if self.value is not None else None,
+                tuple(child.digest for child in self.children),
+            )
+        )
+
+    def __hash__(self):
+        return self.digest
+
+    def __eq__(self, other):
+        if not isinstance(other, Node):
+            return NotImplemented
+        return (
+            self.digest == other.digest
+            and self.type == other.type
+            and self.length == other.length
+            and self.print_tree() == other.print_tree()
+        )
+
+    def label(self):
+        """
+        Returns the name printed for the calling node
+
+        Returns:
+            The literal value of the node as a string or the function name
+        """
+        if self.value is not None:
+            return f"{self.value}"
+        return self.func.__name__
+
+    def head(self):
+        """
+        Returns the part of the expression of the calling node that precedes
+        the expressions of its children
+
+        Returns:
+            The full expression for leaves or the name and opening parenthesis
+        """
+        name = self.label()
+        if self.children:
+            return f"{name}("
+        if self.value is not None:
+            return name
+        return f"{name}(context)"
 
     def filter_type_primitives(self, primitives):
         """
@@ -466,22 +1226,34 @@ class Node:
     # def execute(self, context):
     # 	return self.func(self, self.children, context)
 
-    def copy(self):
+    def tagged(self, branching, index=1):
         """
-        Return a copy of the subtree of the calling node
+        Yields the nodes of the subtree of the calling node in prefix order
+        with their heap-style ID tags
 
-        Returns:
-            A copy of the calling node object
+        Args:
+            branching: The branching factor of the tree
+            index: The ID tag of the calling node
         """
-        clone = Node(self.type)
-        clone.func = self.func
-        clone.value = self.value
-        clone.children = [child.copy() for child in self.children]
-        return clone
+        stack = [(index, self)]
+        while stack:
+            tag, node = stack.pop()
+            yield tag, node
+            stack.extend(
+                reversed(
+                    [
+                        (tag * branching + child_index, child)
+                        for child_index, child in enumerate(node.children)
+                    ]
+                )
+            )
 
     def get_tags(self, branching, index=1):
         """
-        Generate dictionary of unique node ID tags and node types
+        Generate dictionary of unique node ID tags and node types. Deprecated,
+        trees address nodes by position, see GeneticTree.node_types and
+        GeneticTree.tag_positions.
+
         Args:
             branching: The branching factor of the tree
             index: The ID tag of the calling node
@@ -489,15 +1261,17 @@ class Node:
         Returns:
             A dictionary of unique node ID tags and node types
         """
-        tags = {}
-        tags[index] = self.type
-        for child_index, child in enumerate(self.children):
-            tags.update(child.get_tags(branching, (index * branching) + child_index))
-        return tags
+        warnings.warn(
+            "Node.get_tags is deprecated, use GeneticTree.node_types",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return {tag: node.type for tag, node in self.tagged(branching, index)}
 
     def find_tag(self, target, branching, index=1):
         """
-        Get the node with the input ID tag
+        Get the node with the input ID tag. Deprecated, trees address nodes by
+        position, see GeneticTree.nodes and GeneticTree.tag_positions.
 
         Args:
             target: The ID tag of the target node
@@ -507,29 +1281,22 @@ class Node:
         Returns:
             The node with the input ID tag
         """
-        if target == index:
-            return self
-        if index > target:
-            return None
-
-        for childIndex in range(len(self.children)):
-            tag = (index * branching) + childIndex
-            if tag > target:
-                break
-            elif tag == target:
-                return self.children[childIndex]
-            childResult = self.children[childIndex].find_tag(target, branching, tag)
-            if childResult is not None:
-                return childResult
-        if index <= 1:
-            print(
-                f"invalid/missing target: {target}"
-            )  # TODO: make into a proper robust error
+        warnings.warn(
+            "Node.find_tag is deprecated, use GeneticTree.tag_positions",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        for tag, node in self.tagged(branching, index):
+            if tag == target:
+                return node
+        print(f"invalid/missing target: {target}")
         return None
 
     def assign_at_tag(self, target, payload_node, branching, index=1):
         """
-        Modify node at the input ID tag
+        Modify node at the input ID tag. Deprecated, the cached metadata of the
+        tree holding the node is not updated: call initialize on the tree
+        afterwards, or use the variation operators of GeneticTree.
 
         Args:
             target: The ID tag of the target node
@@ -540,29 +1307,46 @@ class Node:
         Returns:
             A boolean indicating whether the assignment was successful
         """
-
+        warnings.warn(
+            "Node.assign_at_tag is deprecated, use the variation operators "
+            "of GeneticTree",
+            DeprecationWarning,
+            stacklevel=2,
+        )
         if target == index:
             self.type = payload_node.type
             self.func = payload_node.func
             self.value = payload_node.value
             self.children = payload_node.children[:]
             return True
-
-        for child_index, child in enumerate(self.children):
-            tag = (index * branching) + child_index
-            if tag > target:
-                return False
-            if tag == target:
-                self.children[child_index] = payload_node
-                return True
-            if child.assign_at_tag(target, payload_node, branching, tag):
-                return True
-        if index <= 1 and target != index:
-            print(
-                f"invalid/missing target: {target}"
-            )  # TODO: make into a proper robust error
+        for tag, node in self.tagged(branching, index):
+            for child_index in range(len(node.children)):
+                if tag * branching + child_index == target:
+                    node.children[child_index] = payload_node
+                    return True
+        print(f"invalid/missing target: {target}")
         return False
 
+    def copy(self, deep=True):
+        """
+        Return a copy of the subtree of the calling node
+
+        Args:
+            deep: Whether to copy the children of the node as well
+
+        Returns:
+            A copy of the calling node object
+        """
+        clone = Node(self.type)
+        clone.func = self.func
+        clone.value = self.value
+        clone.height = self.height
+        clone.length = self.length
+        clone.digest = self.digest
+        if deep:
+            clone.children = [child.copy() for child in self.children]
+        return clone
+
     def print_tree(self):
         """
         Returns a string representation of the subtree of the calling node for debugging purposes
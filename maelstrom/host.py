@@ -0,0 +1,58 @@
+"""
+Command line entry point hosting Maelstrom islands for remote coordinators
+
+The authentication key is read from a file or from the MAELSTROM_AUTHKEY
+environment variable rather than from the command line, where other users of
+the machine could see it in the process list.
+"""
+import argparse
+import os
+
+from maelstrom.worker import serve_island
+
+
+def parse_address(address):
+    """
+    Parses a host:port string into a socket address, anything else is taken
+    as the path of a Unix socket
+
+    Args:
+        address: The address string
+
+    Returns:
+        A (host, port) tuple or a path
+    """
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def main():
+    """
+    Runs serve_island with command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Host Maelstrom islands")
+    parser.add_argument("--address", required=True, help="host:port or socket path")
+    parser.add_argument(
+        "--authkey-file",
+        default=None,
+        help="file holding the shared authentication key, defaults to the "
+        "MAELSTROM_AUTHKEY environment variable",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=None, help="number of islands to host"
+    )
+    arguments = parser.parse_args()
+    if arguments.authkey_file is not None:
+        with open(arguments.authkey_file, "rb") as file:
+            authkey = file.read().strip()
+    else:
+        authkey = os.environ.get("MAELSTROM_AUTHKEY", "").encode()
+    if not authkey:
+        parser.error("no authentication key in --authkey-file or MAELSTROM_AUTHKEY")
+    serve_island(parse_address(arguments.address), authkey, arguments.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Low-overhead instrumentation of generations
+
+An Instrumentation object accumulates the number of calls, wall-clock time
+and CPU time (of the calling thread) of named phases, along with named
+counters. Islands time variation, evaluation, survivor selection, hall of
+fame updates and champion selection, and Maelstrom times migration and whole
+generations. Disabled instrumentation hands out a shared no-op context
+manager, so leaving it in the generation loop costs next to nothing.
+
+InstrumentedPool wraps a multiprocessing pool so that the time tasks spend
+queued, the time workers spend running them, the resulting idle time of the
+pool and the trees compiled by the workers are recorded as well.
+"""
+import contextlib
+import functools
+import threading
+import time
+
+from maelstrom.genotype import GeneticTree
+
+NO_PHASE = contextlib.nullcontext()
+
+
+class Instrumentation:
+    """
+    Per-phase timings and counters, with hooks called whenever a phase ends
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Args:
+            enabled: Whether phases and counters are recorded
+        """
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.counters = {}
+        self.hooks = []
+
+    def phase(self, name):
+        """
+        Returns a context manager timing a phase
+
+        Args:
+            name: The name of the phase
+
+        Returns:
+            A context manager
+        """
+        if not self.enabled:
+            return NO_PHASE
+        return self.timer(name)
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """
+        Times the enclosed block as a phase
+
+        Args:
+            name: The name of the phase
+        """
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def record(self, name, wall, cpu=0.0, calls=1):
+        """
+        Adds time to a phase and calls the hooks
+
+        Args:
+            name: The name of the phase
+            wall: The wall-clock time in seconds
+            cpu: The CPU time in seconds
+            calls: The number of calls the time is spread over
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            totals = self.phases.get(name)
+            if totals is None:
+                totals = self.phases[name] = [0, 0.0, 0.0]
+            totals[0] += calls
+            totals[1] += wall
+            totals[2] += cpu
+        for hook in self.hooks:
+            hook(name, wall, cpu)
+
+    def count(self, name, n=1):
+        """
+        Increments a counter
+
+        Args:
+            name: The name of the counter
+            n: The increment
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_hook(self, hook):
+        """
+        Registers a function called with the name, wall-clock time and CPU
+        time of every phase as it ends, in the thread that ran the phase
+
+        Args:
+            hook: The function to call
+        """
+        self.hooks.append(hook)
+
+    def snapshot(self):
+        """
+        Returns the accumulated timings and counters
+
+        Returns:
+            A dictionary with a "phases" dictionary of phase names mapped to
+            their calls, wall and cpu times, and a "counters" dictionary
+        """
+        with self.lock:
+            return {
+                "phases": {
+                    name: {"calls": calls, "wall": wall, "cpu": cpu}
+                    for name, (calls, wall, cpu) in self.phases.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def reset(self):
+        """Clears the accumulated timings and counters"""
+        with self.lock:
+            self.phases.clear()
+            self.counters.clear()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # locks cannot be pickled and hooks belong to the process that added them
+        del state["lock"]
+        state["hooks"] = []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+
+def format_statistics(statistics):
+    """
+    Formats the snapshot of an Instrumentation object as a table
+
+    Args:
+        statistics: A dictionary returned by Instrumentation.snapshot
+
+    Returns:
+        A string with one line per phase and counter
+    """
+    lines = []
+    for name, totals in sorted(statistics["phases"].items()):
+        lines.append(
+            f"{name:<24}{totals['calls']:>10}{totals['wall']:>12.3f}s wall"
+            f"{totals['cpu']:>12.3f}s cpu"
+        )
+    for name, value in sorted(statistics["counters"].items()):
+        lines.append(f"{name:<24}{value:>10}")
+    return "\n".join(lines)
+
+
+def timed_call(function, submitted, *args):
+    """
+    Runs a task in a pool worker and measures when it started and ended and
+    how many trees it compiled
+
+    Args:
+        function: The function of the task
+        submitted: The time the task was submitted, from time.time
+        *args: The arguments of the function
+
+    Returns:
+        The result of the function, the time the task waited in the queue and
+        the time it ran, in seconds, and the number of misses of the function
+        cache of the worker
+    """
+    cache = GeneticTree.function_cache
+    misses = cache.misses
+    start = time.time()
+    result = function(*args)
+    return result, start - submitted, time.time() - start, cache.misses - misses
+
+
+class InstrumentedPool:
+    """
+    Wrapper around a multiprocessing pool recording the queue time and run
+    time of tasks submitted through map, starmap and apply, the idle time
+    of the workers of the pool while those calls were running and the number
+    of trees the tasks compiled, which is added to the "builds" counter.
+    Tasks are scheduled with the chunk size requested by the caller. Other
+    attributes are passed through to the pool unrecorded.
+    """
+
+    def __init__(self, pool, instrumentation, processes=None):
+        """
+        Args:
+            pool: The multiprocessing pool
+            instrumentation: The Instrumentation receiving the timings
+            processes: The number of workers of the pool, read from the pool
+                by default
+        """
+        self.pool = pool
+        self.instrumentation = instrumentation
+        self.processes = processes or getattr(pool, "_processes", None)
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+    def run(self, tasks, chunksize=None):
+        """
+        Runs argument tuples through the pool and records their timings
+
+        Args:
+            tasks: A list of (function, args) tuples
+            chunksize: The number of tasks sent to a worker at once, chosen
+                by the pool by default
+
+        Returns:
+            The list of results
+        """
+        start = time.perf_counter()
+        submitted = time.time()
+        timed = self.pool.starmap(
+            timed_call,
+            [(function, submitted, *args) for function, args in tasks],
+            chunksize,
+        )
+        wall = time.perf_counter() - start
+        queued = sum(queue for _, queue, _, _ in timed)
+        busy = sum(running for _, _, running, _ in timed)
+        instrumentation = self.instrumentation
+        instrumentation.record("pool_call", wall)
+        instrumentation.record("pool_queue", queued, calls=len(timed))
+        instrumentation.record("pool_busy", busy, calls=len(timed))
+        if self.processes:
+            instrumentation.record("pool_idle", max(0.0, self.processes * wall - busy))
+        instrumentation.count("pool_tasks", len(timed))
+        instrumentation.count("builds", sum(builds for _, _, _, builds in timed))
+        return [result for result, _, _, _ in timed]
+
+    def map(self, func, iterable, chunksize=None):
+        return self.run([(func, (item,)) for item in iterable], chunksize)
+
+    def starmap(self, func, iterable, chunksize=None):
+        return self.run([(func, tuple(args)) for args in iterable], chunksize)
+
+    def apply(self, func, args=(), kwds=None):
+        return self.run([(functools.partial(func, **(kwds or {})), tuple(args))])[0]
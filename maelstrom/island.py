@@ -1,3 +1,6 @@
+from maelstrom import checkpoint
+from maelstrom.instrumentation import Instrumentation, InstrumentedPool
+from maelstrom.logbook import ColumnarLog
 from maelstrom.population import GeneticProgrammingPopulation
 from tqdm.auto import tqdm
 import multiprocessing
@@ -21,36 +24,77 @@ class GeneticProgrammingIsland:
         champions_per_generation=0,
         cores=None,
         position=None,
+        log_window=None,
+        log_file=None,
+        instrument=False,
+        name=None,
         **kwargs,
     ):
         """
         Initializes the island and populations based on input configuration
         parameters and evaluation function
+
+        The generation data returned by the evaluation function is kept in a
+        ColumnarLog. Setting log_window bounds the number of generations held
+        in memory, and setting log_file streams every generation to a CSV
+        file that maelstrom.logbook.read_log reads back, with the name of
+        the island in an "island" column if one is given. Generations in
+        which the fitness cache knew every genome do not call the evaluation
+        function and add no entry to the log; their numbers are recorded in
+        skipped_generations so log entries can be matched to generations.
+
+        With fitness caches, the evaluation function only receives the
+        unique genomes whose fitness is unknown, so the generation data it
+        returns, and therefore the log, describes the genomes evaluated in
+        that generation rather than whole populations. For example, a best
+        fitness computed by the evaluation function leaves out cached elites.
+        Statistics of whole populations can be read from the populations
+        after each generation, where every individual has its fitness.
+
+        Setting instrument records the wall-clock and CPU time of every
+        phase of a generation, counters of copies, compilations, evaluations
+        and crossover failures, and the queue and idle time of the evaluation
+        pool, see statistics() and maelstrom.instrumentation. Compilations
+        are counted in this process and in tasks sent to the evaluation pool
+        through map, starmap or apply.
         """
         # self.parameters = parameters
+        self.name = name
+        self.instrumentation = Instrumentation(enabled=instrument)
         self.populations = {}
         self.generation_count = 0
         for name, config in populations.items():
             self.populations[name] = population_class(**kwargs[config])
+            archive = getattr(self.populations[name], "archive", None)
+            if archive is not None:
+                # populations sharing a config share the archive file
+                archive.fields["population"] = name
+                if self.name is not None:
+                    archive.fields["island"] = self.name
+            self.populations[name].instrumentation = self.instrumentation
             self.populations[name].initialization(**initialization_kwargs)
         self.evaluation = evaluation_function
 
         self.evaluation_parameters = evaluation_kwargs
 
-        self.log = {}
+        fields = None if self.name is None else {"island": self.name}
+        self.log = ColumnarLog(log_window, log_file, fields)
+        # generations without a log entry because every genome was cached
+        self.skipped_generations = []
 
         if cores is None:
             cores = min(32, multiprocessing.cpu_count())
         self.cores = cores
         self.position = position
 
-        # Fitness evaluations occur here
-        with multiprocessing.Pool(self.cores) as eval_pool:
-            generation_data, self.evals = self.evaluation(
-                **self.populations, executor=eval_pool, **self.evaluation_parameters
-            )
-        for key in generation_data:
-            self.log[key] = [generation_data[key]]
+        # Fitness evaluations occur here, in a temporary pool unless one is provided
+        self.eval_pool = eval_pool
+        if eval_pool is None:
+            with multiprocessing.Pool(self.cores) as eval_pool:
+                generation_data, self.evals = self.evaluate(eval_pool)
+        else:
+            generation_data, self.evals = self.evaluate(eval_pool)
+        self.log.append(generation_data)
 
         self.champions_per_generation = champions_per_generation
 
@@ -61,12 +105,12 @@ class GeneticProgrammingIsland:
                 population, self.champions_per_generation, method="best"
             )
             for individual in local_champions:
-                gene_text = individual.print_tree()
-                if gene_text not in self.champions[population]:
-                    self.champions[population][gene_text] = individual.copy()
+                if individual.string not in self.champions[population]:
+                    self.champions[population][individual.string] = individual
 
         self.imports = {}
         self.eval_limit = evaluations
+        self.checkpoint_writer = None
 
     # Performs a single generation of evolution
     def generation(self, eval_pool=None):
@@ -74,41 +118,100 @@ class GeneticProgrammingIsland:
         Performs a single generation of evolution
 
         Args:
-            eval_pool (multiprocessing.Pool): Pool of processes to use for evaluation
+            eval_pool (multiprocessing.Pool): Pool of processes to use for
+                evaluation, defaults to the pool provided at construction
 
         Returns:
             self
         """
+        if eval_pool is None:
+            eval_pool = self.eval_pool
+        phase = self.instrumentation.phase
         self.generation_count += 1
-        for population in self.populations:
-            if population in self.imports:
-                self.populations[population].generate_children(self.imports[population])
-            else:
-                self.populations[population].generate_children()
-        self.imports.clear()
-
-        generation_data, num_evals = self.evaluation(
-            **self.populations, executor=eval_pool, **self.evaluation_parameters
-        )
+        with phase("variation"):
+            for population in self.populations:
+                if population in self.imports:
+                    self.populations[population].generate_children(
+                        self.imports[population]
+                    )
+                else:
+                    self.populations[population].generate_children()
+            self.imports.clear()
+
+        with phase("evaluation"):
+            generation_data, num_evals = self.evaluate(eval_pool)
         self.evals += num_evals
-        for key in generation_data:
-            self.log[key].append(generation_data[key])
+        if generation_data is None:
+            # nothing was evaluated, so there is no generation data to log
+            self.skipped_generations.append(self.generation_count)
+        else:
+            self.log.append(generation_data)
 
         for population in self.populations:
-            self.populations[population].select_survivors()
-            self.populations[population].update_hall_of_fame()
+            with phase("survival"):
+                self.populations[population].select_survivors()
+            with phase("hall_of_fame"):
+                self.populations[population].update_hall_of_fame()
 
             # identify champions for each species
-            local_champions = self.select(
-                population, self.champions_per_generation, method="best"
-            )
-            for individual in local_champions:
-                gene_text = individual.print_tree()
-                if gene_text not in self.champions[population]:
-                    self.champions[population][gene_text] = individual.copy()
+            with phase("champions"):
+                local_champions = self.select(
+                    population, self.champions_per_generation, method="best"
+                )
+                for individual in local_champions:
+                    if individual.string not in self.champions[population]:
+                        self.champions[population][individual.string] = individual
 
         return self
 
+    def evaluate(self, eval_pool=None):
+        """
+        Evaluates the populations of the island, skipping genomes whose
+        fitness is known to the fitness cache of their population
+
+        Args:
+            eval_pool (multiprocessing.Pool): Pool of processes to use for evaluation
+
+        Returns:
+            tuple: The generation data and number of evaluations reported by
+            the evaluation function, which only covers the genomes missing
+            from the fitness caches, or None and 0 if every genome was a
+            cache hit and the evaluation function was not called
+        """
+        states = {
+            name: population.apply_fitness_cache()
+            for name, population in self.populations.items()
+        }
+        hits = sum(population.cache_hits for population in self.populations.values())
+        caching = any(state is not None for state in states.values())
+        instrumentation = self.instrumentation
+        if instrumentation.enabled:
+            # compilations in this process; the workers of the pool report
+            # theirs through InstrumentedPool
+            caches = {
+                population.genotype.function_cache
+                for population in self.populations.values()
+            }
+            builds = sum(cache.misses for cache in caches)
+            if eval_pool is not None:
+                eval_pool = InstrumentedPool(eval_pool, instrumentation)
+        if caching and not any(
+            population.population for population in self.populations.values()
+        ):
+            generation_data, num_evals = None, 0  # every genome was a cache hit
+        else:
+            generation_data, num_evals = self.evaluation(
+                **self.populations, executor=eval_pool, **self.evaluation_parameters
+            )
+        for name, population in self.populations.items():
+            population.restore_fitness_cache(states[name])
+        self.cache_hits = hits
+        if instrumentation.enabled:
+            instrumentation.count("evaluations", num_evals)
+            builds = sum(cache.misses for cache in caches) - builds
+            instrumentation.count("builds", builds)
+        return generation_data, num_evals
+
     # Termination check
     def termination(self):
         """
@@ -142,8 +245,20 @@ class GeneticProgrammingIsland:
         chosen = self.populations[population].select_unique(n, method, k)
         for index in range(len(chosen)):
             chosen[index] = chosen[index].copy()
+        self.instrumentation.count("copies", len(chosen))
         return chosen
 
+    def statistics(self):
+        """
+        Returns the timings and counters recorded while instrumentation is
+        enabled
+
+        Returns:
+            dict: The snapshot of the instrumentation of the island, see
+            maelstrom.instrumentation.Instrumentation.snapshot
+        """
+        return self.instrumentation.snapshot()
+
     # Perfoms a single run of evolution until termination
     def run(self):
         """
@@ -152,23 +267,79 @@ class GeneticProgrammingIsland:
         Returns:
             self
         """
-        with multiprocessing.Pool(self.cores) as eval_pool:
-            with tqdm(
-                total=self.eval_limit, unit=" evals", position=self.position
-            ) as pbar:
+        if self.eval_pool is not None:
+            self._run(self.eval_pool)
+        else:
+            with multiprocessing.Pool(self.cores) as eval_pool:
+                self._run(eval_pool)
+        return self  # self.log
+
+    def _run(self, eval_pool):
+        """
+        Runs generations with a pool of processes until termination
+
+        Args:
+            eval_pool (multiprocessing.Pool): Pool of processes to use for evaluation
+        """
+        with tqdm(
+            total=self.eval_limit, unit=" evals", position=self.position
+        ) as pbar:
+            pbar.set_description(
+                f"COEA Generation {self.generation_count}", refresh=False
+            )
+            pbar.update(self.evals)
+            while not self.termination():
+                evals_old = self.evals
+                # print(f"Beginning generation: {generation}\tEvaluations: {self.evals}")
+                self.generation(eval_pool)
                 pbar.set_description(
                     f"COEA Generation {self.generation_count}", refresh=False
                 )
-                pbar.update(self.evals)
-                while not self.termination():
-                    evals_old = self.evals
-                    # print(f"Beginning generation: {generation}\tEvaluations: {self.evals}")
-                    self.generation(eval_pool)
-                    pbar.set_description(
-                        f"COEA Generation {self.generation_count}", refresh=False
-                    )
-                    pbar.update(self.evals - evals_old)
-        return self  # self.log
+                pbar.update(self.evals - evals_old)
+
+    def checkpoint(self, path, background=False):
+        """
+        Writes a checkpoint of the island, including its populations, log,
+        champions, imports, counters and the state of the random module
+
+        Args:
+            path: The path of the checkpoint file
+            background: Whether to write the file in a background thread
+                after serializing the island
+        """
+        if background and self.checkpoint_writer is None:
+            self.checkpoint_writer = checkpoint.CheckpointWriter()
+        checkpoint.save(self, path, self.checkpoint_writer if background else None)
+
+    @classmethod
+    def resume(cls, path, eval_pool=None, restore_random=True):
+        """
+        Loads an island from a checkpoint
+
+        Args:
+            path: The path of the checkpoint file
+            eval_pool (multiprocessing.Pool): Pool of processes to use for
+                evaluation, by default run() creates a temporary pool
+            restore_random: Whether to restore the state of the random module
+
+        Raises:
+            TypeError: If the checkpoint does not hold an island
+
+        Returns:
+            The island
+        """
+        island = checkpoint.load(path, restore_random)
+        if not isinstance(island, cls):
+            raise TypeError(f"checkpoint does not hold a {cls.__name__}")
+        island.eval_pool = eval_pool
+        return island
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # pools and threads cannot be pickled and are recreated on resume
+        state["eval_pool"] = None
+        state["checkpoint_writer"] = None
+        return state
 
     def build(self):
         """
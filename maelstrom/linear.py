@@ -0,0 +1,827 @@
+"""Flat, array-backed strong-type GP tree class"""
+import random
+from array import array
+from maelstrom import wire
+from maelstrom.compiler import compile_prefix
+from maelstrom.genotype import GeneticTree
+
+
+class LinearGeneticTree(GeneticTree):
+    """
+    A GP tree stored as parallel arrays in prefix order instead of a graph of
+    Node objects. Each position holds the ID of a primitive from the shared
+    role-specific PrimitiveTable, the value of literal nodes (None otherwise),
+    the size of the subtree rooted at that position and its level below the
+    root. A subtree is always a contiguous slice of the arrays, so copying and
+    crossover are plain slice operations. The length of the expression and the
+    structural hash of every subtree are cached as well, so that variation
+    updates the string and hash of the tree without reprinting it.
+
+    This class shares the primitives declared through
+    GeneticTree.declare_primitive and can be used anywhere a GeneticTree
+    genotype is accepted.
+    """
+
+    # attributes rebuilt by from_bytes instead of being pickled
+    encoded_attributes = frozenset(
+        (
+            "roles",
+            "table",
+            "output_type",
+            "ids",
+            "values",
+            "sizes",
+            "levels",
+            "lengths",
+            "digests",
+            "depth",
+            "size",
+            "string",
+            "digest",
+            "func",
+            "batch_func",
+        )
+    )
+
+    def __init__(self, roles, output_type):
+        """
+        Initializes an empty tree object with the primitive table appropriate
+        for the roles assigned to the object and a root of the desired output
+        type.
+        """
+        if isinstance(roles, str):
+            roles = (roles,)  # turns the string into a single-element tuple
+        self.roles = roles
+        self.table = self.primitive_table(roles)
+        self.output_type = output_type
+        self.ids = array("H")
+        self.values = []
+        self.sizes = array("I")
+        self.levels = array("H")
+        self.lengths = array("I")
+        self.digests = []
+        self.depth_limit = 0
+        self.hard_limit = 0
+        self.depth = 0
+        self.size = 0
+        self.string = ""
+        self.digest = 0
+        self.func = None
+        self.batch_func = None
+        self.fitness = None
+
+    @property
+    def branching_factor(self):
+        """Maximum arity of the primitives available to the tree"""
+        return self.table.branching_factor
+
+    @property
+    def node_types(self):
+        """Types of the nodes of the tree in prefix order"""
+        outputs = self.table.outputs
+        return [outputs[primitive] for primitive in self.ids]
+
+    @property
+    def primitive_set(self):
+        """Set of primitives available to the tree"""
+        return self.table.primitive_set
+
+    def refresh_table(self):
+        """
+        Moves the calling tree object to the current primitive table of its
+        roles if a primitive was declared since the tree was created. The
+        primitive IDs are remapped to the new table, whose order may differ,
+        and the structural hashes derived from them are recomputed.
+        """
+        table = self.table
+        if not table.stale:
+            return
+        current = self.primitive_table(self.roles)
+        self.ids = array(
+            "H", [current.index[table.primitives[primitive]] for primitive in self.ids]
+        )
+        self.table = current
+        self.digests = self._digests(self.ids, self.values)
+        self.digest = self.digests[0] if self.ids else 0
+
+    def initialize(self, depth=1, hard_limit=0, grow=False, leaf_prob=0.5, full=False):
+        """
+        Performs tree initialization in the GP sense to the calling tree object
+
+        Args:
+            depth: The depth of the tree to initialize
+            hard_limit: The maximum depth of the tree to initialize
+            grow: A boolean indicating whether to use the grow initialization method
+            leaf_prob: The probability of initializing a leaf node in the grow method
+            full: A boolean indicating whether to use the full initialization method
+        """
+        if grow:
+            self.grow(depth, leaf_prob)
+        elif full:
+            self.full(depth)
+        self.depth_limit = depth
+        if hard_limit < depth:
+            self.hard_limit = depth * 2
+        else:
+            self.hard_limit = hard_limit
+        self.values = [
+            self._literal(primitive) if value is None else value
+            for primitive, value in zip(self.ids, self.values)
+        ]
+        self.measure()
+
+    def measure(self):
+        """
+        Recomputes the subtree sizes, levels, lengths and hashes, depth, size
+        and string of the calling tree object from its primitive IDs and
+        literal values
+        """
+        self.sizes = array("I", self._sizes(self.ids))
+        self.levels = array("H", self._levels(self.ids))
+        self.lengths = array("I", self._lengths(self.ids, self.values))
+        self.digests = self._digests(self.ids, self.values)
+        self.size = len(self.ids)
+        self.depth = max(self.levels) + 1 if self.size else 0
+        self.string = self.print_tree()
+        self.digest = self.digests[0] if self.size else 0
+
+    def structural_hash(self):
+        """
+        Computes the structural hash of the calling tree object from its
+        primitive IDs and literal values, ignoring the cached hashes. The hash
+        is only meaningful within a single process.
+
+        Returns:
+            An integer hash
+        """
+        return self._digests(self.ids, self.values)[0] if self.ids else 0
+
+    @staticmethod
+    def _merkle(primitive, value, children):
+        """
+        Computes the structural hash of a subtree from its root primitive and
+        value and the structural hashes of its children
+
+        Args:
+            primitive: The ID of the root primitive
+            value: The literal value of the root
+            children: The structural hashes of the children of the root
+
+        Returns:
+            An integer hash
+        """
+        return hash(
+            (primitive, repr(value) if value is not None else None, tuple(children))
+        )
+
+    def __hash__(self):
+        return self.digest
+
+    def _sizes(self, ids):
+        """
+        Returns the subtree size of every position in a prefix sequence
+
+        Args:
+            ids: A sequence of primitive IDs in prefix order
+
+        Returns:
+            A list of subtree sizes
+        """
+        arities = self.table.arities
+        sizes = [0] * len(ids)
+        stack = []
+        for i in range(len(ids) - 1, -1, -1):
+            size = 1
+            for _ in range(arities[ids[i]]):
+                size += stack.pop()
+            sizes[i] = size
+            stack.append(size)
+        return sizes
+
+    def _heights(self, ids):
+        """
+        Returns the subtree height of every position in a prefix sequence
+
+        Args:
+            ids: A sequence of primitive IDs in prefix order
+
+        Returns:
+            A list of subtree heights
+        """
+        arities = self.table.arities
+        heights = [0] * len(ids)
+        stack = []
+        for i in range(len(ids) - 1, -1, -1):
+            height = 1
+            for _ in range(arities[ids[i]]):
+                height = max(height, stack.pop() + 1)
+            heights[i] = height
+            stack.append(height)
+        return heights
+
+    def _lengths(self, ids, values):
+        """
+        Returns the expression length of every position in a prefix sequence
+
+        Args:
+            ids: A sequence of primitive IDs in prefix order
+            values: The literal values of the positions
+
+        Returns:
+            A list of expression lengths
+        """
+        arities = self.table.arities
+        lengths = [0] * len(ids)
+        stack = []
+        for i in range(len(ids) - 1, -1, -1):
+            arity = arities[ids[i]]
+            # the children are followed by a comma or the closing parenthesis
+            length = len(self._head(ids[i], values[i])) + arity
+            for _ in range(arity):
+                length += stack.pop()
+            lengths[i] = length
+            stack.append(length)
+        return lengths
+
+    def _digests(self, ids, values):
+        """
+        Returns the structural hash of every position in a prefix sequence
+
+        Args:
+            ids: A sequence of primitive IDs in prefix order
+            values: The literal values of the positions
+
+        Returns:
+            A list of integer hashes
+        """
+        arities = self.table.arities
+        digests = [0] * len(ids)
+        stack = []
+        for i in range(len(ids) - 1, -1, -1):
+            children = [stack.pop() for _ in range(arities[ids[i]])]
+            digests[i] = self._merkle(ids[i], values[i], children)
+            stack.append(digests[i])
+        return digests
+
+    def _levels(self, ids, base=0):
+        """
+        Returns the level of every position in a prefix sequence
+
+        Args:
+            ids: A sequence of primitive IDs in prefix order
+            base: The level of the first position
+
+        Returns:
+            A list of levels
+        """
+        arities = self.table.arities
+        levels = []
+        slots = [base]
+        for i in ids:
+            level = slots.pop()
+            levels.append(level)
+            slots.extend([level + 1] * arities[i])
+        return levels
+
+    def build(self):
+        """
+        Builds the calling tree object into a callable function shared with
+        every identical tree through the function_cache of the class
+        """
+        key = self.cache_key()
+        func = self.function_cache.get(key)
+        if func is None:
+            if self.BACKEND == "ast":
+                func = compile_prefix(self.prefix(), self.table.local, self.HOIST)
+            else:
+                func = eval("".join(["lambda context: ", self.string]), self.table.local)
+            self.function_cache.put(key, func)
+        self.func = func
+
+    def prefix(self):
+        """
+        Returns the nodes of the calling tree object in prefix order
+
+        Returns:
+            A list of (name, value, arity) tuples
+        """
+        names = self.table.names
+        arities = self.table.arities
+        return [
+            (names[primitive], value, arities[primitive])
+            for primitive, value in zip(self.ids, self.values)
+        ]
+
+    # Full initialization method
+    def full(self, depth=1):
+        """
+        Performs full initialization on the calling tree object
+
+        Args:
+            depth: The depth of the tree to initialize
+        """
+        ids, values = [], []
+        self._generate(self.output_type, depth - 1, ids, values, full=True)
+        self.ids = array("H", ids)
+        self.values = values
+
+    # Grow initialization method
+    def grow(self, depth=1, leaf_prob=0.5):
+        """
+        Performs grow initialization on the calling tree object
+
+        Args:
+            depth: The depth of the tree to initialize
+            leaf_prob: The probability of initializing a leaf node
+        """
+        ids, values = [], []
+        self._generate(
+            self.output_type, depth - 1, ids, values, leaf_prob, reach_depth=True
+        )
+        self.ids = array("H", ids)
+        self.values = values
+
+    def _generate(
+        self,
+        output_type,
+        limit,
+        ids,
+        values,
+        leaf_prob=0.5,
+        reach_depth=False,
+        full=False,
+    ):
+        """
+        Appends a randomly generated subtree to prefix-order ID and value lists
+        following the semantics of Node.full and Node.grow
+
+        Args:
+            output_type: The output type of the subtree root
+            limit: The depth limit of the subtree
+            ids: The list of primitive IDs to append to
+            values: The list of literal values to append to
+            leaf_prob: The probability of selecting a leaf primitive
+            reach_depth: Whether to reach the depth limit
+            full: Whether to perform full instead of grow initialization
+        """
+        table = self.table
+        leaves = table.leaves.get(output_type, [])
+        internals = table.internals.get(output_type, [])
+        if not leaves and not internals:
+            print(f"type {output_type} not found in primitives")
+            exit()
+
+        if (
+            limit > 0
+            and internals
+            and (full or reach_depth or random.random() > leaf_prob)
+        ):
+            primitive = random.choice(internals)
+        else:
+            primitive = random.choice(leaves)
+        ids.append(primitive)
+        values.append(self._literal(primitive))
+
+        input_types = table.inputs[primitive]
+        if reach_depth and input_types:
+            branch = random.randrange(len(input_types))
+        else:
+            branch = -1
+        for i, child_type in enumerate(input_types):
+            self._generate(
+                child_type, limit - 1, ids, values, reach_depth=i == branch, full=full
+            )
+
+    def _literal(self, primitive):
+        """
+        Returns a freshly initialized value for literal primitives and None
+        for every other primitive
+
+        Args:
+            primitive: The ID of the primitive
+        """
+        literal = self.table.literals[primitive]
+        if literal is None:
+            return None
+        args, kwargs = literal
+        return self.table.funcs[primitive](*args, **kwargs)
+
+    # Return a copy of the calling tree
+    def copy(self):
+        """
+        Returns a copy of the calling tree object
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone.ids = self.ids[:]
+        clone.values = self.values[:]
+        clone.sizes = self.sizes[:]
+        clone.levels = self.levels[:]
+        clone.lengths = self.lengths[:]
+        clone.digests = self.digests[:]
+        clone.func = None
+        clone.batch_func = None
+        clone.fitness = None
+        return clone
+
+    def ancestors(self, position):
+        """
+        Returns the positions of the ancestors of a position from the root down
+
+        Args:
+            position: The position of the node
+
+        Returns:
+            A list of ancestor positions
+        """
+        sizes = self.sizes
+        path = []
+        node = 0
+        while node != position:
+            path.append(node)
+            child = node + 1
+            while child + sizes[child] <= position:
+                child += sizes[child]
+            node = child
+        return path
+
+    def offset(self, position, ancestors=None):
+        """
+        Returns the offset of the expression of a position in the string of
+        the tree
+
+        Args:
+            position: The position of the node
+            ancestors: The positions of the ancestors of the node
+
+        Returns:
+            The offset of the expression of the node
+        """
+        if ancestors is None:
+            ancestors = self.ancestors(position)
+        offset = 0
+        for ancestor, child in zip(ancestors, ancestors[1:] + [position]):
+            offset += len(self._head(self.ids[ancestor], self.values[ancestor]))
+            sibling = ancestor + 1
+            while sibling != child:
+                offset += self.lengths[sibling] + 1
+                sibling += self.sizes[sibling]
+        return offset
+
+    def _propagate(self, ancestors, delta):
+        """
+        Updates the cached expression lengths and structural hashes of the
+        ancestors of a modified position
+
+        Args:
+            ancestors: The positions of the ancestors from the root down
+            delta: The change in length of the expression of the modified node
+        """
+        arities = self.table.arities
+        for ancestor in reversed(ancestors):
+            primitive = self.ids[ancestor]
+            children = []
+            child = ancestor + 1
+            for _ in range(arities[primitive]):
+                children.append(self.digests[child])
+                child += self.sizes[child]
+            self.lengths[ancestor] += delta
+            self.digests[ancestor] = self._merkle(
+                primitive, self.values[ancestor], children
+            )
+        self.digest = self.digests[0]
+        self.size = len(self.ids)
+        self.depth = max(self.levels) + 1
+
+    def _splice(
+        self, position, ids, values, sizes, levels, lengths, digests, substring
+    ):
+        """
+        Replaces the subtree at a position with a prefix-order subtree and
+        incrementally updates the cached metadata of the tree
+
+        Args:
+            position: The position of the subtree to replace
+            ids: The primitive IDs of the new subtree
+            values: The literal values of the new subtree
+            sizes: The subtree sizes of the new subtree
+            levels: The levels of the new subtree
+            lengths: The expression lengths of the new subtree
+            digests: The structural hashes of the new subtree
+            substring: The expression of the new subtree
+        """
+        ancestors = self.ancestors(position)
+        offset = self.offset(position, ancestors)
+        length = self.lengths[position]
+        end = position + self.sizes[position]
+        delta = len(ids) - (end - position)
+        for ancestor in ancestors:
+            self.sizes[ancestor] += delta
+        self.ids[position:end] = array("H", ids)
+        self.values[position:end] = values
+        self.sizes[position:end] = array("I", sizes)
+        self.levels[position:end] = array("H", levels)
+        self.lengths[position:end] = array("I", lengths)
+        self.digests[position:end] = digests
+        self.string = "".join(
+            [self.string[:offset], substring, self.string[offset + length :]]
+        )
+        self._propagate(ancestors, lengths[0] - length)
+
+    # Random subtree mutation - intended to be called by a copy of a parent
+    def subtree_mutation(self):
+        """
+        Performs a subtree mutation on the calling tree object
+        """
+        self.refresh_table()
+        for _ in range(10):
+            target = random.randrange(self.size)
+            head = self._head(self.ids[target], self.values[target])
+            if self._point_mutation(target):
+                # only the head of the expression changes on a point mutation
+                ancestors = self.ancestors(target)
+                offset = self.offset(target, ancestors)
+                mutant = self._head(self.ids[target], self.values[target])
+                self.string = "".join(
+                    [self.string[:offset], mutant, self.string[offset + len(head) :]]
+                )
+                self._propagate(ancestors + [target], len(mutant) - len(head))
+                break  # break on successful mutation
+
+        else:  # else of for loop calls grow on a random node if all other mutation attempts fail
+            target = random.randrange(self.size)
+            mutant_depth_limit = self.hard_limit - self.levels[target]
+            if mutant_depth_limit <= 0:
+                depth = 0
+            else:
+                depth = random.randrange(0, mutant_depth_limit)
+            ids, values = [], []
+            self._generate(
+                self.table.outputs[self.ids[target]], depth, ids, values
+            )
+            self._splice(
+                target,
+                ids,
+                values,
+                self._sizes(ids),
+                self._levels(ids, self.levels[target]),
+                self._lengths(ids, values),
+                self._digests(ids, values),
+                self._expression(ids, values),
+            )
+
+    def _point_mutation(self, position):
+        """
+        Replaces the primitive at a position with another primitive of the
+        same signature following the semantics of Node.mutate
+
+        Args:
+            position: The position of the node to mutate
+
+        Returns:
+            A boolean indicating whether the mutation was successful
+        """
+        table = self.table
+        primitive = self.ids[position]
+        output_type = table.outputs[primitive]
+        if table.arities[primitive]:
+            options = table.internals[output_type]
+        else:
+            options = table.leaves[output_type]
+        input_types = table.inputs[primitive]
+        options = [
+            option
+            for option in options
+            if table.inputs[option] == input_types
+            and (option != primitive or self.values[position] is not None)
+        ]
+        if len(options) == 0:
+            return False
+
+        primitive = random.choice(options)
+        self.ids[position] = primitive
+        self.values[position] = self._literal(primitive)
+        return True
+
+    # Random subtree recombination - intended to be called by a copy of a parent
+    def subtree_recombination(self, mate, limit=None):
+        """
+        Performs a subtree recombination on the calling tree object, choosing
+        only donor subtrees that keep the tree within a depth limit
+
+        Args:
+            mate: The mate tree object to recombine with
+            limit: The maximum depth of the recombined tree, defaults to the
+                hard limit of the calling tree object
+
+        Returns:
+            A boolean indicating whether the recombination was successful
+        """
+        if limit is None:
+            limit = self.hard_limit
+        self.refresh_table()
+        mate.refresh_table()
+        local_types = [self.table.outputs[i] for i in self.ids]
+        mate_types = [mate.table.outputs[i] for i in mate.ids]
+        if not set(local_types) & set(mate_types):
+            print("No matching types for crossover!")
+            return False
+        ends = None
+        if self.depth > limit:
+            ends = [position + size for position, size in enumerate(self.sizes)]
+        choice = self.choose_crossover(
+            local_types, self.levels, mate_types, mate._heights(mate.ids), limit, ends
+        )
+        if choice is None:
+            return False
+        local, donor = choice
+        end = donor + mate.sizes[donor]
+        ids = mate.ids[donor:end]
+        values = mate.values[donor:end]
+        digests = mate.digests[donor:end]
+        if mate.table is not self.table:
+            ids = [
+                self.table.index[mate.table.primitives[primitive]] for primitive in ids
+            ]
+            digests = self._digests(ids, values)
+        offset = self.levels[local] - mate.levels[donor]
+        start = mate.offset(donor)
+        self._splice(
+            local,
+            ids,
+            values,
+            mate.sizes[donor:end],
+            [level + offset for level in mate.levels[donor:end]],
+            mate.lengths[donor:end],
+            digests,
+            mate.string[start : start + mate.lengths[donor]],
+        )
+        return True
+
+    # Returns a string representation of the expression encoded by the GP tree
+    def print_tree(self):
+        """
+        Returns a string representation of the calling tree object
+
+        Returns:
+            A string representation of the calling tree object
+        """
+        return self._expression(self.ids, self.values)
+
+    def _head(self, primitive, value):
+        """
+        Returns the part of the expression of a node that precedes the
+        expressions of its children, following the semantics of Node.head
+
+        Args:
+            primitive: The ID of the primitive of the node
+            value: The literal value of the node
+
+        Returns:
+            The full expression for leaves or the name and opening parenthesis
+        """
+        name = f"{value}" if value is not None else self.table.names[primitive]
+        if self.table.arities[primitive]:
+            return f"{name}("
+        if value is not None:
+            return name
+        return f"{name}(context)"
+
+    def _expression(self, ids, values):
+        """
+        Returns the expression of a prefix sequence
+
+        Args:
+            ids: A sequence of primitive IDs in prefix order
+            values: The literal values of the positions
+
+        Returns:
+            The expression as a string
+        """
+        arities = self.table.arities
+        parts = []
+        pending = []
+        for primitive, value in zip(ids, values):
+            parts.append(self._head(primitive, value))
+            arity = arities[primitive]
+            if arity:
+                pending.append(arity)
+                continue
+
+            # close every argument list completed by this leaf
+            while pending:
+                pending[-1] -= 1
+                if pending[-1]:
+                    parts.append(",")
+                    break
+                pending.pop()
+                parts.append(")")
+        return "".join(parts)
+
+    def to_dict(self):
+        """
+        Returns a dictionary representation of the calling tree object using
+        the same layout as GeneticTree.to_dict
+
+        Returns:
+            A dictionary representation of the calling tree object
+        """
+        return {
+            "roles": self.roles,
+            "output_type": self.output_type,
+            "depthLimit": self.depth_limit,
+            "hardLimit": self.hard_limit,
+            "root": self._node_dict(0),
+        }
+
+    def _node_dict(self, position):
+        """
+        Returns a dictionary representation of the subtree at a position
+
+        Args:
+            position: The position of the subtree root
+        """
+        primitive = self.ids[position]
+        children = []
+        child = position + 1
+        for _ in range(self.table.arities[primitive]):
+            children.append(self._node_dict(child))
+            child += self.sizes[child]
+        return {
+            "func": self.table.names[primitive],
+            "type": self.table.outputs[primitive],
+            "value": self.values[position],
+            "children": children,
+        }
+
+    def identifiers(self):
+        """
+        Returns the IDs of the primitives of the calling tree object in the
+        primitive table of its roles, in prefix order
+
+        Returns:
+            An array of integer primitive IDs
+        """
+        return self.ids
+
+    def to_bytes(self):
+        """
+        Encodes the structure of the calling tree object with the compact
+        binary format of maelstrom.wire
+
+        Returns:
+            The encoded tree as bytes
+        """
+        self.refresh_table()
+        return wire.encode(self.ids, self.values)
+
+    @classmethod
+    def from_bytes(cls, roles, data):
+        """
+        Returns a tree object decoded from the binary format of
+        maelstrom.wire. The primitives of the roles must have been declared
+        in the same way as in the process that encoded the tree.
+
+        Args:
+            roles: A string or tuple of strings representing the roles
+            data: The encoded tree
+
+        Returns:
+            A tree object with the encoded structure
+        """
+        ids, values = wire.decode(data)
+        genotype = cls(roles, cls.primitive_table(roles).outputs[ids[0]])
+        genotype.ids = array("H", ids)
+        genotype.values = values
+        genotype.measure()
+        return genotype
+
+    @classmethod
+    def from_dict(cls, _dict):
+        """
+        Returns a calling tree object from a dictionary representation
+
+        Args:
+            _dict: The dictionary representation of the calling tree object
+
+        Returns:
+            A calling tree object
+        """
+        genotype = cls(_dict["roles"], _dict["output_type"])
+        ids, values = [], []
+        stack = [_dict["root"]]
+        while stack:
+            node = stack.pop()
+            ids.append(
+                genotype.table.lookup(
+                    node["func"],
+                    node["type"],
+                    tuple(child["type"] for child in node["children"]),
+                )
+            )
+            values.append(node["value"])
+            stack.extend(reversed(node["children"]))
+        genotype.ids = array("H", ids)
+        genotype.values = values
+        genotype.initialize(_dict["depthLimit"], _dict["hardLimit"])
+        return genotype
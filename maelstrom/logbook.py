@@ -0,0 +1,301 @@
+"""
+Columnar generation logs with bounded memory
+
+ColumnarLog stores the generation data reported by evaluation functions one
+column per metric, in typed arrays for integer and float metrics (falling
+back to lists for other values), instead of one Python object per entry.
+A rolling window bounds the number of entries kept in memory, and every row
+can be streamed to an append-only CSV file that read_log and read_column
+read back lazily for analysis. The columns of a CSV file are fixed by its
+header, so several islands can append to the same file, telling their rows
+apart through a constant column such as the name of the island.
+"""
+import array
+import csv
+import numbers
+import time
+from collections.abc import Mapping
+
+
+def typecode(value):
+    """
+    Returns the array typecode able to hold a value
+
+    Args:
+        value: A logged value
+
+    Returns:
+        "q" for integers, "d" for other real numbers, or None for values
+        kept in a list
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, numbers.Integral):
+        return "q"
+    if isinstance(value, numbers.Real):
+        return "d"
+    return None
+
+
+def parse_value(text):
+    """
+    Parses a value written to a CSV log
+
+    Args:
+        text: The text of a CSV field
+
+    Returns:
+        An int or float if the text represents one, None for an empty field
+        and the text itself otherwise
+    """
+    if text == "":
+        return None
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+class ColumnarLog(Mapping):
+    """
+    Generation log mapping metric names to the sequence of their values,
+    stored column by column
+    """
+
+    def __init__(self, window=None, path=None, fields=None):
+        """
+        Args:
+            window: The number of most recent entries of every metric kept in
+                memory, defaults to all of them
+            path: A CSV file every appended row is written to, created if
+                needed and appended to otherwise
+            fields: A dictionary of constant columns written in front of the
+                metrics of every row of the CSV file, such as the name of the
+                island, without being kept in memory
+        """
+        self.window = window
+        self.path = path
+        self.fields = fields
+        self.file = None
+        self.writer = None
+        self.header = None
+        self.columns = {}
+        self.counts = {}
+
+    def __getitem__(self, key):
+        column = self.columns[key]
+        if self.window is not None and len(column) > self.window:
+            return column[-self.window :]
+        return column
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __repr__(self):
+        return f"ColumnarLog({self.to_dict()})"
+
+    def to_dict(self):
+        """
+        Returns the values held in memory as plain lists, the layout of the
+        dictionary logs used before columnar storage, which json and pickle
+        handle without this module
+
+        Returns:
+            A dictionary of metric names mapped to lists of values
+        """
+        return {key: list(self[key]) for key in self}
+
+    def count(self, key):
+        """
+        Returns the number of values ever logged for a metric, including
+        those that left the window
+
+        Args:
+            key: The name of the metric
+
+        Returns:
+            The number of values
+        """
+        return self.counts.get(key, 0)
+
+    def tail(self, key, n):
+        """
+        Returns the most recent values of a metric
+
+        Args:
+            key: The name of the metric
+            n: The number of values, at most the number held in memory
+
+        Returns:
+            A list of values
+        """
+        if n <= 0:
+            return []
+        return list(self.columns[key][-n:])
+
+    def add(self, key, value):
+        """
+        Appends a value to the column of a metric
+
+        Args:
+            key: The name of the metric
+            value: The value
+        """
+        column = self.columns.get(key)
+        if column is None:
+            code = typecode(value)
+            column = [] if code is None else array.array(code)
+            self.columns[key] = column
+        try:
+            column.append(value)
+        except (TypeError, OverflowError):
+            # widen integer columns to floats, anything else to a list
+            if column.typecode == "q" and typecode(value) == "d":
+                column = array.array("d", column)
+            else:
+                column = list(column)
+            column.append(value)
+            self.columns[key] = column
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if self.window is not None and len(column) >= 2 * self.window:
+            # trimmed in batches so each value is moved a constant number of
+            # times on average
+            del column[: len(column) - self.window]
+
+    def append(self, row):
+        """
+        Logs the generation data of one generation and writes it to the CSV
+        file if there is one
+
+        Args:
+            row: A dictionary of metric names mapped to their values
+        """
+        for key, value in row.items():
+            self.add(key, value)
+        if self.path is not None:
+            self.write(row)
+
+    def extend(self, columns):
+        """
+        Logs several values per metric, without writing them to the CSV file
+
+        Args:
+            columns: A dictionary of metric names mapped to lists of values
+        """
+        for key, values in columns.items():
+            for value in values:
+                self.add(key, value)
+
+    def write(self, row):
+        """
+        Writes a row to the CSV file. A new file takes the columns of the
+        first row written, an existing file keeps the columns of its header
+        and metrics missing from a row are left empty.
+
+        Args:
+            row: A dictionary of metric names mapped to their values
+
+        Raises:
+            ValueError: If the row has a metric the file has no column for
+        """
+        if self.fields:
+            row = {**self.fields, **row}
+        if self.file is None:
+            if self.header is None:
+                header = list(row)
+                try:
+                    # created exclusively, so only one writer adds a header
+                    with open(self.path, "x", newline="", encoding="utf-8") as file:
+                        csv.writer(file).writerow(header)
+                    self.header = header
+                except FileExistsError:
+                    self.header = read_header(self.path)
+            self.file = open(self.path, "a", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.file, self.header)
+        missing = row.keys() - set(self.header)
+        if missing:
+            raise ValueError(
+                f"log file {self.path} has no columns for {', '.join(sorted(missing))}"
+            )
+        self.writer.writerow(row)
+        # flushed so processes forked later do not inherit buffered rows
+        self.file.flush()
+
+    def close(self):
+        """Closes the CSV file, which is reopened by the next write"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["file"] = None
+        state["writer"] = None
+        return state
+
+
+def read_header(path, timeout=5.0):
+    """
+    Reads the columns of a CSV log, waiting for another process that has
+    just created the file to finish writing its header
+
+    Args:
+        path: The path of the file
+        timeout: The number of seconds to wait for the header
+
+    Raises:
+        ValueError: If the file has no complete header after the timeout
+
+    Returns:
+        The list of column names
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        with open(path, newline="", encoding="utf-8") as file:
+            line = file.readline()
+        if line.endswith("\n"):
+            return next(csv.reader([line]))
+        if time.monotonic() > deadline:
+            raise ValueError(f"log file {path} has no header")
+        time.sleep(0.01)
+
+
+def read_log(path, keys=None):
+    """
+    Reads the rows of a CSV log one at a time
+
+    Args:
+        path: The path of the file
+        keys: The metrics to read, defaults to all of them
+
+    Yields:
+        Dictionaries of metric names mapped to their values
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            if keys is not None:
+                row = {key: row[key] for key in keys}
+            yield {key: parse_value(text) for key, text in row.items()}
+
+
+def read_column(path, key):
+    """
+    Reads every value of one metric of a CSV log
+
+    Args:
+        path: The path of the file
+        key: The name of the metric
+
+    Returns:
+        A typed array of the values if they are all numbers, or a list
+    """
+    column = ColumnarLog()
+    for row in read_log(path, (key,)):
+        column.add(key, row[key])
+    return column.columns.get(key, [])
@@ -2,10 +2,15 @@
 General-purpose GP population class that contains and manages individuals
 """
 import random
-import math
-import statistics
-from collections import OrderedDict
+import heapq
+from maelstrom import checkpoint
+from maelstrom.archive import Archive, ChampionHistory, HallOfFame
+from maelstrom.cache import LRUCache
+from maelstrom.dag import SubtreeDAG
 from maelstrom.genotype import GeneticTree
+from maelstrom.instrumentation import Instrumentation
+from maelstrom import selection
+from maelstrom.selection import vectorized
 # from maelstrom.individual import GeneticProgrammingIndividual
 
 
@@ -15,6 +20,9 @@ class GeneticProgrammingPopulation:
     General-purpose GP population class that contains and manages individuals
     """
 
+    # select from a NumPy array of fitness values when NumPy is installed
+    VECTORIZED = True
+
     def __init__(
         self,
         pop_size,
@@ -30,11 +38,37 @@ class GeneticProgrammingPopulation:
         survival_strategy="plus",
         mutation=0.05,
         genotype=GeneticTree,
+        fitness_cache=None,
+        hall_of_fame_size=None,
+        hall_of_fame_policy="lru",
+        ciao_window=None,
+        archive=None,
         **kwargs,
     ):
         """
         Initializes the population and individuals based on input configuration
         parameters and evaluation function
+
+        Setting fitness_cache to a maximum number of entries enables a cache
+        of fitness values keyed by genome so that unchanged and duplicate
+        genomes are not re-evaluated. This is only sound for deterministic
+        objectives where the fitness of a genome does not depend on the other
+        individuals being evaluated.
+
+        Parent and survival selection methods are resolved by name from the
+        registries of maelstrom.selection, which raise a NameError for
+        unrecognized methods. Keyword arguments such as k_parent and
+        k_survival are passed on to the operators that use them.
+
+        The hall of fame keeps every distinct champion keyed by its genome
+        string and the CIAO history the genome string of the champion of
+        every generation unless hall_of_fame_size bounds the
+        hall of fame (evicting the least recently crowned champion, or the
+        least fit one if hall_of_fame_policy is "worst") and ciao_window
+        bounds the number of recent CIAO champions kept in memory. Setting
+        archive to a file path streams every CIAO champion and every evicted
+        champion to that file as JSON lines, see maelstrom.archive. Islands
+        add the names of the island and population to every record.
         """
         self.population = []
         # self.parameters = parameters
@@ -53,8 +87,26 @@ class GeneticProgrammingPopulation:
         self.survival_strategy = survival_strategy
         self.mutation = mutation
         self.optional_params = kwargs
-        self.hall_of_fame = OrderedDict()
-        self.CIAO = []
+        # selection operators are looked up once instead of on every call
+        self.parent_operator = selection.parent_selection.resolve(parent_selection)
+        self.parent_parameters = self.parent_operator.bind(kwargs)
+        self.survival_operator = selection.unique_selection.resolve(
+            survival_selection
+        )
+        self.survival_parameters = self.survival_operator.bind(kwargs)
+        self.archive = Archive(archive) if archive is not None else None
+        self.hall_of_fame = HallOfFame(
+            hall_of_fame_size, hall_of_fame_policy, self.archive
+        )
+        self.CIAO = ChampionHistory(ciao_window, self.archive)
+        self.fitness_cache = LRUCache(fitness_cache) if fitness_cache else None
+        self.cache_hits = 0
+        # crossovers replaced by mutation because no donor fit the hard limit
+        self.crossover_failures = 0
+        # (population list, size, positions of its fittest individuals)
+        self.ranking_cache = None
+        # replaced by the instrumentation of the island holding the population
+        self.instrumentation = Instrumentation(enabled=False)
 
     def ramped_half_and_half(self, leaf_prob=0.5):
         """
@@ -97,103 +149,9 @@ class GeneticProgrammingPopulation:
         """
         if num_parents == None:
             num_parents = self.num_children
-
-        # Definitions of parent selection algorithms
-        # Note: this can probably be cleaned up and segmented in a better way (maybe with the decorator approach used in genotype)
-        def uniform_random(population, n):
-            return random.choices(population=population, k=n)
-
-        def k_tournament(population, n, k):
-            candidates = [index for index in range(len(population))]
-            winners = []
-            for i in range(n):
-                participants = random.sample(candidates, k)
-                best = max(
-                    [population[participant].fitness for participant in participants]
-                )
-                champion = random.choice(
-                    [
-                        participant
-                        for participant in participants
-                        if best == population[participant].fitness
-                    ]
-                )
-                winners.append(champion)
-            return [population[parent] for parent in winners]
-
-        def fitness_proportional_selection(population, n):
-            fitnesses = [individual.fitness for individual in population]
-            offset = min(fitnesses)
-            offset = min(0, offset)
-            weights = [fitness - offset for fitness in fitnesses]
-            if sum(weights) == 0:
-                weights = [fitness - offset + 0.001 for fitness in fitnesses]
-            return random.choices(population=population, weights=weights, k=n)
-
-        def stochastic_universal_sampling(population, n):
-            fitnesses = [individual.fitness for individual in population]
-            offset = (
-                min(fitnesses) * 1.1
-            )  # multiply the min offset by 10% so the least fit individual has a non-zero chance of selection
-            if offset == 0:
-                offset = (
-                    -0.01
-                )  # mitigates the case where individuals with fitnesss of 0
-            else:
-                offset = min(0, offset)
-            roulette = [fitness - offset for fitness in fitnesses]
-            total = sum(roulette)
-            for i in range(1, len(roulette)):
-                roulette[i] = roulette[i] + roulette[i - 1]
-            roulette = [value / total for value in roulette]
-            parents = []
-            roulette_arm = random.random()
-            arms = [math.fmod(roulette_arm + (i / n), 1.0) for i in range(n)]
-            arms.sort()
-            pop_index = 0
-            for arm in arms:
-                if arm <= roulette[pop_index]:
-                    parents.append(population[pop_index])
-                else:
-                    pop_index += 1
-            random.shuffle(parents)
-            return parents
-
-        def overselection(population, n, bias=0.8, partition=10):
-            if partition > len(population) or partition < 0:
-                partition = math.round(0.1 * len(population))
-            elites = math.round(bias * len(population))
-            candidates = sorted(
-                population, key=lambda individual: individual.fitness, reverse=True
-            )
-            parents = []
-            for i in range(n):
-                if i <= elites and partition > 0:
-                    parents.append(random.choice(candidates[:partition]))
-                else:
-                    parents.append(random.choice(candidates[partition:]))
-            random.shuffle(parents)
-            return parents
-
-        # Actual selection execution
-        if self.parent_selection == "k_tournament":
-            return k_tournament(
-                self.population, num_parents, self.optional_params["k_parent"]
-            )
-        elif self.parent_selection == "FPS":
-            return fitness_proportional_selection(self.population, num_parents)
-        elif self.parent_selection == "SUS":
-            return stochastic_universal_sampling(self.population, num_parents)
-        elif self.parent_selection == "overselection":
-            bias = self.optional_params.get("overselection_bias", 0.8)
-            partition = self.optional_params.get("overselection_partition", 10)
-            return overselection(self.population, num_parents, bias, partition)
-        elif self.parent_selection == "uniform":
-            return uniform_random(self.population, num_parents)
-        else:
-            raise NameError(
-                f"unrecognized parent selection method: {self.parent_selection}"
-            )
+        return self.apply_selection(
+            self.parent_operator, num_parents, self.parent_parameters
+        )
 
     # Generate children through the selection of parents, recombination or mutation of parents to form children, then the migration of children
     # into the primary population depending on survival strategy
@@ -214,21 +172,24 @@ class GeneticProgrammingPopulation:
             num_parents = max(0, self.num_children - len(imports))
         parents = self.select_parents(num_parents)
         children = [parent.copy() for parent in parents]
+        failures = 0
         for i in range(len(children)):
             if random.random() <= self.mutation:
                 children[i].subtree_mutation()
-            else:
-                children[i].subtree_recombination(
-                    children[(i + 1) % len(children)]
-                )
-                while children[i].depth > self.hard_limit:
-                    children[i] = parents[i].copy()
-                    children[i].subtree_recombination(
-                        children[(i + 1) % len(children)]
-                    )
+            # only donors that keep the child within the hard limit are chosen
+            elif not children[i].subtree_recombination(
+                children[(i + 1) % len(children)], self.hard_limit
+            ):
+                # no donor fits at any point, so the child is mutated instead
+                failures += 1
+                children[i].subtree_mutation()
 
         if imports != None:
             children.extend([migrant.copy() for migrant in imports])
+        self.ranking_cache = None
+        self.crossover_failures += failures
+        self.instrumentation.count("copies", len(children))
+        self.instrumentation.count("crossover_failures", failures)
 
         if self.survival_strategy == "comma":
             self.population = children
@@ -240,25 +201,16 @@ class GeneticProgrammingPopulation:
     def select_survivors(self):
         """
         Selects survivors for the next generation
-
-        Raises:
-            NameError: If the survival selection method is unrecognized
         """
-        if self.survival_selection == "k_tournament":
-            self.population = self.select_unique(
-                n=self.pop_size,
-                method="tournament",
-                k=self.optional_params["k_survival"],
-            )
-        elif self.survival_selection == "FPS":
-            self.population = self.select_unique(n=self.pop_size, method="FPS")
-        elif self.survival_selection == "uniform":
-            self.population = self.select_unique(n=self.pop_size, method="uniform")
-        elif self.survival_selection == "truncation":
-            self.population = self.select_unique(n=self.pop_size, method="truncation")
-        else:
-            raise NameError(
-                f"unrecognized survival selection method: {self.survival_selection}"
+        self.population = self.apply_selection(
+            self.survival_operator, self.pop_size, self.survival_parameters
+        )
+        if self.survival_operator.ranked:
+            # survivors are already ordered from fittest to least fit
+            self.ranking_cache = (
+                self.population,
+                len(self.population),
+                list(range(len(self.population))),
             )
 
     # TODO: implement more termination methods
@@ -271,26 +223,60 @@ class GeneticProgrammingPopulation:
         """
         return self.eval_limit is not None and self.evals >= self.eval_limit
 
-    def update_hall_of_fame(self):
+    def apply_fitness_cache(self):
         """
-        Updates the hall of fame with the best individual in the population
+        Assigns cached fitness values and narrows the population down to the
+        unique genomes that still need to be evaluated. Must be followed by
+        restore_fitness_cache once evaluation is done.
+
+        Returns:
+            A tuple of the full population and the dictionary of pending
+            genomes, or None if the fitness cache is disabled
         """
-        best_individual = 0
-        best_fitness = self.population[best_individual].fitness
+        if self.fitness_cache is None:
+            return None
+        full = self.population
+        pending = {}
+        for individual in full:
+            fitness = self.fitness_cache.get(individual.genome_key())
+            if fitness is not None:
+                individual.fitness = fitness
+                self.cache_hits += 1
+            elif individual in pending:
+                self.cache_hits += 1  # duplicate of a genome already pending
+            else:
+                pending[individual] = individual
+        self.population = list(pending)
+        return full, pending
 
-        for i in range(len(self.population)):
-            if self.population[i].fitness > best_fitness:
-                best_individual = i
-        key = self.population[best_individual].string
-        self.CIAO.append(key)
-        if key in self.hall_of_fame:
-            self.hall_of_fame.move_to_end(key)
+    def restore_fitness_cache(self, state):
+        """
+        Stores the fitness of freshly evaluated genomes, copies it to their
+        duplicates and restores the full population
+
+        Args:
+            state: The value returned by apply_fitness_cache
+        """
+        self.ranking_cache = None  # evaluation has changed fitness values
+        if state is None:
             return
-        else:
-            self.hall_of_fame[key] = self.population[best_individual].copy()
+        full, pending = state
+        for individual in self.population:
+            if individual.fitness is not None:
+                self.fitness_cache.put(individual.genome_key(), individual.fitness)
+        for individual in full:
+            if individual in pending:
+                individual.fitness = pending[individual].fitness
+        self.population = full
+
+    def update_hall_of_fame(self):
+        """
+        Updates the hall of fame with the best individual in the population
+        """
+        best_individual = self.population[self.ranking(1)[0]]
+        self.CIAO.append(self.hall_of_fame.crown(best_individual))
 
     # Selection of unique individuals for survival and migration
-    # Note: this can probably be cleaned up and segmented in a better way (maybe with the decorator approach used in genotype)
     def select_unique(self, n, method="uniform", k=5):
         """
         Selects n unique individuals from the population
@@ -307,98 +293,137 @@ class GeneticProgrammingPopulation:
             List of unique individuals
         """
 
-        # Definition of selection methods
-        def uniform_random(population, n):
-            return random.sample(population, n)
-
-        def k_tournament(population, n, k):
-            candidates = {index for index in range(len(population))}
-            winners = []
-            for i in range(n):
-                participants = random.sample(list(candidates), k)
-                best = max(
-                    population[participant].fitness for participant in participants
-                )
-                champion = random.choice(
-                    [
-                        participant
-                        for participant in participants
-                        if best == population[participant].fitness
-                    ]
-                )
-                candidates.remove(champion)
-                winners.append(champion)
-            return [population[survivor] for survivor in winners]
-
-        def fitness_proportional_selection(population, n):
-            offset = (
-                min(individual.fitness for individual in population) * 1.1
-            )  # multiply the min offset by 10% so the least fit individual isn't guaranteed to die
-            if offset == 0:
-                offset = (
-                    -0.01
-                )  # mitigates some deterministic behaviors of random.choices when all weights are 0 and avoids guaranteed death
-            else:
-                offset = min(0, offset)
-            candidates = {index for index in range(len(population))}
-            winners = []
-            for i in range(n):
-                champion = random.choices(
-                    population=list(candidates),
-                    weights=[
-                        population[individual].fitness - offset
-                        for individual in candidates
-                    ],
-                )
-                candidates.remove(champion[0])
-                winners.append(champion[0])
-            return [population[survivor] for survivor in winners]
-
-        def truncation(population, n):
-            return sorted(
-                population, key=lambda individual: individual.fitness, reverse=True
-            )[:n]
-
-        def normal_selection(population, n):
-            candidates = {index for index in range(len(population))}
-            winners = []
-            for i in range(n):
-                fitnesses = [
-                    population[individual].fitness for individual in candidates
-                ]
-                avg = statistics.mean(fitnesses)
-                dev = statistics.stdev(fitnesses)
-                if fitnesses.count(0) == len(fitnesses):
-                    weights = None
-                else:
-                    weights = [
-                        dev / abs(avg - (population[individual].fitness * 1.00001))
-                        for individual in candidates
-                    ]
-                champion = random.choices(population=list(candidates), weights=weights)
-                candidates.remove(champion[0])
-                winners.append(champion[0])
-            return [population[survivor] for survivor in winners]
-
         # Execution of selection method
         if n > len(self.population):
             print("selectUnique: requested too many individuals")
             return
 
-        if method == "tournament":
-            return k_tournament(self.population, n, k)
-        if method == "FPS":
-            return fitness_proportional_selection(self.population, n)
-        if method == "uniform" or method == "random":
-            return uniform_random(self.population, n)
-        if method == "normal":
-            return normal_selection(self.population, n)
-
-        if method != "truncation" and method != "best":
+        operator = selection.unique_selection.get(method)
+        if operator is None:
             print(
                 f"unknown survival selection parameter '{method}' defaulting to truncation"
             )
-        return truncation(self.population, n)
+            operator = selection.unique_selection["truncation"]
+        parameters = {"k": k} if "k" in operator.parameters else {}
+        return self.apply_selection(operator, n, parameters)
+
+    def apply_selection(self, operator, n, parameters):
+        """
+        Selects n individuals from the population with a selection operator,
+        using its vectorized implementation when NumPy is available
+
+        Args:
+            operator: A SelectionOperator from maelstrom.selection
+            n: Number of individuals to select
+            parameters: A dictionary of keyword arguments for the operator
+
+        Returns:
+            List of selected individuals
+        """
+        if operator.ranked:
+            return [self.population[index] for index in self.ranking(n)]
+        if self.VECTORIZED and operator.vectorized is not None:
+            fitness = vectorized.fitness_array(self.population)
+            if fitness is not None:
+                positions = operator.vectorized(
+                    fitness, n, vectorized.generator(), **parameters
+                )
+                return [self.population[index] for index in positions.tolist()]
+        return operator.function(self.population, n, **parameters)
+
+    def ranking(self, n=None):
+        """
+        Returns the positions of the n fittest individuals, fittest first and
+        ties in population order. Only the requested prefix is computed, and
+        it is reused until the population or its fitness values change, so
+        survivor selection, champions, migrants and the hall of fame share a
+        single ranking per generation.
+
+        Args:
+            n: Number of positions to return. Defaults to the whole population.
+
+        Returns:
+            List of positions in the population
+        """
+        size = len(self.population)
+        n = size if n is None else min(n, size)
+        cached = self.ranking_cache
+        if (
+            cached is None
+            or cached[0] is not self.population
+            or cached[1] != size
+            or len(cached[2]) < n
+        ):
+            fitness = (
+                vectorized.fitness_array(self.population) if self.VECTORIZED else None
+            )
+            if fitness is not None:
+                positions = vectorized.truncation(fitness, n).tolist()
+            else:
+                population = self.population
+                positions = heapq.nlargest(
+                    n, range(size), key=lambda index: population[index].fitness
+                )
+            cached = self.ranking_cache = (self.population, size, positions)
+        return cached[2][:n]
+
+    def assign_fitness(self, fitnesses):
+        """
+        Assigns fitness values to the individuals of the population in bulk
+
+        Args:
+            fitnesses: A sequence of fitness values, in population order
+        """
+        for individual, fitness in zip(self.population, fitnesses):
+            individual.fitness = fitness
+        self.ranking_cache = None
+
+    def execute_shared(self, contexts):
+        """
+        Executes every individual on a list of contexts, computing subtrees
+        shared between individuals only once per context, which assumes every
+        primitive is a pure function of its inputs and the context
+
+        Args:
+            contexts: A list of context dictionaries
+
+        Returns:
+            A list with the list of results of every individual, in
+            population order
+        """
+        dag = SubtreeDAG(self.population)
+        results = dag.execute_all(contexts)
+        return [list(column) for column in zip(*results)]
+
+    def checkpoint(self, path):
+        """
+        Writes a checkpoint of the population, including its individuals,
+        fitness values, hall of fame and the state of the random module
+
+        Args:
+            path: The path of the checkpoint file
+        """
+        checkpoint.save(self, path)
+
+    @classmethod
+    def resume(cls, path, restore_random=True):
+        """
+        Loads a population from a checkpoint
+
+        Args:
+            path: The path of the checkpoint file
+            restore_random: Whether to restore the state of the random module
+
+        Raises:
+            TypeError: If the checkpoint does not hold a population
+
+        Returns:
+            The population
+        """
+        population = checkpoint.load(path, restore_random)
+        if not isinstance(population, cls):
+            raise TypeError(f"checkpoint does not hold a {cls.__name__}")
+        return population
 
     def build(self):
         """Builds the population by calling the build method of each individual"""
@@ -0,0 +1,115 @@
+"""Weighted sampling structures used by selection methods"""
+import random
+
+
+class SumTree:
+    """
+    Fenwick tree over non-negative weights supporting weight updates and
+    weighted draws in O(log n)
+    """
+
+    def __init__(self, weights):
+        """
+        Args:
+            weights: A sequence of non-negative weights
+        """
+        self.size = len(weights)
+        self.weights = list(weights)
+        self.tree = [0.0] + self.weights
+        for index in range(1, self.size + 1):
+            parent = index + (index & -index)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[index]
+        self.step = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def __len__(self):
+        return self.size
+
+    def total(self):
+        """
+        Returns the sum of all weights
+
+        Returns:
+            The total weight
+        """
+        total = 0.0
+        index = self.size
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def update(self, index, weight):
+        """
+        Sets the weight of an item
+
+        Args:
+            index: The position of the item
+            weight: The new non-negative weight
+        """
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def find(self, value):
+        """
+        Returns the item whose cumulative weight interval contains a value
+
+        Args:
+            value: A number between 0 and the total weight
+
+        Returns:
+            The position of the item
+        """
+        position = 0
+        step = self.step
+        while step:
+            following = position + step
+            if following <= self.size and self.tree[following] <= value:
+                position = following
+                value -= self.tree[following]
+            step >>= 1
+        return min(position, self.size - 1)
+
+    def draw(self):
+        """
+        Draws an item with probability proportional to its weight
+
+        Returns:
+            The position of the item
+        """
+        total = self.total()
+        if total <= 0:
+            raise ValueError("Total of weights must be greater than zero")
+        while True:
+            index = self.find(random.random() * total)
+            # rounding can land on an item whose weight was zeroed
+            if self.weights[index] > 0:
+                return index
+            total = self.total()
+
+
+def sample_without_replacement(weights, n):
+    """
+    Draws n distinct positions, each draw proportional to the weights of the
+    positions that have not been drawn yet, in O((len(weights) + n) log
+    len(weights)). This matches repeated random.choices calls on the
+    remaining positions.
+
+    Args:
+        weights: A sequence of positive weights
+        n: The number of positions to draw
+
+    Returns:
+        A list of n positions in the order they were drawn
+    """
+    tree = SumTree(weights)
+    drawn = []
+    for _ in range(n):
+        index = tree.draw()
+        tree.update(index, 0.0)
+        drawn.append(index)
+    return drawn
@@ -0,0 +1,149 @@
+"""
+Registries of selection operators
+
+Selection methods are registered by name with a decorator and resolved once
+when a population is constructed, so a population dispatches straight to its
+configured operators. Parent selection draws with replacement, unique
+selection (used for survival and migration) draws without replacement:
+
+    from maelstrom.selection import parent_selection
+
+    @parent_selection.register("lexicase")
+    def lexicase(population, n):
+        ...
+
+Operators receive the list of individuals and the number to select and
+return the selected individuals. An operator can also register a vectorized
+implementation that receives a NumPy array of fitness values, the number to
+select and a NumPy random generator, and returns the selected positions; it
+is used in place of the list implementation when NumPy is installed.
+"""
+
+
+class SelectionOperator:
+    """
+    A registered selection method and its optional vectorized implementation
+    """
+
+    def __init__(self, name, function, parameters=None, ranked=False):
+        """
+        Args:
+            name: The name the operator is registered under
+            function: The selection function operating on individuals
+            parameters: A dictionary mapping keyword arguments of the
+                operator to the population keyword arguments supplying them
+            ranked: Whether the operator selects the fittest individuals in
+                order, so it can be served from the ranking of the population
+        """
+        self.name = name
+        self.function = function
+        self.vectorized = None
+        self.parameters = {} if parameters is None else parameters
+        self.ranked = ranked
+
+    def bind(self, options):
+        """
+        Collects the keyword arguments of the operator from the keyword
+        arguments of a population
+
+        Args:
+            options: A dictionary of population keyword arguments
+
+        Returns:
+            A dictionary of keyword arguments for the operator
+        """
+        return {
+            keyword: options[option]
+            for keyword, option in self.parameters.items()
+            if option in options
+        }
+
+    def __repr__(self):
+        return f"SelectionOperator({self.name!r})"
+
+
+class SelectionRegistry(dict):
+    """
+    Selection operators of one kind keyed by name
+    """
+
+    def __init__(self, kind):
+        """
+        Args:
+            kind: The kind of selection, used in error messages
+        """
+        super().__init__()
+        self.kind = kind
+
+    def register(self, name, aliases=(), parameters=None, ranked=False):
+        """
+        Defines a decorator that registers a selection function under a name
+
+        Args:
+            name: The name of the selection method
+            aliases: Other names the method can be configured with
+            parameters: A dictionary mapping keyword arguments of the
+                function to the population keyword arguments supplying them
+            ranked: Whether the function selects the fittest individuals in
+                order
+
+        Returns:
+            The decorator
+        """
+
+        def add_operator(func):
+            """
+            The decorator function that captures the selection function
+            """
+            operator = SelectionOperator(name, func, parameters, ranked)
+            for key in (name, *aliases):
+                self[key] = operator
+            return func
+
+        return add_operator
+
+    def register_vectorized(self, name):
+        """
+        Defines a decorator that registers a vectorized implementation of an
+        already registered selection method
+
+        Args:
+            name: The name of the selection method
+
+        Returns:
+            The decorator
+        """
+        operator = self.resolve(name)
+
+        def add_vectorized(func):
+            """
+            The decorator function that captures the vectorized implementation
+            """
+            operator.vectorized = func
+            return func
+
+        return add_vectorized
+
+    def resolve(self, name):
+        """
+        Looks up a selection operator
+
+        Args:
+            name: The name of the selection method
+
+        Raises:
+            NameError: If no operator is registered under the name
+
+        Returns:
+            The SelectionOperator
+        """
+        if name not in self:
+            raise NameError(f"unrecognized {self.kind} selection method: {name}")
+        return self[name]
+
+
+parent_selection = SelectionRegistry("parent")
+unique_selection = SelectionRegistry("survival")
+
+# importing the built-in operators registers them
+from maelstrom.selection import parent, unique, vectorized  # noqa: E402,F401
@@ -1,6 +1,14 @@
+import math
+import random
+
+from maelstrom.selection import parent_selection
+
+
+@parent_selection.register("uniform")
 def uniform_random(population, n):
     return random.choices(population=population, k=n)
 
+@parent_selection.register("k_tournament", parameters={"k": "k_parent"})
 def k_tournament(population, n, k):
     candidates = [index for index in range(len(population))]
     winners = []
@@ -19,6 +27,7 @@ def k_tournament(population, n, k):
         winners.append(champion)
     return [population[parent] for parent in winners]
 
+@parent_selection.register("FPS")
 def fitness_proportional_selection(population, n):
     fitnesses = [individual.fitness for individual in population]
     offset = min(fitnesses)
@@ -28,6 +37,7 @@ def fitness_proportional_selection(population, n):
         weights = [fitness - offset + 0.001 for fitness in fitnesses]
     return random.choices(population=population, weights=weights, k=n)
 
+@parent_selection.register("SUS")
 def stochastic_universal_sampling(population, n):
     fitnesses = [individual.fitness for individual in population]
     offset = (
@@ -50,17 +60,23 @@ def stochastic_universal_sampling(population, n):
     arms.sort()
     pop_index = 0
     for arm in arms:
-        if arm <= roulette[pop_index]:
-            parents.append(population[pop_index])
-        else:
+        while arm > roulette[pop_index] and pop_index < len(roulette) - 1:
             pop_index += 1
+        parents.append(population[pop_index])
     random.shuffle(parents)
     return parents
 
+@parent_selection.register(
+    "overselection",
+    parameters={
+        "bias": "overselection_bias",
+        "partition": "overselection_partition",
+    },
+)
 def overselection(population, n, bias=0.8, partition=10):
     if partition > len(population) or partition < 0:
-        partition = math.round(0.1 * len(population))
-    elites = math.round(bias * len(population))
+        partition = round(0.1 * len(population))
+    elites = round(bias * len(population))
     candidates = sorted(
         population, key=lambda individual: individual.fitness, reverse=True
     )
@@ -71,4 +87,4 @@ def overselection(population, n, bias=0.8, partition=10):
         else:
             parents.append(random.choice(candidates[partition:]))
     random.shuffle(parents)
-    return parents
\ No newline at end of file
+    return parents
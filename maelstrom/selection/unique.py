@@ -1,14 +1,24 @@
+import random
+from bisect import bisect_left, bisect_right
+
+from maelstrom.sampling import SumTree, sample_without_replacement
+from maelstrom.selection import unique_selection
+
+
+@unique_selection.register("uniform", aliases=("random",))
 def uniform_random(population, n):
     assert n <= len(population)
     return random.sample(population, n)
 
-def k_tournament(population, n, k):
+@unique_selection.register(
+    "tournament", aliases=("k_tournament",), parameters={"k": "k_survival"}
+)
+def k_tournament(population, n, k=5):
     assert n <= len(population)
-    assert len(population)-n <= k
     candidates = {index for index in range(len(population))}
     winners = []
     for i in range(n):
-        participants = random.sample(list(candidates), k)
+        participants = random.sample(list(candidates), min(k, len(candidates)))
         best = max(
             population[participant].fitness for participant in participants
         )
@@ -23,6 +33,7 @@ def k_tournament(population, n, k):
         winners.append(champion)
     return [population[survivor] for survivor in winners]
 
+@unique_selection.register("FPS")
 def fitness_proportional_selection(population, n):
     assert n <= len(population)
     offset = (
@@ -34,20 +45,13 @@ def fitness_proportional_selection(population, n):
         )  # mitigates some deterministic behaviors of random.choices when all weights are 0 and avoids guaranteed death
     else:
         offset = min(0, offset)
-    candidates = {index for index in range(len(population))}
-    winners = []
-    for i in range(n):
-        champion = random.choices(
-            population=list(candidates),
-            weights=[
-                population[individual].fitness - offset
-                for individual in candidates
-            ],
-        )
-        candidates.remove(champion[0])
-        winners.append(champion[0])
+    # each draw is proportional to the weights of the remaining candidates
+    winners = sample_without_replacement(
+        [individual.fitness - offset for individual in population], n
+    )
     return [population[survivor] for survivor in winners]
 
+@unique_selection.register("truncation", aliases=("best",), ranked=True)
 def truncation(population, n, copy=False):
     assert n <= len(population)
     if copy:
@@ -59,24 +63,75 @@ def truncation(population, n, copy=False):
             population, key=lambda individual: individual.fitness, reverse=True
         )[:n]
 
+# rebuild the sum tree of normal selection once this many candidates lie
+# close enough to the mean to be weighed exactly
+NEAR_CANDIDATES = 32
+
+
+@unique_selection.register("normal")
 def normal_selection(population, n):
     assert n <= len(population)
-    candidates = {index for index in range(len(population))}
+    # the weight of a candidate is the inverse of its distance to the mean of
+    # the remaining candidates, so every draw changes every weight. Draws are
+    # made by rejection from a sum tree of the weights around a reference
+    # mean: candidates farther from the current mean than twice its drift
+    # from the reference are accepted with the ratio of their current and
+    # stored weights, which is at most 1.5, and closer candidates are weighed
+    # exactly. The standard deviation scales every weight alike, so it does
+    # not change the selection probabilities and is left out.
+    fitnesses = [individual.fitness for individual in population]
+    scaled = [fitness * 1.00001 for fitness in fitnesses]
+    candidates = sorted(zip(scaled, range(len(population))))
+    keys = [value for value, _ in candidates]
+    total = sum(fitnesses)
+    zeros = fitnesses.count(0)
+    tree = None
     winners = []
     for i in range(n):
-        fitnesses = [
-            population[individual].fitness for individual in candidates
-        ]
-        avg = statistics.mean(fitnesses)
-        dev = statistics.stdev(fitnesses)
-        if fitnesses.count(0) == len(fitnesses):
-            weights = None
+        remaining = len(candidates)
+        avg = total / remaining
+        if zeros == remaining or remaining == 1:
+            champion = random.choice(candidates)[1]
         else:
-            weights = [
-                dev / abs(avg - (population[individual].fitness * 1.00001))
-                for individual in candidates
-            ]
-        champion = random.choices(population=list(candidates), weights=weights)
-        candidates.remove(champion[0])
-        winners.append(champion[0])
-    return [population[survivor] for survivor in winners]
\ No newline at end of file
+            if tree is not None:
+                drift = abs(avg - reference)
+                low = bisect_left(keys, avg - 2 * drift)
+                high = bisect_right(keys, avg + 2 * drift)
+            if tree is None or high - low > NEAR_CANDIDATES:
+                reference, drift = avg, 0.0
+                weights = [0.0] * len(population)
+                for value, index in candidates:
+                    weights[index] = 1 / abs(reference - value)
+                tree = SumTree(weights)
+                low = bisect_left(keys, avg)
+                high = bisect_right(keys, avg)
+            near = candidates[low:high]
+            near_weights = [1 / abs(avg - value) for value, _ in near]
+            exact = sum(near_weights)
+            bound = 1.5 if drift else 1.0
+            envelope = bound * tree.total()
+            while True:
+                if random.random() * (exact + envelope) < exact:
+                    champion = random.choices(near, weights=near_weights)[0][1]
+                    break
+                champion = tree.draw()
+                value = scaled[champion]
+                if abs(avg - value) <= 2 * drift:
+                    continue  # close candidates are only drawn exactly
+                ratio = abs(reference - value) / abs(avg - value)
+                if random.random() * bound < ratio:
+                    break
+        winners.append(champion)
+        position = bisect_left(candidates, (scaled[champion], champion))
+        del candidates[position]
+        del keys[position]
+        total -= fitnesses[champion]
+        if fitnesses[champion] == 0:
+            zeros -= 1
+        if tree is not None:
+            removed = tree.weights[champion]
+            tree.update(champion, 0.0)
+            # subtracting a dominant weight loses the precision of the rest
+            if removed > tree.total():
+                tree = None
+    return [population[survivor] for survivor in winners]
@@ -0,0 +1,224 @@
+"""
+Vectorized selection over a fitness array
+
+Every method takes a one-dimensional NumPy array with the fitness of the
+population, a number of individuals to select and a NumPy random generator,
+and returns an array of selected indices. Parent selection draws all
+parents at once. Survival selection without replacement is batched where
+the sequential definition allows it: unique fitness proportional selection
+uses Efraimidis-Spirakis keys, which match successive weighted draws from
+the remaining candidates, and truncation partitions the array and sorts only
+the selected prefix. Unique tournaments and normal selection depend on the
+candidates removed by earlier draws and stay sequential, reading fitness from
+the array.
+
+The functions are registered as the vectorized implementations of the
+operators of maelstrom.selection.
+"""
+import random
+
+from maelstrom.selection import parent_selection, unique_selection
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is an optional dependency
+    np = None
+
+
+def generator():
+    """
+    Returns a NumPy random generator seeded from the random module, so runs
+    seeded with random.seed stay reproducible
+
+    Returns:
+        A numpy.random.Generator
+    """
+    return np.random.default_rng(random.getrandbits(64))
+
+
+def fitness_array(population):
+    """
+    Collects the fitness of a population into a contiguous array
+
+    Args:
+        population: A list of individuals
+
+    Returns:
+        A float array of fitness values, or None if NumPy is not installed or
+        fitness values are not real numbers
+    """
+    if np is None:
+        return None
+    try:
+        return np.fromiter(
+            (individual.fitness for individual in population),
+            dtype=float,
+            count=len(population),
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+# parent selection, with replacement
+
+
+@parent_selection.register_vectorized("uniform")
+def uniform_random(fitness, n, rng):
+    return rng.integers(0, len(fitness), size=n)
+
+
+@parent_selection.register_vectorized("k_tournament")
+def k_tournament(fitness, n, rng, k):
+    size = len(fitness)
+    if k > size:
+        raise ValueError("Sample larger than population")
+    if 2 * k > size:
+        # k distinct participants per tournament from random permutations
+        participants = np.argsort(rng.random((n, size)), axis=1)[:, :k]
+    else:
+        # k distinct participants per tournament, rows with repeats are redrawn
+        participants = rng.integers(0, size, size=(n, k))
+        while k > 1:
+            ordered = np.sort(participants, axis=1)
+            repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+            if not repeated.any():
+                break
+            participants[repeated] = rng.integers(
+                0, size, size=(repeated.sum(), k)
+            )
+    scores = fitness[participants]
+    # ties for the best fitness are broken uniformly at random
+    best = scores == scores.max(axis=1, keepdims=True)
+    winners = np.argmax(best * rng.random((n, k)) + best, axis=1)
+    return participants[np.arange(n), winners]
+
+
+@parent_selection.register_vectorized("FPS")
+def fitness_proportional_selection(fitness, n, rng):
+    weights = fitness - min(0, fitness.min())
+    if weights.sum() == 0:
+        weights = weights + 0.001
+    cumulative = np.cumsum(weights)
+    indices = np.searchsorted(cumulative, rng.random(n) * cumulative[-1], side="right")
+    return np.minimum(indices, len(fitness) - 1)
+
+
+@parent_selection.register_vectorized("SUS")
+def stochastic_universal_sampling(fitness, n, rng):
+    offset = fitness.min() * 1.1  # the least fit individual keeps a chance
+    offset = -0.01 if offset == 0 else min(0, offset)
+    roulette = np.cumsum(fitness - offset)
+    roulette /= roulette[-1]
+    arms = np.sort(np.fmod(rng.random() + np.arange(n) / n, 1.0))
+    indices = np.minimum(np.searchsorted(roulette, arms), len(fitness) - 1)
+    rng.shuffle(indices)
+    return indices
+
+
+@parent_selection.register_vectorized("overselection")
+def overselection(fitness, n, rng, bias=0.8, partition=10):
+    size = len(fitness)
+    if partition > size or partition < 0:
+        partition = round(0.1 * size)
+    elites = round(bias * size)
+    ranking = np.argsort(-fitness, kind="stable")
+    # the first elites + 1 draws come from the top partition, the rest from
+    # the remainder of the ranking
+    top = np.arange(n) <= elites if partition > 0 else np.zeros(n, dtype=bool)
+    indices = np.empty(n, dtype=int)
+    indices[top] = rng.integers(0, partition, size=top.sum())
+    indices[~top] = rng.integers(partition, size, size=n - top.sum())
+    indices = ranking[indices]
+    rng.shuffle(indices)
+    return indices
+
+
+# survival selection, without replacement
+
+
+@unique_selection.register_vectorized("uniform")
+def unique_uniform_random(fitness, n, rng):
+    return rng.choice(len(fitness), size=n, replace=False)
+
+
+@unique_selection.register_vectorized("tournament")
+def unique_k_tournament(fitness, n, rng, k=5):
+    values = fitness.tolist()
+    candidates = list(range(len(values)))
+    positions = list(range(len(values)))
+    winners = np.empty(n, dtype=int)
+    for i in range(n):
+        participants = random.sample(candidates, min(k, len(candidates)))
+        best = max(values[participant] for participant in participants)
+        champion = random.choice(
+            [
+                participant
+                for participant in participants
+                if values[participant] == best
+            ]
+        )
+        # swap with the last candidate so removal is O(1)
+        last = candidates[-1]
+        candidates[positions[champion]] = last
+        positions[last] = positions[champion]
+        candidates.pop()
+        winners[i] = champion
+    return winners
+
+
+@unique_selection.register_vectorized("FPS")
+def unique_fitness_proportional_selection(fitness, n, rng):
+    offset = fitness.min() * 1.1  # the least fit individual isn't guaranteed to die
+    offset = -0.01 if offset == 0 else min(0, offset)
+    # Efraimidis-Spirakis: the n largest keys u ** (1 / w), compared through
+    # their logarithms, are distributed as n successive weighted draws
+    keys = np.log(rng.random(len(fitness))) / (fitness - offset)
+    return np.argsort(-keys, kind="stable")[:n]
+
+
+@unique_selection.register_vectorized("truncation")
+def truncation(fitness, n, rng=None):
+    size = len(fitness)
+    if n >= size:
+        return np.argsort(-fitness, kind="stable")
+    if n <= 0:
+        return np.empty(0, dtype=int)
+    # partition around the n-th largest value and sort only the prefix,
+    # keeping ties in population order like a stable sort
+    threshold = np.partition(fitness, size - n)[size - n]
+    above = np.flatnonzero(fitness > threshold)
+    above = above[np.argsort(-fitness[above], kind="stable")]
+    ties = np.flatnonzero(fitness == threshold)[: n - len(above)]
+    return np.concatenate((above, ties))
+
+
+@unique_selection.register_vectorized("normal")
+def unique_normal_selection(fitness, n, rng):
+    size = len(fitness)
+    alive = np.ones(size, dtype=bool)
+    total = fitness.sum()
+    zeros = int((fitness == 0).sum())
+    scaled = fitness * 1.00001
+    weights = np.empty(size)
+    winners = np.empty(n, dtype=int)
+    for i in range(n):
+        remaining = size - i
+        if zeros == remaining or remaining == 1:
+            np.copyto(weights, alive)
+        else:
+            # the standard deviation scales every weight alike and is left out
+            weights.fill(0)
+            distances = np.abs(total / remaining - scaled)
+            np.divide(1, distances, out=weights, where=alive)
+        cumulative = np.cumsum(weights)
+        value = rng.random() * cumulative[-1]
+        champion = int(np.searchsorted(cumulative, value, side="right"))
+        champion = min(champion, size - 1)
+        while not alive[champion]:
+            champion -= 1  # rounding landed past the last remaining candidate
+        alive[champion] = False
+        total -= fitness[champion]
+        if fitness[champion] == 0:
+            zeros -= 1
+        winners[i] = champion
+    return winners
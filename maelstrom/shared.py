@@ -0,0 +1,234 @@
+"""
+Shared-memory evaluation of populations
+
+The genomes of a population are encoded with maelstrom.wire into a single
+multiprocessing.shared_memory block, followed by a float array receiving one
+fitness value per genome. Pool workers attach to the block by name, decode
+the genomes they are assigned straight from the shared buffer and write their
+fitness in place, so neither individuals nor fitness values are pickled.
+
+Block layout, in native byte order:
+    count               unsigned 64-bit integer
+    offsets[count + 1]  unsigned 64-bit start of every genome in the data
+    fitness[count]      double fitness of every genome, NaN until evaluated
+    data                concatenated wire encodings of the genomes
+"""
+import math
+import os
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+WORD = 8  # size of the count, offsets and fitness entries in bytes
+
+# before Python 3.13, attaching to a block registers it with the resource
+# tracker, which destroys registered blocks when the process exits
+TRACKED_ATTACH = sys.version_info < (3, 13)
+
+
+def tracked_name(memory):
+    """
+    Returns the name a shared memory block is registered under with the
+    resource tracker, which keeps the leading slash of POSIX names
+
+    Args:
+        memory: The SharedMemory object
+
+    Returns:
+        The registered name
+    """
+    if os.name == "posix":
+        return "/" + memory.name
+    return memory.name
+
+
+class SharedGenomes:
+    """
+    Encoded genomes and their fitness values in a shared memory block
+    """
+
+    def __init__(self, memory, owner=False):
+        """
+        Args:
+            memory: The SharedMemory object holding the block
+            owner: Whether the block was created by this object and must be
+                unlinked when closed
+        """
+        self.memory = memory
+        self.owner = owner
+        with memory.buf[:WORD] as header, header.cast("Q") as count:
+            self.count = count[0]
+        self.fitness_start = WORD * (self.count + 2)
+        self.data_start = self.fitness_start + WORD * self.count
+
+    @classmethod
+    def create(cls, genomes):
+        """
+        Encodes genomes into a new shared memory block
+
+        Args:
+            genomes: A list of genomes implementing to_bytes
+
+        Returns:
+            A SharedGenomes object owning the block
+        """
+        encoded = [genome.to_bytes() for genome in genomes]
+        count = len(encoded)
+        data_start = WORD * (2 * count + 2)
+        size = data_start + sum(len(data) for data in encoded)
+        memory = shared_memory.SharedMemory(create=True, size=max(size, WORD))
+        buffer = memory.buf
+        with buffer[: data_start - WORD * count].cast("Q") as header:
+            header[0] = count
+            position = 0
+            for index, data in enumerate(encoded):
+                header[index + 1] = position
+                start = data_start + position
+                buffer[start : start + len(data)] = data
+                position += len(data)
+            header[count + 1] = position
+        arena = cls(memory, owner=True)
+        with arena.fitness() as fitness:
+            for index in range(count):
+                fitness[index] = math.nan
+        return arena
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attaches to a block created in another process
+
+        Args:
+            name: The name of the shared memory block
+
+        Returns:
+            A SharedGenomes object that does not own the block
+        """
+        if not TRACKED_ATTACH:
+            return cls(shared_memory.SharedMemory(name=name, track=False))
+        # the tracker of this process would destroy the block at exit, so its
+        # registration is withdrawn; if the tracker is shared with the creator
+        # the creator registers the block again before unlinking it
+        memory = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(tracked_name(memory), "shared_memory")
+        return cls(memory)
+
+    @property
+    def name(self):
+        """Name of the shared memory block"""
+        return self.memory.name
+
+    def __len__(self):
+        return self.count
+
+    def fitness(self):
+        """
+        Returns a writable view of the fitness array. The view must be
+        released before the block is closed.
+
+        Returns:
+            A memoryview of doubles
+        """
+        return self.memory.buf[self.fitness_start : self.data_start].cast("d")
+
+    def genome(self, index, genotype, roles):
+        """
+        Decodes a genome straight from the shared buffer
+
+        Args:
+            index: The position of the genome in the block
+            genotype: The genotype class of the genome
+            roles: The roles of the genome
+
+        Returns:
+            The decoded genome
+        """
+        with self.memory.buf[WORD : self.fitness_start].cast("Q") as offsets:
+            start = self.data_start + offsets[index]
+            stop = self.data_start + offsets[index + 1]
+        with self.memory.buf[start:stop] as data:
+            return genotype.from_bytes(roles, data)
+
+    def close(self):
+        """
+        Detaches from the block and destroys it if this object created it
+        """
+        self.memory.close()
+        if self.owner:
+            if TRACKED_ATTACH:
+                # registering is idempotent and unlink unregisters the block
+                resource_tracker.register(tracked_name(self.memory), "shared_memory")
+            self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def evaluate_range(name, genotype, roles, start, stop, fitness_function):
+    """
+    Evaluates a range of the genomes of a shared block and writes their
+    fitness into the block. Runs in pool workers.
+
+    Args:
+        name: The name of the shared memory block
+        genotype: The genotype class of the genomes
+        roles: The roles of the genomes
+        start: The position of the first genome to evaluate
+        stop: The position following the last genome to evaluate
+        fitness_function: A picklable function mapping a genome to a float
+
+    Returns:
+        The number of evaluated genomes
+    """
+    with SharedGenomes.attach(name) as arena, arena.fitness() as fitness:
+        for index in range(start, stop):
+            fitness[index] = fitness_function(arena.genome(index, genotype, roles))
+    return stop - start
+
+
+def evaluate_shared(population, fitness_function, executor=None, chunksize=None):
+    """
+    Evaluates the individuals of a population through a shared memory block
+    and assigns their fitness in bulk. Intended to be called from evaluation
+    functions in place of sending individuals to the executor.
+
+    Args:
+        population: A GeneticProgrammingPopulation object
+        fitness_function: A picklable function mapping a genome to a float
+        executor: A multiprocessing.Pool, or None to evaluate in the calling
+            process
+        chunksize: The number of genomes evaluated per task, by default the
+            population is split into four tasks per core
+
+    Returns:
+        The number of evaluations performed
+    """
+    individuals = population.population
+    if not individuals:
+        return 0
+    genotype = type(individuals[0])
+    roles = individuals[0].roles
+    count = len(individuals)
+    if chunksize is None:
+        chunksize = max(1, math.ceil(count / (4 * (os.cpu_count() or 1))))
+    with SharedGenomes.create(individuals) as arena:
+        tasks = [
+            (
+                arena.name,
+                genotype,
+                roles,
+                start,
+                min(start + chunksize, count),
+                fitness_function,
+            )
+            for start in range(0, count, chunksize)
+        ]
+        if executor is None:
+            evals = sum(evaluate_range(*task) for task in tasks)
+        else:
+            evals = sum(executor.starmap(evaluate_range, tasks))
+        with arena.fitness() as fitness:
+            population.assign_fitness(fitness.tolist())
+    return evals
@@ -0,0 +1,170 @@
+"""
+Compact binary encoding of genomes
+
+A genome is encoded as the number of its nodes followed by one record per
+node in prefix order. Every record starts with a varint holding the ID of the
+primitive of the node in the role-specific PrimitiveTable, shifted left by
+one bit, with the lowest bit set when a literal value follows. The arity of a
+node is implied by its primitive, so it is not stored. Literal values are
+written as a one-byte tag followed by their payload.
+"""
+import pickle
+from struct import Struct
+
+DOUBLE = Struct("<d")
+
+# literal value tags
+FLOAT = 0
+INT = 1
+FALSE = 2
+TRUE = 3
+STRING = 4
+PICKLE = 5
+
+
+def write_varint(buffer, number):
+    """
+    Appends an unsigned LEB128 varint to a buffer
+
+    Args:
+        buffer: A bytearray to append to
+        number: A non-negative integer
+    """
+    while number > 0x7F:
+        buffer.append((number & 0x7F) | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+def read_varint(data, offset):
+    """
+    Reads an unsigned LEB128 varint from a buffer
+
+    Args:
+        data: A bytes-like object
+        offset: The position of the first byte of the varint
+
+    Returns:
+        A tuple of the integer and the position following it
+    """
+    number = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        number |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return number, offset
+        shift += 7
+
+
+def write_value(buffer, value):
+    """
+    Appends a tagged literal value to a buffer. Floats, integers, booleans and
+    strings are packed directly, any other value is pickled.
+
+    Args:
+        buffer: A bytearray to append to
+        value: The literal value of a node
+    """
+    kind = type(value)
+    if kind is float:
+        buffer.append(FLOAT)
+        buffer += DOUBLE.pack(value)
+    elif kind is bool:
+        buffer.append(TRUE if value else FALSE)
+    elif kind is int:
+        buffer.append(INT)
+        write_varint(buffer, (value << 1) ^ -(value < 0))  # zigzag encoding
+    elif kind is str:
+        payload = value.encode()
+        buffer.append(STRING)
+        write_varint(buffer, len(payload))
+        buffer += payload
+    else:
+        payload = pickle.dumps(value)
+        buffer.append(PICKLE)
+        write_varint(buffer, len(payload))
+        buffer += payload
+
+
+def read_value(data, offset):
+    """
+    Reads a tagged literal value from a buffer
+
+    Args:
+        data: A bytes-like object
+        offset: The position of the tag of the value
+
+    Returns:
+        A tuple of the value and the position following it
+    """
+    tag = data[offset]
+    offset += 1
+    if tag == FLOAT:
+        return DOUBLE.unpack_from(data, offset)[0], offset + DOUBLE.size
+    if tag == INT:
+        number, offset = read_varint(data, offset)
+        return (number >> 1) ^ -(number & 1), offset
+    if tag == FALSE or tag == TRUE:
+        return tag == TRUE, offset
+    length, offset = read_varint(data, offset)
+    payload = bytes(data[offset : offset + length])
+    if tag == STRING:
+        return payload.decode(), offset + length
+    if tag == PICKLE:
+        return pickle.loads(payload), offset + length
+    raise ValueError(f"unknown literal tag {tag}")
+
+
+def encode(ids, values):
+    """
+    Encodes a genome from its primitive IDs and literal values in prefix
+    order
+
+    Args:
+        ids: A sequence of primitive IDs
+        values: A sequence of literal values, None for non-literal nodes
+
+    Returns:
+        The encoded genome as bytes
+    """
+    buffer = bytearray()
+    write_varint(buffer, len(ids))
+    for primitive, value in zip(ids, values):
+        if value is None:
+            header = primitive << 1
+        else:
+            header = (primitive << 1) | 1
+        if header < 0x80:
+            buffer.append(header)
+        else:
+            write_varint(buffer, header)
+        if value is not None:
+            write_value(buffer, value)
+    return bytes(buffer)
+
+
+def decode(data):
+    """
+    Decodes a genome encoded by encode
+
+    Args:
+        data: A bytes-like object
+
+    Returns:
+        A tuple of the list of primitive IDs and the list of literal values
+    """
+    size, offset = read_varint(data, 0)
+    ids = [0] * size
+    values = [None] * size
+    for position in range(size):
+        header = data[offset]
+        if header < 0x80:
+            offset += 1
+        else:
+            header, offset = read_varint(data, offset)
+        ids[position] = header >> 1
+        if header & 1:
+            values[position], offset = read_value(data, offset)
+    return ids, values
@@ -0,0 +1,440 @@
+"""
+Process-per-island and multi-node execution
+
+Each island lives in its own worker process, which owns the evaluation pool
+of that island, so variation and selection of different islands run in
+parallel instead of being serialized by the GIL. The coordinating process
+holds an IslandProxy per island that mirrors the interface used by Maelstrom
+and exchanges only migrants, log deltas and evaluation counts with its worker
+over a multiprocessing connection.
+
+Workers are either started locally over a pipe or hosted by serve_island on
+another machine and reached over a socket. Remote hosts must be able to
+import the island class, evaluation function and primitives of the run. The
+connection carries pickled objects, so an authentication key shared by the
+coordinator and the hosts is always required for sockets. A host can be
+started from the command line, reading the key from a file or from the
+MAELSTROM_AUTHKEY environment variable:
+
+    python -m maelstrom.host --address 0.0.0.0:6000 --authkey-file ~/.maelstrom-key
+"""
+import multiprocessing
+import random
+import threading
+import traceback
+import weakref
+from multiprocessing.connection import Client, Listener
+
+from maelstrom.island import GeneticProgrammingIsland
+from maelstrom.logbook import ColumnarLog
+
+
+def log_delta(log, sent):
+    """
+    Returns the log entries that have not been sent yet
+
+    Args:
+        log: The ColumnarLog of an island
+        sent: A dictionary of log keys mapped to the number of entries already
+            sent, updated in place
+
+    Returns:
+        A dictionary of log keys mapped to lists of new entries
+    """
+    delta = {}
+    for key in log:
+        count = log.count(key)
+        start = sent.get(key, 0)
+        if count > start:
+            delta[key] = log.tail(key, count - start)
+            sent[key] = count
+    return delta
+
+
+def island_state(island, sent, skipped):
+    """
+    Returns the state reported to the coordinator after every generation
+
+    Args:
+        island: The island run by the worker
+        sent: A dictionary of log keys mapped to the number of entries already
+            sent, updated in place
+        skipped: The number of skipped generations already sent
+
+    Returns:
+        A dictionary of evaluation counts, termination status, log delta, new
+        skipped generations and instrumentation statistics
+    """
+    return {
+        "evals": island.evals,
+        "generation_count": island.generation_count,
+        "cache_hits": island.cache_hits,
+        "terminated": island.termination(),
+        "log": log_delta(island.log, sent),
+        "skipped_generations": island.skipped_generations[skipped:],
+        "statistics": island.statistics(),
+    }
+
+
+def send_error(connection, error):
+    """
+    Reports an exception to the coordinator, falling back to the formatted
+    traceback if the exception cannot be pickled
+
+    Args:
+        connection: The connection to the coordinator
+        error: The exception raised by the worker
+    """
+    try:
+        connection.send(("error", error))
+    except Exception:
+        connection.send(("error", RuntimeError(traceback.format_exc())))
+
+
+def island_worker(connection, island_class, cores, island_kwargs, restore=None):
+    """
+    Runs an island in the calling process and serves commands received over a
+    connection until it is told to close
+
+    Every command is a (name, args) tuple. "generation" delivers imports and
+    runs a single generation, "snapshot" returns the island and the state of
+    the random module of the worker, "close" ends the loop without a reply
+    and any other name calls the method of the island with that name. Every
+    reply is an ("ok", result) or ("error", exception) tuple.
+
+    Args:
+        connection: The connection to the coordinator
+        island_class: The island class to instantiate
+        cores: The number of processes of the evaluation pool of the island
+        island_kwargs: Keyword arguments to pass to island initialization
+        restore: An (island, random state) tuple returned by a snapshot to
+            resume instead of creating a new island
+    """
+    sent = {}
+    skipped = 0
+    with multiprocessing.Pool(cores) as eval_pool:
+        try:
+            if restore is None:
+                island = island_class(
+                    cores=cores, eval_pool=eval_pool, **island_kwargs
+                )
+            else:
+                island, random_state = restore
+                island.eval_pool = eval_pool
+                random.setstate(random_state)
+                # the coordinator resumes with the log of the snapshot
+                sent = {key: island.log.count(key) for key in island.log}
+                skipped = len(island.skipped_generations)
+            connection.send(("ok", island_state(island, sent, skipped)))
+            skipped = len(island.skipped_generations)
+        except Exception as error:
+            send_error(connection, error)
+            return
+
+        parent = multiprocessing.parent_process()
+        while True:
+            try:
+                # other workers may hold copies of the coordinator's end of the
+                # connection, so its exit is not always seen as end of file
+                while not connection.poll(1.0):
+                    if parent is not None and not parent.is_alive():
+                        raise EOFError
+                command, args = connection.recv()
+            except EOFError:
+                break  # the coordinator went away
+            if command == "close":
+                break
+            try:
+                if command == "generation":
+                    (imports,) = args
+                    for population, migrants in imports.items():
+                        island.imports.setdefault(population, []).extend(migrants)
+                    island.generation(eval_pool)
+                    result = island_state(island, sent, skipped)
+                    skipped = len(island.skipped_generations)
+                elif command == "champions":
+                    result = island.champions
+                elif command == "snapshot":
+                    result = (island, random.getstate())
+                else:
+                    result = getattr(island, command)(*args)
+                    if result is island:
+                        result = None  # islands return themselves for chaining
+                connection.send(("ok", result))
+            except Exception as error:
+                send_error(connection, error)
+    connection.close()
+
+
+def stop_worker(connection, process):
+    """
+    Tells a worker to exit and waits for the worker process to finish
+
+    Args:
+        connection: The connection to the worker
+        process: The worker process, or None for remote workers
+    """
+    try:
+        connection.send(("close", ()))
+    except (OSError, ValueError):
+        pass  # the worker already exited
+    connection.close()
+    if process is not None:
+        process.join()
+
+
+def serve_island(address, authkey, limit=None):
+    """
+    Hosts islands for remote coordinators. Every accepted connection sends
+    the island class, number of cores, island keyword arguments and snapshot
+    to resume (or None), and its island is then run in a new worker process.
+
+    Args:
+        address: The address to listen on, a (host, port) tuple or the path
+            of a Unix socket
+        authkey: The authentication key shared with the coordinators
+        limit: The number of islands to host before returning, or None to
+            serve forever
+    """
+    workers = []
+    hosted = 0
+    with Listener(address, authkey=authkey) as listener:
+        while limit is None or hosted < limit:
+            try:
+                connection = listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            # reap finished workers so long-running hosts do not accumulate them
+            for worker in [worker for worker in workers if not worker.is_alive()]:
+                worker.join()
+                workers.remove(worker)
+            try:
+                island_class, cores, island_kwargs, restore = connection.recv()
+            except Exception as error:
+                send_error(connection, error)
+                connection.close()
+                continue
+            worker = multiprocessing.Process(
+                target=island_worker,
+                args=(connection, island_class, cores, island_kwargs, restore),
+                daemon=False,
+            )
+            worker.start()
+            connection.close()
+            workers.append(worker)
+            hosted += 1
+    for worker in workers:
+        worker.join()
+
+
+class IslandProxy:
+    """
+    Coordinator-side handle of an island running in a worker process. Log,
+    evaluation counts and termination status are mirrored locally after every
+    generation, imports are buffered locally and sent with the next
+    generation.
+    """
+
+    def __init__(
+        self,
+        island_class=GeneticProgrammingIsland,
+        cores=1,
+        address=None,
+        authkey=None,
+        restore=None,
+        **kwargs,
+    ):
+        """
+        Starts the worker process of the island, or asks the host listening
+        at address to start it. Island initialization runs in the background
+        until wait() is called.
+
+        Args:
+            island_class: The island class to run in the worker process
+            cores: The number of processes of the evaluation pool of the
+                island, None to use every core of the host
+            address: The address of a host running serve_island, or None to
+                start a local worker
+            authkey: The authentication key of the host
+            restore: An (island, random state) tuple returned by snapshot()
+                to resume in the worker instead of creating a new island
+            **kwargs: Keyword arguments to pass to island initialization
+        """
+        if address is None:
+            self.connection, worker_connection = multiprocessing.Pipe()
+            # the worker owns a pool of its own, which daemonic processes cannot
+            self.process = multiprocessing.Process(
+                target=island_worker,
+                args=(worker_connection, island_class, cores, kwargs, restore),
+                daemon=False,
+            )
+            self.process.start()
+            worker_connection.close()
+        else:
+            if authkey is None:
+                raise ValueError("remote islands require an authentication key")
+            self.connection = Client(address, authkey=authkey)
+            self.connection.send((island_class, cores, kwargs, restore))
+            self.process = None
+        # non-daemonic workers are joined at interpreter exit, so they must be
+        # told to stop even if close() is never called
+        self.finalizer = weakref.finalize(
+            self, stop_worker, self.connection, self.process
+        )
+        self.lock = threading.Lock()
+        self.pending = True
+        self.imports = {}
+        # the worker writes the log file, the proxy mirrors the log in memory
+        if restore is None:
+            self.log = ColumnarLog(kwargs.get("log_window"))
+        else:
+            self.log = restore[0].log
+            self.log.path = None
+        self.evals = 0
+        self.generation_count = 0
+        self.cache_hits = 0
+        self.skipped_generations = []
+        if restore is not None:
+            self.skipped_generations.extend(restore[0].skipped_generations)
+        self.terminated = False
+        self.recorded = None
+        self.eval_pool = None  # evaluation happens in the pool of the worker
+
+    def request(self, command, *args):
+        """
+        Sends a command to the worker and waits for its reply
+
+        Args:
+            command: The name of the command
+            *args: The arguments of the command
+
+        Returns:
+            The result returned by the worker
+        """
+        with self.lock:
+            self.wait()
+            self.connection.send((command, args))
+            return self.receive()
+
+    def receive(self):
+        """
+        Receives a reply from the worker, raising any exception it reported
+        """
+        status, result = self.connection.recv()
+        if status == "error":
+            raise result
+        return result
+
+    def wait(self):
+        """
+        Waits for island initialization to finish in the worker process
+        """
+        if self.pending:
+            self.pending = False
+            self.update(self.receive())
+
+    def update(self, state):
+        """
+        Mirrors the state reported by the worker
+
+        Args:
+            state: The state dictionary returned by island_state
+        """
+        self.evals = state["evals"]
+        self.generation_count = state["generation_count"]
+        self.cache_hits = state["cache_hits"]
+        self.terminated = state["terminated"]
+        self.log.extend(state["log"])
+        self.skipped_generations.extend(state["skipped_generations"])
+        self.recorded = state["statistics"]
+
+    def generation(self, eval_pool=None):
+        """
+        Sends buffered imports to the worker and performs a single generation
+        of evolution there
+
+        Args:
+            eval_pool: Ignored, the worker evaluates with its own pool
+
+        Returns:
+            self
+        """
+        imports, self.imports = self.imports, {}
+        self.update(self.request("generation", imports))
+        return self
+
+    def termination(self):
+        """
+        Checks if the island had reached termination criteria after its last
+        generation
+
+        Returns:
+            bool: True if termination criteria have been met, False otherwise
+        """
+        self.wait()
+        return self.terminated
+
+    def select(self, population, n, method="uniform", k=5):
+        """
+        Selects copies of n individuals from the specified population of the
+        island
+
+        Args:
+            population: Name of the population to select from
+            n: Number of individuals to select
+            method: Selection method to use
+            k: Number of individuals to select from for tournament selection
+
+        Returns:
+            list: List of selected individuals
+        """
+        return self.request("select", population, n, method, k)
+
+    def snapshot(self):
+        """
+        Returns a copy of the island run by the worker, with the imports
+        buffered by the proxy, and the state of the random module of the
+        worker, for checkpoints
+
+        Returns:
+            An (island, random state) tuple accepted by the restore argument
+        """
+        island, random_state = self.request("snapshot")
+        for population, migrants in self.imports.items():
+            island.imports.setdefault(population, []).extend(migrants)
+        return island, random_state
+
+    def statistics(self):
+        """
+        Returns the instrumentation statistics of the island as of its last
+        generation, without waiting for a running generation to finish
+
+        Returns:
+            dict: The snapshot of the instrumentation of the island
+        """
+        return self.recorded
+
+    @property
+    def champions(self):
+        """Champions identified by the island so far"""
+        return self.request("champions")
+
+    def build(self):
+        """
+        Builds the populations in the island
+        """
+        self.request("build")
+
+    def clean(self):
+        """
+        Cleans the populations in the island
+        """
+        self.request("clean")
+
+    def close(self):
+        """
+        Stops the worker process
+        """
+        with self.lock:
+            self.finalizer()
+
@@ -0,0 +1,108 @@
+"""
+Primitives shared by the tests
+
+Declares a small strongly typed primitive set under a role of its own, with
+arithmetic and conditional functions, terminals reading the context and an
+initialized literal, together with a deterministic evaluation function for
+islands.
+"""
+import random
+
+from maelstrom.genotype import GeneticTree
+
+ROLES = ("tests",)
+FLOAT = "float"
+BOOL = "bool"
+
+
+@GeneticTree.declare_primitive(ROLES, FLOAT, (FLOAT, FLOAT))
+def add(a, b):
+    return a + b
+
+
+@GeneticTree.declare_primitive(ROLES, FLOAT, (FLOAT, FLOAT))
+def sub(a, b):
+    return a - b
+
+
+@GeneticTree.declare_primitive(ROLES, FLOAT, (FLOAT, FLOAT))
+def mul(a, b):
+    return a * b
+
+
+@GeneticTree.declare_primitive(ROLES, FLOAT, (BOOL, FLOAT, FLOAT))
+def ifte(condition, a, b):
+    return a if condition else b
+
+
+@GeneticTree.declare_primitive(ROLES, BOOL, (FLOAT, FLOAT))
+def lt(a, b):
+    return a < b
+
+
+@GeneticTree.declare_primitive(ROLES, FLOAT, ())
+def x(context):
+    return context["x"]
+
+
+@GeneticTree.declare_primitive(ROLES, FLOAT, ())
+def y(context):
+    return context["y"]
+
+
+@GeneticTree.declare_primitive(ROLES, BOOL, ())
+def positive(context):
+    return context["x"] > 0
+
+
+@GeneticTree.declare_primitive(ROLES, FLOAT, (), -1, 1, literal_init=True)
+def const(a, b):
+    return round(random.uniform(a, b), 3)
+
+
+CONTEXTS = [{"x": value, "y": 2.0} for value in range(-3, 4)]
+
+
+def fitness(individual):
+    """
+    Returns the negated error of an individual on x ** 2 + y
+    """
+    return -sum(
+        abs(individual.execute(context) - (context["x"] ** 2 + context["y"]))
+        for context in CONTEXTS
+    )
+
+
+def evaluate(executor=None, **populations):
+    """
+    Evaluates every individual of the populations of an island
+    """
+    evaluations = 0
+    data = {}
+    for name, population in populations.items():
+        for individual in population.population:
+            individual.fitness = fitness(individual)
+            evaluations += 1
+        data[f"{name}_best"] = max(
+            individual.fitness for individual in population.population
+        )
+    return data, evaluations
+
+
+def population_config(**overrides):
+    """
+    Returns the keyword arguments of a small population
+    """
+    config = {
+        "pop_size": 20,
+        "num_children": 20,
+        "roles": ROLES,
+        "output_type": FLOAT,
+        "depth_limit": 4,
+        "hard_limit": 8,
+        "parent_selection": "k_tournament",
+        "k_parent": 3,
+        "survival_selection": "truncation",
+    }
+    config.update(overrides)
+    return config
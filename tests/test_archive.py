@@ -0,0 +1,54 @@
+"""Hall of fame, champion history and archive files"""
+import pickle
+import random
+
+import pytest
+
+from maelstrom.archive import Archive, ChampionHistory, HallOfFame, read_archive
+from maelstrom.genotype import GeneticTree
+from tests.primitives import FLOAT, ROLES
+
+
+@pytest.fixture
+def champions():
+    random.seed(0)
+    trees = []
+    for index in range(10):
+        tree = GeneticTree(ROLES, FLOAT)
+        tree.initialize(3, 6, grow=True)
+        tree.fitness = float(index)
+        trees.append(tree)
+    return trees
+
+
+def test_history_keeps_genome_strings(champions, tmp_path):
+    path = str(tmp_path / "archive.jsonl")
+    history = ChampionHistory(window=4, archive=Archive(path))
+    for champion in champions:
+        history.append(champion)
+    history.archive.close()
+
+    assert history == [champion.string for champion in champions[-4:]]
+    assert history[-2:] == [champion.string for champion in champions[-2:]]
+    assert history.generations == len(champions)
+    records = list(read_archive(path, "champion"))
+    assert [record["genome"] for record in records] == [
+        champion.string for champion in champions
+    ]
+
+    copy = pickle.loads(pickle.dumps(history))
+    assert copy == history and copy.generations == history.generations
+    copy.append(champions[0])
+    assert copy[-1] == champions[0].string and len(copy) == 4
+
+
+def test_hall_of_fame_is_keyed_by_genome_string(champions):
+    hall_of_fame = HallOfFame(capacity=3, policy="worst")
+    for champion in champions:
+        stored = hall_of_fame.crown(champion)
+        assert stored is hall_of_fame[champion.string]
+        assert stored.fitness == champion.fitness
+    assert list(hall_of_fame) == [champion.string for champion in champions[-3:]]
+    # crowning a known genome moves it to the end without copying it again
+    assert hall_of_fame.crown(champions[-3]) is hall_of_fame[champions[-3].string]
+    assert list(hall_of_fame)[-1] == champions[-3].string
@@ -0,0 +1,65 @@
+"""Tests of the shared subtree DAG"""
+import random
+
+import pytest
+
+from maelstrom.dag import SubtreeDAG
+from maelstrom.genotype import GeneticTree
+from maelstrom.linear import LinearGeneticTree
+from tests.primitives import CONTEXTS, FLOAT, ROLES
+
+DOUBLING = ("dag_doubling",)
+TRIPLING = ("dag_tripling",)
+
+
+@GeneticTree.declare_primitive(DOUBLING, FLOAT, (FLOAT,))
+def scale(a):
+    return 2 * a
+
+
+@GeneticTree.declare_primitive(DOUBLING, FLOAT, ())
+def unit(context):
+    return context["x"]
+
+
+@GeneticTree.declare_primitive(TRIPLING, FLOAT, (FLOAT,))
+def scale(a):  # noqa: F811, declared under another role with the same name
+    return 3 * a
+
+
+@GeneticTree.declare_primitive(TRIPLING, FLOAT, ())
+def unit(context):  # noqa: F811
+    return context["x"]
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(0)
+
+
+@pytest.mark.parametrize("genotype", [GeneticTree, LinearGeneticTree])
+def test_dag_matches_trees(genotype):
+    trees = []
+    for index in range(30):
+        tree = genotype(ROLES, FLOAT)
+        tree.initialize(4, 8, full=index % 2 == 0, grow=index % 2 == 1)
+        trees.append(tree)
+    dag = SubtreeDAG(trees)
+    assert len(dag) <= dag.total_nodes
+    for context, results in zip(CONTEXTS, dag.execute_all(CONTEXTS)):
+        assert list(results) == [tree.execute(context) for tree in trees]
+
+
+def test_dag_keeps_roles_apart():
+    trees = []
+    for roles in (DOUBLING, TRIPLING):
+        for genotype in (GeneticTree, LinearGeneticTree):
+            tree = genotype(roles, FLOAT)
+            tree.initialize(3, 3, full=True)
+            trees.append(tree)
+    dag = SubtreeDAG(trees)
+    context = {"x": 1.0}
+    assert list(dag.execute(context)) == [4.0, 4.0, 9.0, 9.0]
+    assert list(dag.execute(context)) == [tree.execute(context) for tree in trees]
+    # identical trees of a role share their nodes, the other role does not
+    assert len(dag) == 6
@@ -0,0 +1,235 @@
+"""Tests of the genotype classes"""
+import pickle
+import random
+
+import pytest
+
+from maelstrom import compiler as compiler_module
+from maelstrom import genotype as genotype_module
+from maelstrom import linear as linear_module
+from maelstrom.genotype import GeneticTree
+from maelstrom.linear import LinearGeneticTree
+from tests.primitives import CONTEXTS, FLOAT, ROLES
+
+GENOTYPES = [GeneticTree, LinearGeneticTree]
+
+
+def make_trees(genotype, count=40, depth=5, hard_limit=10):
+    trees = []
+    for index in range(count):
+        tree = genotype(ROLES, FLOAT)
+        tree.initialize(
+            random.randint(1, depth),
+            hard_limit,
+            full=index % 2 == 0,
+            grow=index % 2 == 1,
+        )
+        trees.append(tree)
+    return trees
+
+
+def vary(trees, generations=200, limit=None):
+    """Yields children produced by mutation and crossover of the trees"""
+    for _ in range(generations):
+        parent, mate = random.sample(trees, 2)
+        child = parent.copy()
+        if random.random() < 0.3:
+            child.subtree_mutation()
+        else:
+            child.subtree_recombination(mate, limit)
+        trees[random.randrange(len(trees))] = child
+        yield child
+
+
+def assert_measured(tree):
+    """Checks the cached metadata of a tree against a fresh computation"""
+    assert tree.string == tree.print_tree()
+    fresh = type(tree).from_dict(tree.to_dict())
+    assert fresh.string == tree.string
+    assert (fresh.depth, fresh.size) == (tree.depth, tree.size)
+    assert hash(fresh) == hash(tree)
+    assert list(fresh.levels) == list(tree.levels)
+    if isinstance(tree, LinearGeneticTree):
+        assert list(fresh.sizes) == list(tree.sizes)
+        assert list(fresh.lengths) == list(tree.lengths)
+        assert fresh.digests == tree.digests
+    else:
+        assert list(fresh.parents) == list(tree.parents)
+        assert list(fresh.ends) == list(tree.ends)
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(0)
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+def test_dict_round_trip(genotype):
+    for tree in make_trees(genotype):
+        copy = genotype.from_dict(tree.to_dict())
+        assert copy == tree
+        assert copy.string == tree.string
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+def test_dict_round_trip_initializes_literals(genotype):
+    def clear(node):
+        if node["func"] == "const":
+            node["value"] = None
+        for child in node["children"]:
+            clear(child)
+
+    for tree in make_trees(genotype):
+        representation = tree.to_dict()
+        clear(representation["root"])
+        copy = genotype.from_dict(representation)
+        assert "const" not in copy.string
+        assert_measured(copy)
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+def test_wire_round_trip(genotype):
+    for tree in make_trees(genotype):
+        copy = genotype.from_bytes(tree.roles, tree.to_bytes())
+        assert copy == tree
+        assert hash(copy) == hash(tree)
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+def test_pickle_round_trip(genotype):
+    trees = make_trees(genotype)
+    for tree in trees:
+        tree.fitness = random.random()
+    copies = pickle.loads(pickle.dumps(trees))
+    assert copies == trees
+    assert [copy.fitness for copy in copies] == [tree.fitness for tree in trees]
+    assert [copy.depth_limit for copy in copies] == [tree.depth_limit for tree in trees]
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+def test_trees_survive_later_declarations(genotype):
+    roles = (f"late_{genotype.__name__}",)
+
+    @GeneticTree.declare_primitive(roles, FLOAT, (FLOAT, FLOAT))
+    def plus(a, b):
+        return a + b
+
+    @GeneticTree.declare_primitive(roles, FLOAT, ())
+    def one(context):
+        return 1.0
+
+    old = []
+    for _ in range(20):
+        tree = genotype(roles, FLOAT)
+        tree.initialize(3, 6, full=True)
+        old.append(tree)
+    strings = [tree.string for tree in old]
+
+    # sorts before the other primitives and shifts their IDs
+    @GeneticTree.declare_primitive(roles, FLOAT, (FLOAT,))
+    def double(a):
+        return 2 * a
+
+    for tree, string in zip(old, strings):
+        assert genotype.from_bytes(roles, tree.to_bytes()).string == string
+        assert pickle.loads(pickle.dumps(tree)).string == string
+    new = []
+    for _ in range(20):
+        tree = genotype(roles, FLOAT)
+        tree.initialize(3, 6, full=True)
+        new.append(tree)
+    for parent, mate in zip(old + new, new + old):
+        child = parent.copy()
+        child.subtree_recombination(mate)
+        assert_measured(child)
+        child.subtree_mutation()
+        assert_measured(child)
+        assert child.execute(CONTEXTS[0]) is not None
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+def test_variation_keeps_metadata(genotype):
+    for child in vary(make_trees(genotype)):
+        assert_measured(child)
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+@pytest.mark.parametrize("backend", ["eval", "ast"])
+@pytest.mark.parametrize("hoist", [False, True])
+def test_execute_matches_eval(genotype, backend, hoist, monkeypatch):
+    parsed = []
+
+    def counting_eval(source, *args):
+        parsed.append(source)
+        return eval(source, *args)
+
+    for module in (compiler_module, genotype_module, linear_module):
+        monkeypatch.setattr(module, "eval", counting_eval, raising=False)
+    monkeypatch.setattr(GeneticTree, "BACKEND", backend)
+    monkeypatch.setattr(GeneticTree, "HOIST", hoist)
+    GeneticTree.function_cache.clear()
+    local = GeneticTree.primitive_table(ROLES).local
+    names = set()
+    for tree in make_trees(genotype, depth=6, hard_limit=12):
+        tree.build()
+        names.add(tree.func.__name__)
+        expected = eval(f"lambda context: {tree.string}", dict(local))
+        for context in CONTEXTS:
+            assert tree.execute(context) == expected(context)
+    # the AST backend never parses the expression of a tree
+    assert bool(parsed) == (backend == "eval")
+    # repeated subexpressions are hoisted into a function body
+    assert ("__tree" in names) == (backend == "ast" and hoist)
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+def test_crossover_respects_limit(genotype):
+    for child in vary(make_trees(genotype, depth=4, hard_limit=6), limit=6):
+        assert child.depth <= 6
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+def test_crossover_shrinks_oversized_parents(genotype):
+    for _ in range(50):
+        parent = genotype(ROLES, FLOAT)
+        parent.initialize(random.randint(5, 7), 8, full=True)
+        mate = genotype(ROLES, FLOAT)
+        mate.initialize(random.randint(2, 5), 8, grow=True)
+        limit = random.randint(2, parent.depth - 1)
+        child = parent.copy()
+        if child.subtree_recombination(mate, limit):
+            assert child.depth <= limit
+        else:
+            assert child == parent
+
+
+@pytest.mark.parametrize("genotype", GENOTYPES)
+def test_node_tags_address_nodes_by_heap_tag(genotype):
+    def heap_tags(node, branching, index=1):
+        tags = {index: node.type}
+        for child_index, child in enumerate(node.children):
+            tags.update(heap_tags(child, branching, index * branching + child_index))
+        return tags
+
+    for tree in make_trees(GeneticTree):
+        copy = genotype.from_dict(tree.to_dict())
+        assert copy.node_tags == heap_tags(tree.root, tree.branching_factor)
+        positions = copy.tag_positions()
+        assert sorted(positions.values()) == list(range(copy.size))
+
+
+def test_deprecated_tag_helpers():
+    tree, donor = make_trees(GeneticTree, count=2, depth=4)
+    branching = tree.branching_factor
+    with pytest.deprecated_call():
+        assert tree.root.get_tags(branching) == tree.node_tags
+    for tag, position in tree.tag_positions().items():
+        with pytest.deprecated_call():
+            assert tree.root.find_tag(tag, branching) is tree.nodes[position]
+
+    tag = max(tag for tag, node_type in tree.node_tags.items() if node_type == FLOAT)
+    payload = donor.root.copy()
+    with pytest.deprecated_call():
+        assert tree.root.assign_at_tag(tag, payload, branching)
+    tree.initialize(tree.depth_limit, tree.hard_limit)
+    assert_measured(tree)
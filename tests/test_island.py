@@ -0,0 +1,164 @@
+"""Logging and checkpointing of islands"""
+import random
+
+import pytest
+
+from maelstrom import Maelstrom
+from maelstrom.island import GeneticProgrammingIsland
+from maelstrom.logbook import read_column
+from maelstrom.population import GeneticProgrammingPopulation
+from maelstrom.worker import island_state
+from tests.primitives import evaluate, population_config
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(0)
+
+
+def make_island(**kwargs):
+    return GeneticProgrammingIsland(
+        populations={"solver": "solver_config"},
+        evaluation_function=evaluate,
+        cores=1,
+        solver_config=population_config(fitness_cache=1000),
+        **kwargs,
+    )
+
+
+def test_cached_generations_keep_log_aligned(tmp_path, monkeypatch):
+    path = tmp_path / "log.csv"
+    island = make_island(log_file=str(path))
+    population = island.populations["solver"]
+    island.generation()
+    # children identical to their parents are all fitness cache hits
+    monkeypatch.setattr(
+        population,
+        "generate_children",
+        lambda imports=None: population.population.extend(
+            [individual.copy() for individual in population.population]
+        ),
+    )
+    island.generation()
+    monkeypatch.undo()
+    island.generation()
+
+    assert island.skipped_generations == [2]
+    # the initial evaluation is logged as generation 0
+    logged = island.generation_count + 1 - len(island.skipped_generations)
+    assert len(island.log["solver_best"]) == logged
+    written = read_column(str(path), "solver_best")
+    assert list(written) == list(island.log["solver_best"])
+
+
+def test_island_state_sends_new_skipped_generations():
+    island = make_island()
+    sent = {}
+    state = island_state(island, sent, 0)
+    assert state["skipped_generations"] == []
+    assert len(state["log"]["solver_best"]) == 1
+    island.skipped_generations.extend([1, 2])
+    island.generation()
+    state = island_state(island, sent, 0)
+    assert state["skipped_generations"] == [1, 2]
+    assert len(state["log"]["solver_best"]) == 1
+    state = island_state(island, sent, 2)
+    assert state["skipped_generations"] == []
+    assert state["log"] == {}
+
+
+def test_island_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "island.pkl")
+    island = make_island(evaluations=300)
+    island.run()
+    island.checkpoint(path)
+    island.eval_limit = 600
+    island.run()
+
+    resumed = GeneticProgrammingIsland.resume(path)
+    resumed.eval_limit = 600
+    resumed.run()
+    assert list(resumed.log["solver_best"]) == list(island.log["solver_best"])
+    assert resumed.generation_count == island.generation_count
+
+
+def test_population_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "population.pkl")
+    island = make_island(evaluations=300)
+    island.run()
+    population = island.populations["solver"]
+    population.checkpoint(path)
+
+    resumed = GeneticProgrammingPopulation.resume(path)
+    assert resumed.population == population.population
+    assert [individual.fitness for individual in resumed.population] == [
+        individual.fitness for individual in population.population
+    ]
+    assert len(resumed.fitness_cache) == len(population.fitness_cache)
+    with pytest.raises(TypeError):
+        GeneticProgrammingIsland.resume(path)
+
+
+def test_maelstrom_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "maelstrom.pkl")
+    island_config = {
+        "populations": {"solver": "solver_config"},
+        "evaluation_function": evaluate,
+    }
+    maelstrom = Maelstrom(
+        islands={"one": "island_config", "two": "island_config"},
+        evaluations=600,
+        migration_edges=[
+            {
+                "source": ("one", "solver"),
+                "destination": ("two", "solver"),
+                "period": 2,
+                "size": 3,
+                "method": "tournament",
+            }
+        ],
+        cores=1,
+        position=None,
+        checkpoint_file=path,
+        checkpoint_period=3,
+        island_config=island_config,
+        solver_config=population_config(fitness_cache=1000),
+    )
+    maelstrom.run()
+    maelstrom.checkpoint_writer.wait()
+    maelstrom.eval_limit = 1200
+    maelstrom.run()
+    maelstrom.close()
+
+    resumed = Maelstrom.resume(path)
+    resumed.eval_limit = 1200
+    resumed.run()
+    resumed.close()
+    for key, island in maelstrom.islands.items():
+        assert resumed.log[key]["solver_best"] == maelstrom.log[key]["solver_best"]
+        assert resumed.islands[key].evals == island.evals
+
+
+def test_log_describes_evaluated_genomes():
+    island = make_island()
+    population = island.populations["solver"]
+    evaluated = []
+
+    def evaluate_pending(executor=None, **populations):
+        individuals = populations["solver"].population
+        evaluated.append([member.genome_key() for member in individuals])
+        data, evaluations = evaluate(**populations)
+        data["solver_evaluated"] = len(individuals)
+        return data, evaluations
+
+    island.evaluation = evaluate_pending
+    for _ in range(3):
+        known = {individual.genome_key() for individual in population.population}
+        island.generation()
+        # survivors are cached, so only new genomes reach the evaluation function
+        assert not known & set(evaluated[-1])
+        assert len(set(evaluated[-1])) == len(evaluated[-1])
+        assert island.log["solver_evaluated"][-1] == len(evaluated[-1])
+        generated = len(population.population) + population.num_children
+        assert len(evaluated[-1]) < generated
+        assert all(member.fitness is not None for member in population.population)
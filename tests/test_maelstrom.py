@@ -0,0 +1,48 @@
+"""Pools and runs of Maelstrom"""
+import random
+
+import pytest
+
+from maelstrom import Maelstrom
+from tests.primitives import evaluate, population_config
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(0)
+
+
+def make_maelstrom(**kwargs):
+    return Maelstrom(
+        islands={"one": "island_config", "two": "island_config"},
+        evaluations=200,
+        migration_edges=[],
+        cores=1,
+        position=None,
+        island_config={
+            "populations": {"solver": "solver_config"},
+            "evaluation_function": evaluate,
+        },
+        solver_config=population_config(),
+        **kwargs,
+    )
+
+
+def test_runs_shut_down_their_pools():
+    maelstrom = make_maelstrom()
+    assert maelstrom.eval_pool is None and maelstrom.island_pool is None
+    maelstrom.run()
+    assert maelstrom.eval_pool is None and maelstrom.island_pool is None
+    assert all(island.eval_pool is None for island in maelstrom.islands.values())
+
+
+def test_opened_pools_outlive_runs():
+    with make_maelstrom() as maelstrom:
+        pool = maelstrom.eval_pool
+        assert pool is not None
+        maelstrom.run()
+        maelstrom.eval_limit = 400
+        maelstrom.run()
+        assert maelstrom.eval_pool is pool
+        assert all(island.eval_pool is pool for island in maelstrom.islands.values())
+    assert maelstrom.eval_pool is None and maelstrom.island_pool is None
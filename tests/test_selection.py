@@ -0,0 +1,58 @@
+"""Vectorized selection operators against their list implementations"""
+import random
+from collections import Counter
+
+import pytest
+
+from maelstrom.selection import parent_selection, unique_selection, vectorized
+
+np = pytest.importorskip("numpy")
+
+PARAMETERS = {"k_tournament": {"k": 3}, "tournament": {"k": 3}}
+
+
+class Individual:
+    def __init__(self, fitness):
+        self.fitness = fitness
+
+
+def operators(registry):
+    seen = []
+    for operator in registry.values():
+        if operator.vectorized is not None and operator not in seen:
+            seen.append(operator)
+    return seen
+
+
+def frequencies(draws, size):
+    counts = Counter(draws)
+    total = sum(counts.values())
+    return [counts[index] / total for index in range(size)]
+
+
+@pytest.mark.parametrize(
+    "registry, n",
+    [(parent_selection, 20), (unique_selection, 5)],
+    ids=["parent", "unique"],
+)
+def test_vectorized_distributions_match(registry, n):
+    random.seed(0)
+    population = [Individual(random.uniform(-5, 10)) for _ in range(20)]
+    positions = {id(individual): index for index, individual in enumerate(population)}
+    fitness = vectorized.fitness_array(population)
+    rng = vectorized.generator()
+    for operator in operators(registry):
+        kwargs = PARAMETERS.get(operator.name, {})
+        listed, batched = [], []
+        for _ in range(4000):
+            selected = operator.function(population, n, **kwargs)
+            listed.extend(positions[id(individual)] for individual in selected)
+            batched.extend(operator.vectorized(fitness, n, rng, **kwargs).tolist())
+        distance = sum(
+            abs(a - b)
+            for a, b in zip(
+                frequencies(listed, len(population)),
+                frequencies(batched, len(population)),
+            )
+        )
+        assert distance / 2 < 0.03, operator.name